@@ -0,0 +1,18 @@
+"""Замеры производительности маршрутов API на синтетических данных.
+
+Запуск из корня проекта:
+
+    python -m benchmarks --size 100000 --output results.json
+    python -m benchmarks --size 100000 --baseline results.json
+
+data - детерминированный генератор договоров, планов, затрат и актов КС,
+routes - замеры по каждому маршруту, runner - выполнение замеров через
+тестовый клиент Flask, compare - сравнение с базовыми результатами,
+startup - время холодного старта (python -m benchmarks.startup),
+login - пропускная способность входа (python -m benchmarks.login),
+concurrency - одновременные читатели и писатели с настройками SQLite
+и без них (python -m benchmarks.concurrency), currency - форматирование
+сумм (python -m benchmarks.currency), balance - /api/balance на 10 тыс.
+доходных и 100 тыс. расходных договоров (python -m benchmarks.balance).
+Код возврата 1, если маршрут ответил ошибкой или найдена регрессия.
+"""
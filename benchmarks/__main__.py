@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from app import create_app, setup_schema
+from config import engine_options
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.data import generate
+from benchmarks.runner import run_benchmarks
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Замеры всех маршрутов API на синтетических данных'
+    )
+    parser.add_argument('--size', type=int, default=10000, help='Строк синтетических данных (1000 - 1000000)')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора данных')
+    parser.add_argument('--rounds', type=int, default=20, help='Замеров на маршрут')
+    parser.add_argument('--warmup', type=int, default=2, help='Запросов на прогрев перед замерами')
+    parser.add_argument('--only', help='Замерять только маршруты, в имени которых есть эта строка')
+    parser.add_argument('--database', help='Адрес пустой БД (по умолчанию новый SQLite во временной папке)')
+    parser.add_argument('--cache', action='store_true', help='Не отключать кэш ответов')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='finmes-bench-')
+
+    database_uri = args.database or 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'AUTO_CREATE_SCHEMA': False,
+        'RESPONSE_CACHE_ENABLED': args.cache,
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'JOB_RESULTS_FOLDER': os.path.join(workdir, 'jobs')
+    })
+
+    started = time.perf_counter()
+    with app.app_context():
+        setup_schema()
+        sizes = generate(args.size, args.seed)
+    print(f'Данные ({sum(sizes.values())} строк) созданы за {time.perf_counter() - started:.1f} с: {sizes}')
+
+    results = run_benchmarks(app, sizes, args.rounds, args.warmup, args.only)
+    results['size'] = args.size
+    results['seed'] = args.seed
+
+    for route in results['uncovered']:
+        print(f"Маршрут без замера: {route['method']} {route['rule']}", file=sys.stderr)
+    failed = [result for result in results['benchmarks'] if 'error' in result]
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    regressions = []
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regression']]
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
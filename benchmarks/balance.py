@@ -0,0 +1,188 @@
+"""Баланс по источникам финансирования на больших объемах: GET /api/balance
+(целиком и потоком) и группировка расходных договоров по доходным.
+
+    python -m benchmarks.balance --incomes 10000 --expenses 100000 --output balance.json
+    python -m benchmarks.balance --baseline balance.json
+
+Прежний /api/balance для каждого доходного договора просматривал весь список
+расходных (O(N*M)). Эта группировка замеряется на первых --scan-incomes доходных
+договорах и пересчитывается на все: каждый из них обходится одним полным
+просмотром, так что время линейно по их числу.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app import create_app, setup_schema
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.data import BASE_DATE, CLIENTS, CONTRACTORS, CONTRACT_TYPES, insert_batches, money
+from benchmarks.runner import summarize
+from config import engine_options
+from models import db, IncomeContract, ExpenseContract
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.balance', description=__doc__.splitlines()[0])
+    parser.add_argument('--incomes', type=int, default=10000, help='Доходных договоров')
+    parser.add_argument('--expenses', type=int, default=100000, help='Расходных договоров')
+    parser.add_argument('--scan-incomes', type=int, default=100,
+                        help='Доходных договоров для замера прежней группировки просмотром списка')
+    parser.add_argument('--rounds', type=int, default=5, help='Замеров на маршрут')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора данных')
+    parser.add_argument('--database', help='Адрес пустой БД (по умолчанию новый SQLite во временной папке)')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    return parser.parse_args(argv)
+
+
+def insert_contracts(incomes, expenses, seed):
+    """Только доходные и расходные договоры: остальные таблицы баланс не читает"""
+    rng = random.Random(seed)
+    insert_batches(IncomeContract, ({
+        'contract_number': f'BI-{number:07d}',
+        'contract_date': BASE_DATE + timedelta(days=rng.randrange(365)),
+        'client': rng.choice(CLIENTS),
+        'contract_amount': money(rng, 1000000, 50000000),
+        'paid_amount': money(rng, 0, 1000000),
+        'status': 'active'
+    } for number in range(1, incomes + 1)))
+    insert_batches(ExpenseContract, ({
+        'contract_number': f'BE-{number:07d}',
+        'type_contract': rng.choice(CONTRACT_TYPES),
+        'start_date': BASE_DATE,
+        'end_date': BASE_DATE + timedelta(days=365),
+        'name': f'Работы по объекту {number}',
+        'client': rng.choice(CONTRACTORS),
+        'contract_amount': money(rng, 100000, 5000000),
+        'payment_loesk': money(rng, 0, 100000),
+        'income_contract_id': rng.randrange(1, incomes + 1),
+        'status': 'active'
+    } for number in range(1, expenses + 1)))
+    db.session.commit()
+
+
+def load_rows():
+    incomes = db.session.execute(db.select(IncomeContract.id).where(IncomeContract.deleted_at.is_(None))).all()
+    expenses = db.session.execute(
+        db.select(ExpenseContract.id, ExpenseContract.income_contract_id)
+        .where(ExpenseContract.deleted_at.is_(None))
+    ).all()
+    return incomes, expenses
+
+
+def group_by_list_scan(incomes, expenses):
+    """Прежняя группировка: полный просмотр расходных договоров на каждый доходный"""
+    return [[exp for exp in expenses if exp.income_contract_id == income.id] for income in incomes]
+
+
+def group_by_dict(incomes, expenses):
+    """Группировка за один проход, как до перехода на слияние курсоров"""
+    expenses_by_income = defaultdict(list)
+    for exp in expenses:
+        expenses_by_income[exp.income_contract_id].append(exp)
+    return [expenses_by_income.get(income.id, []) for income in incomes]
+
+
+def timed(function, *args):
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def measure_route(client, path, rounds):
+    """Теплые запросы маршрута: первый запрос не замеряется"""
+    timings, size = [], 0
+    for number in range(rounds + 1):
+        started = time.perf_counter()
+        response = client.get(path)
+        body = response.get_data()
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f'{path}: HTTP {response.status_code}: {body[:200].decode(errors="replace")}')
+        if number:
+            timings.append(elapsed)
+            size = len(body)
+    return timings, size
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='finmes-balance-bench-')
+
+    database_uri = args.database or 'sqlite:///' + os.path.join(workdir, 'balance.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'AUTO_CREATE_SCHEMA': False,
+        'RESPONSE_CACHE_ENABLED': False,
+        'METRICS_ENABLED': False
+    })
+
+    started = time.perf_counter()
+    with app.app_context():
+        setup_schema()
+        insert_contracts(args.incomes, args.expenses, args.seed)
+    print(f'{args.incomes} доходных и {args.expenses} расходных договоров созданы '
+          f'за {time.perf_counter() - started:.1f} с')
+
+    benchmarks = []
+    client = app.test_client()
+    for name, path in (('balance', '/api/balance'), ('balance stream', '/api/balance?stream=1')):
+        timings, size = measure_route(client, path, args.rounds)
+        benchmarks.append({'name': name, 'path': path, 'size_bytes': size, 'stats': summarize(timings)})
+
+    with app.app_context():
+        incomes, expenses = load_rows()
+    scanned = incomes[:args.scan_incomes]
+    scan_seconds = timed(group_by_list_scan, scanned, expenses) * len(incomes) / max(1, len(scanned))
+    dict_seconds = timed(group_by_dict, incomes, expenses)
+    grouping = {
+        'list scan (extrapolated)': scan_seconds,
+        'dict': dict_seconds,
+        'scanned_incomes': len(scanned)
+    }
+
+    results = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'incomes': args.incomes,
+        'expenses': args.expenses,
+        'seed': args.seed,
+        'grouping_seconds': grouping,
+        'benchmarks': benchmarks
+    }
+
+    for result in benchmarks:
+        stats = result['stats']
+        print(f"{result['name']:<16} медиана {stats['median']:8.3f} с, максимум {stats['max']:8.3f} с, "
+              f"{result['size_bytes']} байт")
+    print(f'Группировка просмотром списка: {scan_seconds:.2f} с '
+          f'(по {len(scanned)} доходным договорам из {len(incomes)})')
+    print(f'Группировка словарем:          {dict_seconds:.3f} с')
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    regressions = []
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regression']]
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
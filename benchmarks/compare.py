@@ -0,0 +1,57 @@
+import json
+
+# Замедление медианы больше чем в DEFAULT_THRESHOLD раз считается регрессией.
+# Разница меньше MIN_DELTA_SECONDS не учитывается: для быстрых маршрутов это шум
+DEFAULT_THRESHOLD = 1.25
+MIN_DELTA_SECONDS = 0.002
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA_SECONDS):
+    """Сравнивает результаты замеров с базовыми по имени замера.
+
+    Регрессия - медиана выросла больше чем в threshold раз (и больше чем на
+    min_delta секунд) или маршрут стал выполнять больше SQL-запросов, что
+    не зависит от машины и ловит N+1. Возвращает строки сравнения с признаком regression.
+    """
+    previous = {result['name']: result for result in baseline['benchmarks'] if 'stats' in result}
+    rows = []
+    for result in current['benchmarks']:
+        base = previous.get(result['name'])
+        if base is None or 'stats' not in result:
+            continue
+        median, base_median = result['stats']['median'], base['stats']['median']
+        ratio = median / base_median if base_median else float('inf')
+        slower = ratio > threshold and median - base_median > min_delta
+        more_queries = result.get('queries', 0) > base.get('queries', 0)
+        rows.append({
+            'name': result['name'],
+            'median': median,
+            'baseline_median': base_median,
+            'ratio': ratio,
+            'queries': result.get('queries'),
+            'baseline_queries': base.get('queries'),
+            'regression': slower or more_queries
+        })
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'маршрут':<28} {'было, мс':>10} {'стало, мс':>10} {'x':>6} {'SQL':>9}"]
+    for row in rows:
+        mark = '  РЕГРЕССИЯ' if row['regression'] else ''
+        queries = f"{row['baseline_queries']:>4}>{row['queries']:<4}" if row['queries'] is not None else f"{'-':>9}"
+        lines.append(
+            f"{row['name']:<28} {row['baseline_median'] * 1000:>10.2f} {row['median'] * 1000:>10.2f} "
+            f"{row['ratio']:>6.2f} {queries}{mark}"
+        )
+    return '\n'.join(lines)
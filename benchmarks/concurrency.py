@@ -0,0 +1,208 @@
+"""Одновременные читатели и писатели: пропускная способность и задержки при
+настройках SQLite по умолчанию и с профилем SQLITE_TUNING (WAL, busy_timeout...).
+
+    python -m benchmarks.concurrency --readers 4 --writers 2 --output concurrency.json
+    python -m benchmarks.concurrency --readers 2 --writers 8 --baseline concurrency.json
+    python -m benchmarks.concurrency --profile tuned --database postgresql://...
+
+Каждый читатель и писатель - отдельный процесс со своим приложением, как воркер
+gunicorn. Читатели запрашивают GET /api/actual?limit=200, писатели добавляют
+затраты POST /api/expense-contracts/<id>/cost-items. Кэш ответов отключен.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from app import create_app, setup_schema, dispose_engines
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.data import generate
+from benchmarks.runner import summarize
+from config import engine_options
+
+# Профили соединений с SQLite: значение SQLITE_TUNING
+PROFILES = {'untuned': False, 'tuned': True}
+
+READ_PATH = '/api/actual?limit=200'
+
+# Ожидание запуска всех процессов: создание приложения и первый запрос
+START_TIMEOUT = 120
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.concurrency', description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4, help='Процессов-читателей')
+    parser.add_argument('--writers', type=int, default=2, help='Процессов-писателей')
+    parser.add_argument('--seconds', type=float, default=8, help='Длительность нагрузки на профиль')
+    parser.add_argument('--size', type=int, default=13000, help='Строк синтетических данных')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора данных')
+    parser.add_argument('--profile', choices=[*PROFILES, 'both'], default='both', help='Профиль SQLite')
+    parser.add_argument('--database', help='Адрес пустой БД вместо нового SQLite (только с одним --profile)')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    args = parser.parse_args(argv)
+    if args.database and args.profile == 'both':
+        parser.error('--database задается вместе с --profile tuned или --profile untuned')
+    return args
+
+
+def make_app(database_uri, tuning, workdir):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'SQLITE_TUNING': tuning,
+        'AUTO_CREATE_SCHEMA': False,
+        'RESPONSE_CACHE_ENABLED': False,
+        'METRICS_ENABLED': False,
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'JOB_RESULTS_FOLDER': os.path.join(workdir, 'jobs')
+    })
+
+
+def write_request(rng, contracts):
+    contract_id = rng.randrange(1, contracts + 1)
+    return {
+        'path': f'/api/expense-contracts/{contract_id}/cost-items',
+        'method': 'POST',
+        'json': {'date': '2024-03-01', 'kontragent': 'ООО "Нагрузка"', 'category': 'Работы',
+                 'purpose': 'Оплата по договору', 'amount': f'{rng.randrange(1000, 100000)}.50'}
+    }
+
+
+def client_process(role, number, database_uri, tuning, workdir, contracts, seconds, start, results):
+    """Процесс читателя или писателя: запросы в цикле в течение seconds секунд после общего старта"""
+    app = make_app(database_uri, tuning, workdir)
+    client = app.test_client()
+    rng = random.Random(number)
+
+    def request():
+        if role == 'read':
+            return {'path': READ_PATH, 'method': 'GET'}
+        return write_request(rng, contracts)
+
+    client.open(**request()).close()
+    start.wait(START_TIMEOUT)
+
+    timings, statuses = [], {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        arguments = request()
+        started = time.perf_counter()
+        response = client.open(**arguments)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        response.close()
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            timings.append(elapsed)
+    results.put((role, timings, statuses))
+
+
+def percentile(timings, percent):
+    if len(timings) < 2:
+        return timings[0] if timings else 0.0
+    return statistics.quantiles(timings, n=100, method='inclusive')[percent - 1]
+
+
+def run_profile(profile, args, workdir):
+    """Готовит данные и запускает читателей и писателей на одном профиле"""
+    tuning = PROFILES[profile]
+    database_uri = args.database or 'sqlite:///' + os.path.join(workdir, f'{profile}.db')
+    app = make_app(database_uri, tuning, workdir)
+    with app.app_context():
+        setup_schema()
+        sizes = generate(args.size, args.seed)
+    dispose_engines(app)
+
+    # spawn: каждый процесс создает приложение с нуля, как новый воркер
+    context = multiprocessing.get_context('spawn')
+    start = context.Barrier(args.readers + args.writers)
+    results = context.Queue()
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        context.Process(target=client_process, args=(
+            role, number, database_uri, tuning, workdir, sizes['expense_contracts'], args.seconds, start, results))
+        for number, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get(timeout=START_TIMEOUT + args.seconds * 2) for _ in processes]
+    for process in processes:
+        process.join()
+
+    benchmarks = []
+    for role in ('read', 'write'):
+        timings = [timing for name, role_timings, _ in collected if name == role for timing in role_timings]
+        statuses = {}
+        for name, _, role_statuses in collected:
+            if name == role:
+                for status, count in role_statuses.items():
+                    statuses[str(status)] = statuses.get(str(status), 0) + count
+        result = {
+            'name': f'{profile} {role}',
+            'clients': roles.count(role),
+            'ops_per_second': len(timings) / args.seconds,
+            'p99': percentile(timings, 99),
+            'statuses': dict(sorted(statuses.items()))
+        }
+        if timings:
+            result['stats'] = summarize(timings)
+        benchmarks.append(result)
+    return benchmarks
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='finmes-concurrency-bench-')
+    profiles = list(PROFILES) if args.profile == 'both' else [args.profile]
+
+    benchmarks = []
+    for profile in profiles:
+        benchmarks += run_profile(profile, args, workdir)
+
+    results = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'cpu_count': os.cpu_count(),
+        'readers': args.readers,
+        'writers': args.writers,
+        'seconds': args.seconds,
+        'size': args.size,
+        'seed': args.seed,
+        'benchmarks': benchmarks
+    }
+
+    print(f'Читателей {args.readers}, писателей {args.writers}, {args.seconds:g} с на профиль, '
+          f'процессоров {os.cpu_count()}')
+    print(f"{'замер':<16} {'в секунду':>10} {'медиана, мс':>12} {'p99, мс':>10}  ответы")
+    for result in benchmarks:
+        median = result['stats']['median'] * 1000 if 'stats' in result else 0.0
+        print(f"{result['name']:<16} {result['ops_per_second']:>10.1f} {median:>12.2f} "
+              f"{result['p99'] * 1000:>10.2f}  {result['statuses']}")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    # Ошибки без настройки SQLite ("database is locked") - то, что показывает замер,
+    # ошибки настроенного профиля означают сбой
+    failed = any(
+        status != '200' for result in benchmarks if not result['name'].startswith('untuned')
+        for status in result['statuses']
+    )
+    regressions = []
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regression']]
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Микро-замер форматирования сумм: format_currency для каждого значения,
+format_currency_column для целого столбца и числа ответа ?format=raw.
+
+    python -m benchmarks.currency --values 100000 --output currency.json
+    python -m benchmarks.currency --baseline currency.json
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.runner import summarize
+from views.common import format_currency, format_currency_column
+
+
+def amounts(count, seed=1):
+    """Суммы как в списках договоров: Decimal с копейками от рублей до сотен миллионов, иногда NULL"""
+    rng = random.Random(seed)
+    return [
+        None if rng.random() < 0.01 else Decimal(rng.randrange(100, 50000000000)) / 100
+        for _ in range(count)
+    ]
+
+
+# Способы получить столбец сумм для ответа
+VARIANTS = {
+    'format_currency': lambda values: [format_currency(value) for value in values],
+    'format_currency_column': format_currency_column,
+    'raw': lambda values: [float(value or 0) for value in values]
+}
+
+
+def measure(function, values, rounds):
+    # Как timeit: сборка мусора во время замера отключена, иначе ее паузы
+    # достаются тому способу, на котором она случилась
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            function(values)
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.currency', description=__doc__.splitlines()[0])
+    parser.add_argument('--values', type=int, default=100000, help='Сумм в столбце')
+    parser.add_argument('--rounds', type=int, default=20, help='Замеров на способ')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора сумм')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    args = parser.parse_args(argv)
+
+    values = amounts(args.values, args.seed)
+    # Столбец должен совпадать с поэлементным форматированием строка в строку
+    mismatched = VARIANTS['format_currency'](values) != format_currency_column(values)
+    if mismatched:
+        print('format_currency_column расходится с format_currency', file=sys.stderr)
+
+    results = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'values': args.values,
+        'seed': args.seed,
+        'benchmarks': [
+            {'name': name, 'stats': summarize(measure(function, values, args.rounds))}
+            for name, function in VARIANTS.items()
+        ]
+    }
+
+    base_median = results['benchmarks'][0]['stats']['median']
+    for result in results['benchmarks']:
+        median = result['stats']['median']
+        print(f"{result['name']:<24} медиана {median * 1000:8.2f} мс, {base_median / median:5.2f}x")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    regressions = []
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regression']]
+
+    return 1 if mismatched or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
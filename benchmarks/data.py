@@ -0,0 +1,157 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from models import db, User, IncomeContract, ExpenseContract, CalPlan, CostItem, ClosedWork
+from passwords import passwords
+from summary import rebuild_summaries
+from views.common import get_planning_months
+
+# Доли таблиц в общем числе строк набора данных
+SHARES = {
+    'income_contracts': 0.05,
+    'expense_contracts': 0.15,
+    'cal_plans': 0.3,
+    'cost_items': 0.3,
+    'closed_works': 0.2
+}
+
+INSERT_BATCH_SIZE = 10000
+
+BASE_DATE = datetime(2024, 1, 1)
+
+# Планы продолжаются столько месяцев после окна планирования
+PLAN_FUTURE_MONTHS = 12
+
+BENCH_USER = 'bench'
+BENCH_PASSWORD = 'bench-password'
+
+CLIENTS = ['ПАО "Россети"', 'АО "Энергосбыт"', 'ООО "Сетевая компания"', 'МУП "Горэлектросеть"']
+CONTRACTORS = ['ООО "СтройМонтаж"', 'ИП Петров', 'ООО "РемонтСервис"', 'ИП Сидоров', 'ООО "ИнжСистемы"']
+CONTRACT_TYPES = ['ремонтная программа', 'инвестиционная программа']
+CATEGORIES = ['Материалы', 'Работы', 'Оборудование']
+
+
+def table_sizes(size):
+    """Число строк каждой таблицы для набора из size строк"""
+    return {table: max(1, int(size * share)) for table, share in SHARES.items()}
+
+
+def plan_history_months(size):
+    """Глубина истории планов до окна планирования: 2 года для 1 тыс. строк
+    и еще по году на каждый следующий порядок (1 млн строк - 5 лет)"""
+    return 12 * max(2, len(str(max(1, size))) - 2)
+
+
+def month_start(first_month, offset):
+    month = first_month.month - 1 + offset
+    return datetime(first_month.year + month // 12, month % 12 + 1, 1)
+
+
+def money(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def insert_batches(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+
+
+def generate(size, seed=1):
+    """Заполняет БД приложения синтетическими данными примерно из size строк.
+
+    Одинаковые size и seed дают одинаковые данные, а в новой БД и одинаковые id
+    (договоры нумеруются с 1 в порядке вставки), поэтому результаты замеров
+    сравнимы между запусками. Даты планов отсчитываются от текущего окна
+    планирования, чтобы оно всегда попадало в данные. Возвращает число строк по таблицам.
+    """
+    if db.session.execute(db.select(IncomeContract.id).limit(1)).first() is not None:
+        raise ValueError('Синтетические данные загружаются только в пустую БД')
+
+    rng = random.Random(seed)
+    sizes = table_sizes(size)
+    income_count = sizes['income_contracts']
+    expense_count = sizes['expense_contracts']
+
+    db.session.add(User(
+        username=BENCH_USER, role='Администратор системы',
+        password_hash=passwords.hash(BENCH_PASSWORD)
+    ))
+
+    insert_batches(IncomeContract, ({
+        'contract_number': f'BI-{number:07d}',
+        'contract_date': BASE_DATE + timedelta(days=rng.randrange(365)),
+        'client': rng.choice(CLIENTS),
+        'contract_amount': money(rng, 1000000, 50000000),
+        'paid_amount': money(rng, 0, 1000000),
+        'status': 'active'
+    } for number in range(1, income_count + 1)))
+
+    def expense_contract(number):
+        start_date = BASE_DATE + timedelta(days=rng.randrange(365))
+        return {
+            'contract_number': f'BE-{number:07d}',
+            'type_contract': rng.choice(CONTRACT_TYPES),
+            'start_date': start_date,
+            'end_date': start_date + timedelta(days=rng.randrange(30, 720)),
+            'name': f'Работы по объекту {number}',
+            'client': rng.choice(CONTRACTORS),
+            'contract_amount': money(rng, 100000, 5000000),
+            'advance_percentage': Decimal(rng.choice([0, 10, 20, 30])),
+            'payment_loesk': money(rng, 0, 100000),
+            'income_contract_id': rng.randrange(1, income_count + 1),
+            'is_mes': rng.random() < 0.2,
+            'status': 'active'
+        }
+
+    insert_batches(ExpenseContract, (expense_contract(number) for number in range(1, expense_count + 1)))
+
+    # План: подряд идущие месяцы договора, по одной строке на месяц. Начало плана
+    # договора случайно в пределах горизонта от plan_history_months(size) месяцев до
+    # текущего окна планирования и до PLAN_FUTURE_MONTHS после него, так что в окно
+    # попадает только часть строк, а остальное - история и будущие планы
+    window_start, *_, window_end = get_planning_months()
+    first_month = month_start(window_start, -plan_history_months(size))
+    plan_months = -(-sizes['cal_plans'] // expense_count)
+    horizon = plan_history_months(size) + (window_end.year - window_start.year) * 12 \
+        + window_end.month - window_start.month + PLAN_FUTURE_MONTHS
+    plan_starts = [rng.randrange(max(1, horizon - plan_months + 1)) for _ in range(expense_count)]
+
+    def cal_plans():
+        for number in range(sizes['cal_plans']):
+            contract_id = number % expense_count + 1
+            month = plan_starts[contract_id - 1] + number // expense_count
+            yield {
+                'iddog': contract_id,
+                'date': month_start(first_month, month),
+                'plopl': money(rng, 10000, 500000)
+            }
+
+    insert_batches(CalPlan, cal_plans())
+
+    insert_batches(CostItem, ({
+        'contract_id': rng.randrange(1, expense_count + 1),
+        'date': BASE_DATE + timedelta(days=rng.randrange(730)),
+        'kontragent': rng.choice(CONTRACTORS),
+        'category': rng.choice(CATEGORIES),
+        'purpose': 'Оплата по договору',
+        'amount': money(rng, 1000, 300000)
+    } for _ in range(sizes['cost_items'])))
+
+    insert_batches(ClosedWork, ({
+        'contract_id': rng.randrange(1, expense_count + 1),
+        'act_number': f'КС-{number}',
+        'act_date': BASE_DATE + timedelta(days=rng.randrange(730)),
+        'amount': money(rng, 1000, 300000)
+    } for number in range(1, sizes['closed_works'] + 1)))
+
+    db.session.commit()
+
+    # Вставки выполнены в обход ORM, итоги по договорам пересчитываются целиком
+    rebuild_summaries()
+    return sizes
@@ -0,0 +1,184 @@
+"""Пропускная способность входа: одновременные POST /api/auth/login и задержка
+соседних запросов (/api/health), пока воркер проверяет пароли.
+
+    python -m benchmarks.login --clients 16 --logins 200 --output login.json
+    python -m benchmarks.login --method pbkdf2:sha256:600000 --baseline login.json
+    python -m benchmarks.login --stored-method pbkdf2:sha256:1000  # пересчет хэшей при входе
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from app import create_app, setup_schema
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.runner import summarize
+from config import engine_options
+from models import db, User
+from passwords import passwords
+
+USER_PASSWORD = 'login-bench-password'
+
+# Пауза между запросами /api/health во время входов
+HEALTH_INTERVAL = 0.01
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.login', description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help='Одновременных клиентов')
+    parser.add_argument('--logins', type=int, default=200, help='Всего входов')
+    parser.add_argument('--users', type=int, default=50, help='Пользователей в БД')
+    parser.add_argument('--method', help='PASSWORD_HASH_METHOD (по умолчанию из настроек)')
+    parser.add_argument('--stored-method', help='Метод, которым созданы хэши в БД (по умолчанию --method)')
+    parser.add_argument('--workers', type=int, help='PASSWORD_VERIFY_WORKERS')
+    parser.add_argument('--queue', type=int, help='PASSWORD_VERIFY_QUEUE')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    return parser.parse_args(argv)
+
+
+def create_users(count, stored_method=None):
+    # Хэш считается один раз на всех: для замера важна цена проверки, а не соль
+    if stored_method:
+        password_hash = generate_password_hash(USER_PASSWORD, stored_method, passwords.salt_length)
+    else:
+        password_hash = passwords.hash(USER_PASSWORD)
+    db.session.execute(db.insert(User), [
+        {'username': f'login-bench-{number}', 'role': 'Экономика', 'password_hash': password_hash, 'is_active': True}
+        for number in range(count)
+    ])
+    db.session.commit()
+
+
+def run_logins(app, clients, logins, users):
+    """Выполняет logins входов из clients потоков. Возвращает задержки успешных входов,
+    количество ответов по кодам и общее время"""
+    statuses = {}
+    statuses_lock = threading.Lock()
+    local = threading.local()
+
+    def login(number):
+        # У каждого потока свой клиент: у него свои cookie сессии
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        started = time.perf_counter()
+        response = local.client.post('/api/auth/login', json={
+            'username': f'login-bench-{number % users}', 'password': USER_PASSWORD})
+        elapsed = time.perf_counter() - started
+        with statuses_lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return elapsed if response.status_code == 200 else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        timings = list(executor.map(login, range(logins)))
+    return [timing for timing in timings if timing is not None], statuses, time.perf_counter() - started
+
+
+def probe_health(app, stop):
+    """Задержки /api/health до установки stop: насколько входы мешают другим запросам"""
+    client = app.test_client()
+    timings = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/api/health')
+        timings.append(time.perf_counter() - started)
+        stop.wait(HEALTH_INTERVAL)
+    return timings
+
+
+def probe_health_for(app, seconds):
+    stop = threading.Event()
+    timer = threading.Timer(seconds, stop.set)
+    timer.start()
+    return probe_health(app, stop)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='finmes-login-bench-')
+
+    database_uri = 'sqlite:///' + os.path.join(workdir, 'login.db')
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        'AUTO_CREATE_SCHEMA': False,
+        'METRICS_ENABLED': False
+    }
+    if args.method:
+        overrides['PASSWORD_HASH_METHOD'] = args.method
+    if args.workers:
+        overrides['PASSWORD_VERIFY_WORKERS'] = args.workers
+    if args.queue is not None:
+        overrides['PASSWORD_VERIFY_QUEUE'] = args.queue
+    app = create_app(overrides)
+
+    with app.app_context():
+        setup_schema()
+        create_users(args.users, args.stored_method)
+
+    health_baseline = probe_health_for(app, 0.5)
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        health = executor.submit(probe_health, app, stop)
+        timings, statuses, elapsed = run_logins(app, args.clients, args.logins, args.users)
+        stop.set()
+        health_timings = health.result()
+
+    with app.app_context():
+        rehashed = db.session.execute(
+            db.select(db.func.count()).select_from(User).where(User.password_hash.startswith(passwords.method + '$'))
+        ).scalar_one()
+
+    benchmarks = [{'name': 'health', 'stats': summarize(health_baseline)}]
+    if timings:
+        benchmarks.append({'name': 'login', 'stats': summarize(timings)})
+    benchmarks.append({'name': 'health during logins', 'stats': summarize(health_timings)})
+    results = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'method': passwords.method,
+        'stored_method': args.stored_method or passwords.method,
+        'verify_workers': passwords.workers,
+        'verify_queue': passwords.queue,
+        'clients': args.clients,
+        'logins': args.logins,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'logins_per_second': len(timings) / elapsed if elapsed else 0.0,
+        'users_with_current_hash': rehashed,
+        'benchmarks': benchmarks
+    }
+
+    print(f"Метод {results['method']}, проверок одновременно {results['verify_workers']}, "
+          f"очередь {results['verify_queue']}, клиентов {args.clients}")
+    print(f"Входов: {len(timings)} из {args.logins} за {elapsed:.2f} с, "
+          f"{results['logins_per_second']:.1f} в секунду, ответы {results['statuses']}")
+    if args.stored_method:
+        print(f'Хэшей с текущими параметрами после входов: {rehashed} из {args.users}')
+    for result in benchmarks:
+        stats = result['stats']
+        print(f"{result['name']:<22} медиана {stats['median'] * 1000:8.2f} мс, максимум {stats['max'] * 1000:8.2f} мс")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    # 503 - ожидаемый отказ при переполненной очереди, остальные коды кроме 200 - ошибки
+    failed = any(status not in (200, 503) for status in statuses)
+    regressions = []
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['regression']]
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import io
+import itertools
+import time
+from models import db, User, IncomeContract, ExpenseContract, CostItem, ClosedWork, Job
+from jobs import QUEUED, RUNNING
+from benchmarks.data import BASE_DATE, BENCH_USER, BENCH_PASSWORD
+
+# Маршруты, которые не замеряются, с причиной
+SKIPPED = {
+    ('GET', '/'): 'index.html отдается собранным фронтендом',
+    ('GET', '/static/<path:filename>'): 'статические файлы',
+    ('POST', '/api/init-data'): 'создает фиксированный набор тестовых данных и не повторяется'
+}
+
+PDF_CONTENT = b'%PDF-1.4\n' + b'0' * 64 * 1024 + b'\n%%EOF\n'
+
+JOB_WAIT_TIMEOUT = 60
+
+
+class BenchContext:
+    """Состояние замеров: приложение, клиент, размеры данных и счетчик уникальных значений.
+
+    Подготовка данных для запроса выполняется в отдельном контексте приложения,
+    а не в контексте запроса, и в замер не входит.
+    """
+
+    def __init__(self, app, client, sizes):
+        self.app = app
+        self.client = client
+        self.sizes = sizes
+        self.counter = itertools.count(1)
+        self.prepared = {}
+
+    def unique(self):
+        return next(self.counter)
+
+    def insert(self, model, **values):
+        with self.app.app_context():
+            row = model(**values)
+            db.session.add(row)
+            db.session.commit()
+            return row.id
+
+    def scalar(self, query):
+        with self.app.app_context():
+            return db.session.execute(query).scalar()
+
+    def once(self, key, prepare):
+        if key not in self.prepared:
+            self.prepared[key] = prepare()
+        return self.prepared[key]
+
+    def login(self):
+        self.client.post('/api/auth/login', json={'username': BENCH_USER, 'password': BENCH_PASSWORD})
+
+    def wait_for_jobs(self):
+        deadline = time.monotonic() + JOB_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            active = self.scalar(
+                db.select(db.func.count()).select_from(Job).where(Job.status.in_([QUEUED, RUNNING])))
+            if not active:
+                return
+            time.sleep(0.05)
+        raise RuntimeError('Фоновые задачи не завершились за отведенное время')
+
+    def finished_job(self, kind, params=None):
+        response = self.client.post('/api/jobs', json={'kind': kind, 'params': params or {}})
+        self.wait_for_jobs()
+        return response.get_json()['id']
+
+    @property
+    def contract_id(self):
+        # Договор из середины набора, чтобы не попадать на крайние значения
+        return max(1, self.sizes['expense_contracts'] // 2)
+
+    @property
+    def income_id(self):
+        return max(1, self.sizes['income_contracts'] // 2)
+
+
+def case(name, method, rule, build, expect=(200,), after=None):
+    """Замер маршрута: build(context) возвращает аргументы запроса тестового клиента
+    (path, json, data...), after(context) выполняется после всех повторов"""
+    return {'name': name, 'method': method, 'rule': rule, 'build': build, 'expect': expect, 'after': after}
+
+
+def get(path):
+    return lambda context: {'path': path(context) if callable(path) else path}
+
+
+def pdf_upload():
+    return (io.BytesIO(PDF_CONTENT), 'act.pdf')
+
+
+def cost_items_csv(context, rows=100):
+    lines = ['contract_id,date,kontragent,category,purpose,amount']
+    lines += [f'{context.contract_id},2024-03-01,ООО "Импорт",Материалы,Импорт,{number}.50'
+              for number in range(rows)]
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+def edited_user(context):
+    return context.once('user', lambda: context.insert(User, username='bench-edit', role='ПТС', password_hash='-'))
+
+
+def export_job(context):
+    return context.once('job', lambda: context.finished_job('export', {'kind': 'income'}))
+
+
+def file_work(context):
+    """Акт с файлом для замеров выдачи и замены файла"""
+    def prepare():
+        response = context.client.post(
+            f'/api/expense-contracts/{context.contract_id}/closed-works',
+            data={'act_number': 'КС-файл', 'act_date': '2024-03-01', 'amount': '1000', 'file': pdf_upload()},
+            content_type='multipart/form-data'
+        )
+        return response.get_json()['work']['id']
+    return context.once('file_work', prepare)
+
+
+CASES = [
+    case('health', 'GET', '/api/health', get('/api/health')),
+    case('cache stats', 'GET', '/api/cache/stats', get('/api/cache/stats')),
+    case('metrics', 'GET', '/api/metrics', get('/api/metrics')),
+
+    case('login', 'POST', '/api/auth/login', lambda context: {
+        'path': '/api/auth/login', 'json': {'username': BENCH_USER, 'password': BENCH_PASSWORD}}),
+    case('logout', 'POST', '/api/auth/logout', lambda context: {'path': '/api/auth/logout'},
+         after=BenchContext.login),
+    case('current user', 'GET', '/api/auth/current', get('/api/auth/current')),
+    case('register', 'POST', '/api/auth/register', lambda context: {
+        'path': '/api/auth/register',
+        'json': {'username': f'bench-user-{context.unique()}', 'password': 'secret', 'role': 'Экономика'}},
+         expect=(201,)),
+    case('is admin', 'GET', '/api/auth/is-admin', get('/api/auth/is-admin')),
+    case('users', 'GET', '/api/auth/users', get('/api/auth/users')),
+    case('update user', 'PUT', '/api/auth/users/<int:user_id>', lambda context: {
+        'path': f'/api/auth/users/{edited_user(context)}',
+        'json': {'role': 'Экономика' if context.unique() % 2 else 'ПТС'}}),
+    case('delete user', 'DELETE', '/api/auth/users/<int:user_id>', lambda context: {
+        'path': '/api/auth/users/{}'.format(context.insert(
+            User, username=f'bench-delete-{context.unique()}', role='ПТС', password_hash='-'))}),
+
+    case('income', 'GET', '/api/income', get('/api/income')),
+    case('income page', 'GET', '/api/income', get('/api/income?limit=100')),
+    case('planning', 'GET', '/api/planning', get('/api/planning')),
+    case('planning page', 'GET', '/api/planning', get('/api/planning?limit=100')),
+    case('actual', 'GET', '/api/actual', get('/api/actual')),
+    case('actual page', 'GET', '/api/actual', get('/api/actual?limit=100')),
+    case('actual stream', 'GET', '/api/actual', get('/api/actual?stream=1')),
+    case('balance', 'GET', '/api/balance', get('/api/balance')),
+
+    case('create income contract', 'POST', '/api/income-contracts', lambda context: {
+        'path': '/api/income-contracts',
+        'json': {'contract_number': f'BN-{context.unique()}', 'contract_date': '2024-03-01',
+                 'client': 'ПАО "Россети"', 'contract_amount': '1000000'}}, expect=(201,)),
+    case('create expense contract', 'POST', '/api/expense-contracts', lambda context: {
+        'path': '/api/expense-contracts',
+        'json': {'contract_number': f'BN-{context.unique()}', 'start_date': '2024-03-01', 'end_date': '2024-12-31',
+                 'name': 'Новый договор', 'contract_amount': '500000', 'type_contract': 'ремонтная программа',
+                 'funding_source': context.income_id, 'client': 'ИП Петров'}}, expect=(201,)),
+    case('income options', 'GET', '/api/income-contracts/options', get('/api/income-contracts/options')),
+    case('income contract', 'GET', '/api/income-contracts/<int:contract_id>',
+         get(lambda context: f'/api/income-contracts/{context.income_id}')),
+    case('update income contract', 'PUT', '/api/income-contracts/<int:contract_id>', lambda context: {
+        'path': f'/api/income-contracts/{context.income_id}', 'json': {'client': f'Заказчик {context.unique()}'}}),
+    case('expense contract', 'GET', '/api/expense-contracts/<int:contract_id>',
+         get(lambda context: f'/api/expense-contracts/{context.contract_id}')),
+    case('update expense contract', 'PUT', '/api/expense-contracts/<int:contract_id>', lambda context: {
+        'path': f'/api/expense-contracts/{context.contract_id}', 'json': {'name': f'Договор {context.unique()}'}}),
+    case('delete income contract', 'DELETE', '/api/income-contracts/<int:contract_id>', lambda context: {
+        'path': '/api/income-contracts/{}'.format(context.insert(
+            IncomeContract, contract_number=f'BD-{context.unique()}', client='Удаляемый',
+            contract_amount=1, contract_date=BASE_DATE))}),
+    case('delete expense contract', 'DELETE', '/api/expense-contracts/<int:contract_id>', lambda context: {
+        'path': '/api/expense-contracts/{}'.format(context.insert(
+            ExpenseContract, contract_number=f'BD-{context.unique()}', type_contract='ремонтная программа',
+            start_date=BASE_DATE, end_date=BASE_DATE,
+            name='Удаляемый', client='Удаляемый', contract_amount=1, income_contract_id=context.income_id))}),
+
+    case('closed works', 'GET', '/api/expense-contracts/<int:contract_id>/closed-works',
+         get(lambda context: f'/api/expense-contracts/{context.contract_id}/closed-works')),
+    case('add closed work', 'POST', '/api/expense-contracts/<int:contract_id>/closed-works', lambda context: {
+        'path': f'/api/expense-contracts/{context.contract_id}/closed-works',
+        'data': {'act_number': f'КС-{context.unique()}', 'act_date': '2024-03-01', 'amount': '1000',
+                 'file': pdf_upload()},
+        'content_type': 'multipart/form-data'}),
+    case('closed work file', 'GET', '/api/closed-works/<int:work_id>/file',
+         get(lambda context: f'/api/closed-works/{file_work(context)}/file')),
+    case('replace closed work file', 'POST', '/api/closed-works/<int:work_id>/file', lambda context: {
+        'path': f'/api/closed-works/{file_work(context)}/file',
+        'data': {'file': pdf_upload()}, 'content_type': 'multipart/form-data'}),
+    case('delete closed work', 'DELETE', '/api/expense-contracts/<int:contract_id>/closed-works/<int:work_id>',
+         lambda context: {'path': '/api/expense-contracts/{}/closed-works/{}'.format(
+             context.contract_id, context.insert(
+                 ClosedWork, contract_id=context.contract_id, act_number='КС-удаляемый',
+                 act_date=BASE_DATE, amount=1))}),
+
+    case('cost items', 'GET', '/api/expense-contracts/<int:contract_id>/cost-items',
+         get(lambda context: f'/api/expense-contracts/{context.contract_id}/cost-items')),
+    case('add cost item', 'POST', '/api/expense-contracts/<int:contract_id>/cost-items', lambda context: {
+        'path': f'/api/expense-contracts/{context.contract_id}/cost-items',
+        'json': {'date': '2024-03-01', 'kontragent': 'ИП Петров', 'category': 'Работы',
+                 'purpose': 'Оплата', 'amount': '1000.00'}}),
+    case('delete cost item', 'DELETE', '/api/expense-contracts/<int:contract_id>/cost-items/<int:item_id>',
+         lambda context: {'path': '/api/expense-contracts/{}/cost-items/{}'.format(
+             context.contract_id, context.insert(
+                 CostItem, contract_id=context.contract_id, date=BASE_DATE,
+                 kontragent='Удаляемый', category='Работы', purpose='Удаляемый', amount=1))}),
+
+    case('cal plan', 'GET', '/api/expense-contracts/<int:contract_id>/cal-plan',
+         get(lambda context: f'/api/expense-contracts/{context.contract_id}/cal-plan')),
+    case('save cal plan', 'POST', '/api/expense-contracts/<int:contract_id>/cal-plan', lambda context: {
+        'path': f'/api/expense-contracts/{context.contract_id}/cal-plan',
+        'json': {'plans': [{'date': f'2024-{month:02d}-01', 'plopl': str(1000 * month + context.unique() % 7)}
+                           for month in range(1, 13)]}}),
+    case('children', 'GET', '/api/expense-contracts/children', get(
+        lambda context: '/api/expense-contracts/children?ids=' + ','.join(
+            str(number) for number in range(1, min(100, context.sizes['expense_contracts']) + 1)))),
+
+    case('import cost items', 'POST', '/api/import/<kind>', lambda context: {
+        'path': '/api/import/cost-items', 'data': {'file': (cost_items_csv(context), 'items.csv')},
+        'content_type': 'multipart/form-data'}),
+    case('export balance', 'GET', '/api/export/<kind>.xlsx', get('/api/export/balance.xlsx')),
+
+    case('submit job', 'POST', '/api/jobs', lambda context: {
+        'path': '/api/jobs', 'json': {'kind': 'rebuild-summary'}}, expect=(202,), after=BenchContext.wait_for_jobs),
+    case('job status', 'GET', '/api/jobs/<job_id>',
+         get(lambda context: f'/api/jobs/{export_job(context)}')),
+    case('job result', 'GET', '/api/jobs/<job_id>/result',
+         get(lambda context: f'/api/jobs/{export_job(context)}/result')),
+]
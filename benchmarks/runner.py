@@ -0,0 +1,122 @@
+import platform
+import statistics
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+from benchmarks.routes import CASES, SKIPPED, BenchContext
+
+
+class QueryCounter:
+    """Число SQL-запросов, выполненных за время замера, по всем движкам"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'after_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+    def close(self):
+        event.remove(Engine, 'after_cursor_execute', self.on_execute)
+
+
+def summarize(timings):
+    """Статистика замеров в духе pytest-benchmark, время в секундах"""
+    ordered = sorted(timings)
+    quartiles = statistics.quantiles(ordered, n=4) if len(ordered) > 1 else [ordered[0]] * 3
+    mean = statistics.fmean(ordered)
+    return {
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': mean,
+        'median': statistics.median(ordered),
+        'stddev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        'iqr': quartiles[2] - quartiles[0],
+        'ops': 1 / mean if mean else 0.0,
+        'rounds': len(ordered)
+    }
+
+
+def measure(context, case, rounds, warmup, counter):
+    """Выполняет запрос маршрута warmup + rounds раз и возвращает результат замера"""
+    timings, queries = [], []
+    result = {'name': case['name'], 'method': case['method'], 'rule': case['rule']}
+
+    for number in range(warmup + rounds):
+        request = case['build'](context)
+        result['path'] = request['path']
+
+        queries_before = counter.count
+        started = time.perf_counter()
+        response = context.client.open(method=case['method'], **request)
+        body = response.get_data()
+        elapsed = time.perf_counter() - started
+        response.close()
+
+        if response.status_code not in case['expect']:
+            result['error'] = f'HTTP {response.status_code}: {body[:200].decode(errors="replace")}'
+            break
+        if number >= warmup:
+            timings.append(elapsed)
+            queries.append(counter.count - queries_before)
+            result['size_bytes'] = len(body)
+
+    if case['after']:
+        case['after'](context)
+    if timings:
+        result['stats'] = summarize(timings)
+        result['queries'] = round(statistics.median(queries))
+    return result
+
+
+def uncovered_routes(app):
+    """Маршруты приложения, для которых нет ни замера, ни причины пропуска"""
+    covered = {(case['method'], case['rule']) for case in CASES} | set(SKIPPED)
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            routes.add((method, rule.rule))
+    return sorted(routes - covered, key=lambda route: (route[1], route[0]))
+
+
+def run_benchmarks(app, sizes, rounds=20, warmup=2, only=None, progress=print):
+    """Замеряет все маршруты из CASES через тестовый клиент Flask"""
+    context = BenchContext(app, app.test_client(), sizes)
+    context.login()
+    counter = QueryCounter()
+    results = []
+    try:
+        for case in CASES:
+            if only and only not in case['name']:
+                continue
+            result = measure(context, case, rounds, warmup, counter)
+            results.append(result)
+            if 'error' in result:
+                progress(f"{case['name']:<28} ошибка: {result['error']}")
+            else:
+                progress(f"{case['name']:<28} медиана {result['stats']['median'] * 1000:9.2f} мс, "
+                         f"SQL {result['queries']:>4}, {result['size_bytes']} байт")
+    finally:
+        counter.close()
+
+    return {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'machine_info': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine()
+        },
+        'database': database_dialect(app),
+        'sizes': sizes,
+        'benchmarks': results,
+        'skipped': [{'method': method, 'rule': rule, 'reason': reason}
+                    for (method, rule), reason in sorted(SKIPPED.items())],
+        'uncovered': [{'method': method, 'rule': rule} for method, rule in uncovered_routes(app)]
+    }
+
+
+def database_dialect(app):
+    with app.app_context():
+        return db.engine.dialect.name
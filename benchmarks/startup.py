@@ -0,0 +1,102 @@
+"""Замер холодного старта: import app, create_app() и первый запрос в новом процессе.
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, format_comparison, load_results, save_results
+from benchmarks.runner import summarize
+
+# Выполняется в отдельном процессе, чтобы модули не были уже импортированы.
+# БД в памяти: при создании приложения и на /api/health к ней не обращаются
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app({
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_ENGINE_OPTIONS': {}, 'AUTO_CREATE_SCHEMA': False
+})
+created = time.perf_counter()
+application.test_client().get('/api/health')
+answered = time.perf_counter()
+print(json.dumps({
+    'import app': imported - started,
+    'create_app': created - imported,
+    'first request': answered - created
+}))
+'''
+
+SLOWEST_MODULES = 15
+
+
+def probe():
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - started
+    return timings
+
+
+def slowest_imports(limit=SLOWEST_MODULES):
+    """Самые долгие импорты (python -X importtime): модули верхнего уровня
+    и модули, которые они импортируют напрямую, с суммарным временем"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Вложенность отмечена отступом в два пробела на уровень
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            modules.append({'module': name.strip(), 'depth': depth, 'cumulative_seconds': int(cumulative) / 1e6})
+    return sorted(modules, key=lambda module: module['cumulative_seconds'], reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10, help='Запусков процесса')
+    parser.add_argument('--output', help='Записать результаты в JSON файл')
+    parser.add_argument('--baseline', help='Сравнить с результатами из JSON файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление медианы относительно базовых результатов')
+    args = parser.parse_args(argv)
+
+    runs = [probe() for _ in range(args.rounds)]
+    results = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'benchmarks': [
+            {'name': name, 'stats': summarize([run[name] for run in runs])}
+            for name in ('import app', 'create_app', 'first request', 'process')
+        ],
+        'slowest_imports': slowest_imports()
+    }
+
+    for result in results['benchmarks']:
+        print(f"{result['name']:<16} медиана {result['stats']['median'] * 1000:8.1f} мс")
+    for module in results['slowest_imports']:
+        print(f"  {module['module']:<30} {module['cumulative_seconds'] * 1000:8.1f} мс")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f'Результаты записаны в {args.output}')
+
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print(format_comparison(rows))
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from models import db, IncomeContract, ExpenseContract, CostItem, ClosedWork
+from summary import refresh_summaries
+
+# Размер пачки: проверка и вставка выполняются пачками, каждая в своей транзакции
+IMPORT_CHUNK_SIZE = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_date(value, field):
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d')
+    except ValueError:
+        raise RowError(f'Поле {field} должно быть датой в формате ГГГГ-ММ-ДД')
+
+
+def parse_amount(value, field):
+    try:
+        return Decimal(str(value).strip().replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        raise RowError(f'Поле {field} должно быть числом')
+
+
+def parse_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'Поле {field} должно быть целым числом')
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'да')
+
+
+def require(data, fields):
+    for field in fields:
+        if field not in data or data[field] in (None, ''):
+            raise RowError(f'Поле {field} обязательно для заполнения')
+
+
+def build_income_contract(data):
+    require(data, ['contract_number', 'contract_date', 'client', 'contract_amount'])
+    return {
+        'contract_number': str(data['contract_number']).strip(),
+        'contract_date': parse_date(data['contract_date'], 'contract_date'),
+        'client': data['client'],
+        'contract_amount': parse_amount(data['contract_amount'], 'contract_amount'),
+        'paid_amount': parse_amount(data.get('paid_amount') or 0, 'paid_amount'),
+        'status': 'active'
+    }
+
+
+def build_expense_contract(data):
+    if 'income_contract_id' in data and 'funding_source' not in data:
+        data = {**data, 'funding_source': data['income_contract_id']}
+    require(data, ['contract_number', 'start_date', 'end_date', 'name',
+                   'contract_amount', 'type_contract', 'funding_source', 'client'])
+    return {
+        'contract_number': str(data['contract_number']).strip(),
+        'type_contract': data['type_contract'],
+        'start_date': parse_date(data['start_date'], 'start_date'),
+        'end_date': parse_date(data['end_date'], 'end_date'),
+        'name': data['name'],
+        'client': data['client'],
+        'contract_amount': parse_amount(data['contract_amount'], 'contract_amount'),
+        'advance_percentage': parse_amount(data.get('advance_percentage') or 0, 'advance_percentage'),
+        'payment_loesk': parse_amount(data.get('payment_loesk') or 0, 'payment_loesk'),
+        'income_contract_id': parse_int(data['funding_source'], 'funding_source'),
+        'is_mes': parse_bool(data.get('is_mes', False)),
+        'status': 'active'
+    }
+
+
+def build_cost_item(data):
+    require(data, ['contract_id', 'date', 'kontragent', 'category', 'purpose', 'amount'])
+    return {
+        'contract_id': parse_int(data['contract_id'], 'contract_id'),
+        'date': parse_date(data['date'], 'date'),
+        'kontragent': data['kontragent'],
+        'category': data['category'],
+        'purpose': data['purpose'],
+        'amount': parse_amount(data['amount'], 'amount')
+    }
+
+
+def build_closed_work(data):
+    require(data, ['contract_id', 'act_number', 'act_date', 'amount'])
+    return {
+        'contract_id': parse_int(data['contract_id'], 'contract_id'),
+        'act_number': str(data['act_number']),
+        'act_date': parse_date(data['act_date'], 'act_date'),
+        'amount': parse_amount(data['amount'], 'amount')
+    }
+
+
+IMPORT_KINDS = {
+    'income-contracts': (IncomeContract, build_income_contract),
+    'expense-contracts': (ExpenseContract, build_expense_contract),
+    'cost-items': (CostItem, build_cost_item),
+    'closed-works': (ClosedWork, build_closed_work)
+}
+
+
+def read_records(stream, file_format):
+    """Записи из CSV (первая строка - заголовки) или JSONL (по объекту на строку)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig') if not isinstance(stream, io.TextIOBase) else stream
+
+    if file_format == 'csv':
+        for record in csv.DictReader(text):
+            yield record
+    elif file_format == 'jsonl':
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else {'__invalid__': line}
+    else:
+        raise ValueError('Поддерживаются только форматы csv и jsonl')
+
+
+def existing_values(column, values, *conditions):
+    """Какие из значений уже есть в БД - одним запросом на пачку"""
+    if not values:
+        return set()
+    return set(db.session.execute(
+        db.select(column).where(column.in_(values), *conditions)
+    ).scalars())
+
+
+def validate_chunk(kind, chunk, seen_numbers):
+    """Проверяет пачку строк, возвращает строки для вставки, ошибки по номерам строк
+    и номера договоров пачки. seen_numbers - номера из уже сохраненных пачек, он не меняется:
+    номера пачки добавляются к нему только после ее успешной записи"""
+    model, build = IMPORT_KINDS[kind]
+    rows, errors = [], []
+    chunk_numbers = set()
+
+    for row_number, record in chunk:
+        try:
+            if '__invalid__' in record:
+                raise RowError('Строка не является JSON-объектом')
+            rows.append((row_number, build(record)))
+        except RowError as e:
+            errors.append({'row': row_number, 'error': str(e)})
+
+    if hasattr(model, 'contract_number'):
+        numbers = {values['contract_number'] for _, values in rows}
+        taken = existing_values(model.contract_number, numbers)
+        checked = []
+        for row_number, values in rows:
+            number = values['contract_number']
+            if number in taken or number in seen_numbers or number in chunk_numbers:
+                errors.append({'row': row_number, 'error': 'Договор с таким номером уже существует'})
+            else:
+                chunk_numbers.add(number)
+                checked.append((row_number, values))
+        rows = checked
+
+    if model is ExpenseContract:
+        funding = existing_values(
+            IncomeContract.id,
+            {values['income_contract_id'] for _, values in rows},
+            IncomeContract.status == 'active',
+            IncomeContract.deleted_at.is_(None)
+        )
+        checked = []
+        for row_number, values in rows:
+            if values['income_contract_id'] in funding:
+                checked.append((row_number, values))
+            else:
+                errors.append({'row': row_number,
+                               'error': 'Указанный источник финансирования не найден или не активен'})
+        rows = checked
+
+    if model in (CostItem, ClosedWork):
+        contracts = existing_values(ExpenseContract.id, {values['contract_id'] for _, values in rows})
+        checked = []
+        for row_number, values in rows:
+            if values['contract_id'] in contracts:
+                checked.append((row_number, values))
+            else:
+                errors.append({'row': row_number, 'error': 'Договор не найден'})
+        rows = checked
+
+    return [values for _, values in rows], errors, chunk_numbers
+
+
+def insert_chunk(kind, rows):
+    model, _ = IMPORT_KINDS[kind]
+    if not rows:
+        return
+
+    # executemany одним INSERT на пачку; события маппера при этом не срабатывают,
+    # поэтому итоги по затронутым договорам пересчитываются явно
+    db.session.execute(db.insert(model), rows)
+    if model in (CostItem, ClosedWork):
+        refresh_summaries(db.session.connection(), {row['contract_id'] for row in rows})
+    elif model is ExpenseContract:
+        numbers = [row['contract_number'] for row in rows]
+        new_ids = db.session.execute(
+            db.select(ExpenseContract.id).where(ExpenseContract.contract_number.in_(numbers))
+        ).scalars().all()
+        refresh_summaries(db.session.connection(), new_ids)
+
+
+def import_records(kind, records, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Импортирует записи пачками: каждая пачка проверяется и вставляется в своей транзакции.
+
+    Строки с ошибками пропускаются и попадают в отчет, остальные строки пачки вставляются.
+    progress(обработано строк) вызывается после каждой пачки, если передан.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f'Неизвестный вид импорта: {kind}')
+
+    started = time.perf_counter()
+    report = {'kind': kind, 'total': 0, 'inserted': 0, 'errors': []}
+    seen_numbers = set()
+    chunk = []
+
+    def flush(chunk):
+        rows, errors, numbers = validate_chunk(kind, chunk, seen_numbers)
+        # Ошибки отдельных строк попадают в отчет и тогда, когда пачка не сохранилась
+        report['errors'].extend(errors)
+        try:
+            insert_chunk(kind, rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            first, last = chunk[0][0], chunk[-1][0]
+            report['errors'].append({'row': first, 'error': f'Пачка строк {first}-{last} не сохранена: {e}'})
+            return
+        report['inserted'] += len(rows)
+        seen_numbers.update(numbers)
+
+    # Номера строк считаются с 1 без учета строки заголовков CSV
+    for row_number, record in enumerate(records, start=1):
+        chunk.append((row_number, record))
+        report['total'] += 1
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+            if progress:
+                progress(report['total'])
+    if chunk:
+        flush(chunk)
+
+    report['errors'].sort(key=lambda error: error['row'])
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['inserted'] / elapsed) if elapsed else 0
+    return report
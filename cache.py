@@ -0,0 +1,256 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, upsert, CacheGeneration
+
+# Единственная строка таблицы cache_generation
+GENERATION_ROW = 1
+
+# Признак того, что в текущей транзакции сессии были изменения данных
+SESSION_WRITES_KEY = 'response_cache_writes'
+
+
+class LocalCacheBackend:
+    """LRU-кэш с TTL в памяти процесса. У каждого воркера свои записи, а поколение
+    данных в ключе общее (из БД), поэтому чужие изменения видны и здесь"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.after_fork()
+
+    def after_fork(self):
+        # Записи родителя не нужны дочернему процессу, а блокировка могла быть захвачена при fork
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def size(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class RedisCacheBackend:
+    """Общий для всех процессов кэш в Redis. Вытеснение по LRU настраивается в самом Redis"""
+
+    def __init__(self, url, prefix='finmes:cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Для RESPONSE_CACHE_BACKEND=redis необходимо установить пакет redis')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def after_fork(self):
+        # redis-py сам открывает новые соединения в дочернем процессе
+        pass
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Кэш сериализованных ответов GET-эндпоинтов.
+
+    Ключ кэша включает имя эндпоинта, строку запроса и поколение данных из таблицы
+    cache_generation. Любая транзакция с изменениями увеличивает поколение в самой
+    себе, после чего старые записи больше не читаются ни в одном процессе и
+    вытесняются по LRU/TTL. При RESPONSE_CACHE_ENABLED=False отключаются и кэш, и ETag.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+        # Один обработчик на экземпляр, а не на каждый init_app: create_app
+        # может вызываться в процессе много раз (тесты, замеры)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'local')
+        app.config.setdefault('RESPONSE_CACHE_TTL', 60)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 256)
+        app.config.setdefault('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+        self.enabled = app.config['RESPONSE_CACHE_ENABLED']
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        if app.config['RESPONSE_CACHE_BACKEND'] == 'redis':
+            self.backend = RedisCacheBackend(app.config['RESPONSE_CACHE_REDIS_URL'])
+        else:
+            self.backend = LocalCacheBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+
+        app.extensions['response_cache'] = self
+
+    def after_fork(self):
+        self.stats_lock = threading.Lock()
+        self.hits = self.misses = 0
+        if self.backend is not None:
+            self.backend.after_fork()
+
+    @staticmethod
+    def generation():
+        """Метка БД и номер поколения данных, (None, 0) до первого изменения"""
+        row = db.session.execute(
+            db.select(CacheGeneration.epoch, CacheGeneration.generation)
+            .where(CacheGeneration.id == GENERATION_ROW)
+        ).first()
+        return tuple(row) if row is not None else (None, 0)
+
+    @staticmethod
+    def bump(connection):
+        """Увеличивает поколение в транзакции connection, при необходимости создавая строку"""
+        upsert(connection, CacheGeneration,
+               [{'id': GENERATION_ROW, 'epoch': uuid.uuid4().hex, 'generation': 1}], ['id'],
+               set_={'generation': CacheGeneration.generation + 1})
+
+    def count(self, hit):
+        with self.stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0,
+            'entries': self.backend.size() if self.backend else 0,
+            'generation': self.generation()[1] if self.backend else 0
+        }
+
+    def make_key(self, name, vary=None):
+        # Значения экранируются: иначе ?client=X%26limit%3D1 совпал бы с ?client=X&limit=1
+        query = urlencode(sorted(request.args.items(multi=True)))
+        extra = f':{vary()}' if vary else ''
+        epoch, generation = self.generation()
+        return f'{name}{extra}:{epoch}.{generation}:{query}'
+
+    def cached(self, name, vary=None):
+        """Декоратор GET-эндпоинта: условный GET по ETag и кэш успешных непотоковых ответов.
+
+        ETag вычисляется из ключа кэша, то есть из поколения данных и параметров
+        запроса, поэтому на If-None-Match можно ответить 304 до выполнения запросов к БД.
+        vary - функция, значение которой добавляется к ключу (например, текущий месяц).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                key = self.make_key(name, vary)
+                etag = hashlib.sha1(key.encode()).hexdigest()
+
+                if etag in request.if_none_match:
+                    response = make_response('', 304)
+                    self.set_validators(response, etag)
+                    return response
+
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.count(hit=True)
+                    response = make_response(entry['body'], 200)
+                    response.mimetype = entry['mimetype']
+                    response.headers['X-Cache'] = 'HIT'
+                    self.set_validators(response, etag)
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                self.count(hit=False)
+                if not response.is_streamed:
+                    self.backend.set(key, {
+                        'body': response.get_data(),
+                        'mimetype': response.mimetype
+                    }, self.ttl)
+                response.headers['X-Cache'] = 'MISS'
+                self.set_validators(response, etag)
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def set_validators(response, etag):
+        # no-cache: браузер хранит ответ, но перед использованием проверяет его по ETag
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+
+
+cache = ResponseCache()
+
+
+# Поколение данных увеличивается в каждой транзакции, которая что-то изменила.
+# Состояние фоновых задач пишется через соединение движка, а не сессию, и поколение не меняет
+
+@event.listens_for(Session, 'after_flush')
+def remember_flushed_writes(session, flush_context):
+    session.info[SESSION_WRITES_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def remember_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[SESSION_WRITES_KEY] = True
+
+
+@event.listens_for(Session, 'before_commit')
+def bump_generation_before_commit(session):
+    if cache.backend is None:
+        return
+    # Изменения, еще не отправленные в БД, отправляются сейчас: поколение должно
+    # увеличиться в той же транзакции, последним запросом перед COMMIT
+    session.flush()
+    if session.info.pop(SESSION_WRITES_KEY, False):
+        cache.bump(session.connection())
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_rolled_back_writes(session):
+    session.info.pop(SESSION_WRITES_KEY, None)
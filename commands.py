@@ -0,0 +1,73 @@
+from flask import Blueprint, current_app
+from summary import rebuild_summaries, check_summaries
+from storage import GC_GRACE_SECONDS, migrate_legacy_files, collect_garbage
+from bulk_import import IMPORT_KINDS, read_records, import_records
+from app import setup_schema
+import click
+
+
+# Команды CLI: cli_group=None оставляет их на верхнем уровне (flask import-data)
+bp = Blueprint('commands', __name__, cli_group=None)
+
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Создать таблицы и индексы, заполнить итоги по договорам"""
+    setup_schema()
+    click.echo('Схема БД создана')
+
+
+@bp.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=1000, show_default=True, help='Строк в одной транзакции')
+def import_data_command(kind, path, chunk_size):
+    """Массовый импорт записей из CSV или JSONL файла"""
+    file_format = 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    with open(path, 'rb') as stream:
+        report = import_records(kind, read_records(stream, file_format), chunk_size)
+
+    for error in report['errors']:
+        click.echo(f"Строка {error['row']}: {error['error']}", err=True)
+    click.echo(f"Загружено {report['inserted']} из {report['total']} строк "
+               f"за {report['elapsed_seconds']} с ({report['rows_per_second']} строк/с)")
+
+
+@bp.cli.command('gc-files')
+@click.option('--grace', default=GC_GRACE_SECONDS, show_default=True,
+              help='Не трогать файлы моложе указанного числа секунд')
+@click.option('--dry-run', is_flag=True, help='Только показать, что будет удалено')
+def gc_files_command(grace, dry_run):
+    """Удалить файлы актов, на которые не ссылается ни один акт"""
+    report = collect_garbage(current_app.config['UPLOAD_FOLDER'], grace, dry_run)
+    for digest in report['missing']:
+        click.echo(f'Файл {digest} используется актами, но отсутствует в хранилище', err=True)
+    click.echo(f"{'Будет удалено' if dry_run else 'Удалено'}: файлов без ссылок {report['removed_blobs']}, "
+               f"лишних файлов {report['removed_orphans']}, временных {report['removed_temp']} "
+               f"({report['freed_bytes']} байт); исправлено счетчиков ссылок: {report['recounted']}")
+
+
+@bp.cli.command('migrate-files')
+def migrate_files_command():
+    """Перенести файлы старых актов в хранилище по содержимому"""
+    moved = migrate_legacy_files(current_app.config['UPLOAD_FOLDER'])
+    click.echo(f'Перенесено файлов актов: {moved}')
+
+
+@bp.cli.command('rebuild-summary')
+def rebuild_summary_command():
+    """Пересчитать таблицу contract_summary с нуля"""
+    count = rebuild_summaries()
+    click.echo(f'Итоги пересчитаны для {count} договоров')
+
+
+@bp.cli.command('check-summary')
+def check_summary_command():
+    """Сверить contract_summary с затратами и актами КС"""
+    mismatches = check_summaries()
+    for mismatch in mismatches:
+        click.echo(f"Договор {mismatch['contract_id']}: "
+                   f"в таблице {mismatch['stored']}, ожидается {mismatch['expected']}")
+    if mismatches:
+        raise click.ClickException(f'Найдено расхождений: {len(mismatches)}. Выполните flask rebuild-summary')
+    click.echo('Расхождений не найдено')
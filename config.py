@@ -0,0 +1,101 @@
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(uri):
+    """Параметры пула соединений SQLAlchemy для выбранной БД.
+
+    Для SQLite в памяти SQLAlchemy использует собственный пул на одно соединение,
+    размер пула для него не задается.
+    """
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        return {}
+    return {
+        'pool_size': env_int('DB_POOL_SIZE', 5),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 3600),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', not uri.startswith('sqlite'))
+    }
+
+
+def database_uri():
+    uri = os.environ.get('DATABASE_URL', 'sqlite:///finance.db')
+    # Старый формат адреса PostgreSQL, который SQLAlchemy 1.4+ не принимает
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+class Config:
+    """Настройки приложения из переменных окружения, по умолчанию - локальный SQLite"""
+
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+
+    # Создавать таблицы при запуске (db.create_all). По умолчанию только для SQLite,
+    # схема PostgreSQL ведется миграциями: flask db upgrade
+    AUTO_CREATE_SCHEMA = env_bool('AUTO_CREATE_SCHEMA', SQLALCHEMY_DATABASE_URI.startswith('sqlite'))
+
+    # PRAGMA, которые выполняются на каждом новом соединении с SQLite.
+    # WAL позволяет читать во время записи, synchronous=NORMAL в режиме WAL
+    # не теряет целостность при сбое процесса, busy_timeout заставляет писателей
+    # ждать освобождения блокировки вместо ошибки "database is locked"
+    SQLITE_TUNING = env_bool('SQLITE_TUNING', True)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        # Отрицательное значение - размер кэша страниц в КиБ
+        'cache_size': env_int('SQLITE_CACHE_SIZE_KB', -64 * 1024),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    }
+
+    # Папка файлов актов (хранилище по содержимому)
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads/closed_works')
+
+    # Отдача файлов актов веб-сервером: X-Sendfile (Apache, lighttpd) или
+    # X-Accel-Redirect (nginx, значение - internal location, указывающий на папку загрузок)
+    USE_X_SENDFILE = env_bool('USE_X_SENDFILE', False)
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')
+
+    # Кэш ответов GET. Поколение данных хранится в БД (cache_generation), поэтому
+    # local корректен и при нескольких воркерах, только записи у каждого свои;
+    # redis - одни записи на все процессы
+    RESPONSE_CACHE_ENABLED = env_bool('RESPONSE_CACHE_ENABLED', True)
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'local')
+    RESPONSE_CACHE_TTL = env_int('RESPONSE_CACHE_TTL', 60)
+    RESPONSE_CACHE_MAX_ENTRIES = env_int('RESPONSE_CACHE_MAX_ENTRIES', 256)
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Метрики запросов (/api/metrics) и заголовок Server-Timing
+    METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+    METRICS_SERVER_TIMING = env_bool('METRICS_SERVER_TIMING', True)
+
+    # Кэш пользователей сессий в памяти процесса: /api/auth/current, проверки ролей.
+    # В других воркерах изменения пользователя видны не позже чем через TTL секунд
+    USER_CACHE_TTL = env_int('USER_CACHE_TTL', 30)
+    USER_CACHE_MAX_ENTRIES = env_int('USER_CACHE_MAX_ENTRIES', 1024)
+
+    # Хэширование паролей: метод werkzeug (scrypt, scrypt:16384:8:1, pbkdf2:sha256:600000).
+    # Хэши с другими параметрами пересчитываются при следующем входе пользователя
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = env_int('PASSWORD_SALT_LENGTH', 16)
+    # Проверка паролей при входе: потоков на процесс и сколько входов может ждать очереди,
+    # остальные получают 503
+    PASSWORD_VERIFY_WORKERS = env_int('PASSWORD_VERIFY_WORKERS', 2)
+    PASSWORD_VERIFY_QUEUE = env_int('PASSWORD_VERIFY_QUEUE', 16)
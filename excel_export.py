@@ -0,0 +1,247 @@
+from datetime import datetime
+from decimal import Decimal
+from models import db, IncomeContract, ExpenseContract
+from queries import (
+    actual_contracts_query, planning_contracts_query, apply_contract_filters, count_query, iter_balance_groups
+)
+
+# Числа пишутся в ячейки как числа, а рубли задаются форматом ячейки
+CURRENCY_FORMAT = '#,##0.00 "₽"'
+EXPORT_BATCH_SIZE = 1000
+
+MONTH_NAMES_RU = [
+    'январь', 'февраль', 'март', 'апрель', 'май', 'июнь',
+    'июль', 'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь'
+]
+
+EXPORT_TITLES = {
+    'income': 'Доходные договоры',
+    'planning': 'Планирование финансирования по расходным договорам',
+    'actual': 'Фактическое финансирование по расходным договорам',
+    'balance': 'Баланс по договорам'
+}
+
+EXPORT_FILENAMES = {
+    'income': 'доходные_договоры',
+    'planning': 'планирование_финансирования',
+    'actual': 'фактическое_финансирование',
+    'balance': 'баланс'
+}
+
+
+def month_label(month):
+    return f'{MONTH_NAMES_RU[month.month - 1]} {month.year}'
+
+
+def type_contract_short(type_contract):
+    return 'РП' if type_contract == 'ремонтная программа' else 'ИП'
+
+
+def contract_dates(contract):
+    return f"Закл: {contract.start_date.strftime('%Y-%m-%d')}\nОконч: {contract.end_date.strftime('%Y-%m-%d')}"
+
+
+def advance_label(contract):
+    return f"{contract.advance_percentage}%" if contract.advance_percentage else ''
+
+
+def income_columns():
+    return [
+        ('Номер договора', 20, False, lambda row: row[0].contract_number),
+        ('Дата заключения', 12, False, lambda row: row[0].contract_date.strftime('%Y-%m-%d')),
+        ('Контрагент', 20, False, lambda row: row[0].client),
+        ('Стоимость договора', 15, True, lambda row: row[0].contract_amount),
+        ('Оплачено', 15, True, lambda row: row[0].paid_amount or Decimal('0'))
+    ]
+
+
+def planning_columns(months):
+    return [
+        ('Вид', 12, False, lambda row: type_contract_short(row[0].type_contract)),
+        ('Номер договора', 20, False, lambda row: row[0].contract_number),
+        ('Контрагент', 20, False, lambda row: row[0].client),
+        ('Даты договора', 25, False, lambda row: contract_dates(row[0])),
+        ('Наименование', 30, False, lambda row: row[0].name),
+        ('Сумма договора', 15, True, lambda row: row[0].contract_amount),
+        ('Аванс', 12, False, lambda row: advance_label(row[0])),
+        ('Авансирование', 15, True,
+         lambda row: (row[0].contract_amount * (row[0].advance_percentage or 0)) / 100),
+        (month_label(months[0]), 15, True, lambda row: row[1]),
+        (month_label(months[1]), 15, True, lambda row: row[2]),
+        (month_label(months[2]), 15, True, lambda row: row[3]),
+        ('Сумма за 3 месяца', 15, True, lambda row: row[1] + row[2] + row[3])
+    ]
+
+
+def actual_columns():
+    return [
+        ('Вид', 12, False, lambda row: type_contract_short(row[0].type_contract)),
+        ('Номер договора', 20, False, lambda row: row[0].contract_number),
+        ('Контрагент', 20, False, lambda row: row[0].client),
+        ('Даты договора', 25, False, lambda row: contract_dates(row[0])),
+        ('Наименование', 30, False, lambda row: row[0].name),
+        ('Сумма договора', 15, True, lambda row: row[0].contract_amount),
+        ('Аванс', 12, False, lambda row: advance_label(row[0])),
+        ('Оплата от ЛОЭСК', 15, True, lambda row: row[0].payment_loesk or Decimal('0')),
+        ('Платежи подрядчика', 15, True, lambda row: row[1]),
+        ('Закрыто работ', 15, True, lambda row: row[2]),
+        ('Сальдо', 15, True, lambda row: row[3]),
+        ('Остаток финансирования', 15, True, lambda row: row[4])
+    ]
+
+
+def load_openpyxl():
+    """openpyxl нужен только для выгрузки, поэтому импортируется при первом использовании"""
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError('Для выгрузки в Excel необходимо установить пакет openpyxl')
+    return openpyxl
+
+
+def new_sheet(column_widths):
+    """Лист в режиме write_only и фабрики ячеек заголовка и значения.
+
+    В режиме write_only строки сбрасываются на диск сразу, поэтому память
+    не растет с размером выгрузки.
+    """
+    openpyxl = load_openpyxl()
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Данные')
+    for index, width in enumerate(column_widths, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+
+    def title_cell(value, size=16):
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.font = Font(bold=True, size=size)
+        return cell
+
+    def value_cell(value, is_currency):
+        cell = WriteOnlyCell(sheet, value=value)
+        if is_currency:
+            cell.number_format = CURRENCY_FORMAT
+        return cell
+
+    return workbook, sheet, title_cell, value_cell
+
+
+def write_table(output, title, columns, rows, progress=None):
+    workbook, sheet, title_cell, value_cell = new_sheet([width for _, width, _, _ in columns])
+
+    sheet.append([title_cell(title)])
+    sheet.append([])
+    sheet.append([title_cell(label, 12) for label, _, _, _ in columns])
+
+    count = 0
+    for row in rows:
+        sheet.append([value_cell(getter(row), is_currency) for _, _, is_currency, getter in columns])
+        count += 1
+        if progress and count % EXPORT_BATCH_SIZE == 0:
+            progress(count)
+
+    workbook.save(output)
+    return count
+
+
+def write_balance(output, progress=None):
+    columns = [
+        'Договор', 'Контрагент', 'Сумма', 'Оплачено',
+        'Договор', 'Сумма', 'Оплачено',
+        'Стоимость', 'Оплачено'
+    ]
+    currency_columns = {2, 3, 5, 6, 7, 8}
+    workbook, sheet, title_cell, value_cell = new_sheet([20, 25, 15, 15, 20, 15, 15, 15, 15])
+
+    sheet.append([title_cell(EXPORT_TITLES['balance'])])
+    sheet.append([])
+    sheet.append([title_cell(label, 12) for label in [
+        'ДОХОДНЫЕ ДОГОВОРЫ', '', '', '', 'РАСХОДНЫЕ ДОГОВОРЫ', '', '', 'САЛЬДО', '']])
+    sheet.append([title_cell(label, 11) for label in columns])
+
+    def append(values):
+        sheet.append([
+            value_cell(value, index in currency_columns and value != '')
+            for index, value in enumerate(values)
+        ])
+
+    totals = [Decimal('0')] * 4
+    count = 0
+    for income, related_expenses in iter_balance_groups(EXPORT_BATCH_SIZE):
+        income_paid = income.paid_amount or Decimal('0')
+        total_expense = sum((exp.contract_amount for exp in related_expenses), Decimal('0'))
+        total_paid = sum((exp.payment_loesk or Decimal('0') for exp in related_expenses), Decimal('0'))
+
+        first = related_expenses[0] if related_expenses else None
+        append([
+            income.contract_number, income.client, income.contract_amount, income_paid,
+            first.contract_number if first else '',
+            first.contract_amount if first else '',
+            (first.payment_loesk or Decimal('0')) if first else '',
+            income.contract_amount - total_expense, income_paid - total_paid
+        ])
+        for exp in related_expenses[1:]:
+            append(['', '', '', '', exp.contract_number, exp.contract_amount,
+                    exp.payment_loesk or Decimal('0'), '', ''])
+
+        totals[0] += income.contract_amount
+        totals[1] += income_paid
+        totals[2] += total_expense
+        totals[3] += total_paid
+        count += 1
+        if progress and count % EXPORT_BATCH_SIZE == 0:
+            progress(count)
+
+    append(['ОБЩИЙ БАЛАНС:', '', totals[0], totals[1], '', totals[2], totals[3],
+            totals[0] - totals[2], totals[1] - totals[3]])
+
+    workbook.save(output)
+    return count
+
+
+def iter_export_rows(query):
+    yield from db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+
+def write_export(kind, output, filters=None, months=None, progress=None):
+    """Записывает выгрузку в output (путь или файл) и возвращает количество выгруженных договоров.
+
+    progress(done, total) вызывается по мере записи, если передан (для фоновых задач).
+    """
+    filters = filters or {}
+
+    def report_progress(query):
+        if progress is None:
+            return None
+        total = db.session.execute(count_query(query)).scalar_one()
+        return lambda done: progress(done, total)
+
+    if kind == 'balance':
+        incomes = db.select(IncomeContract.id).where(IncomeContract.deleted_at.is_(None))
+        return write_balance(output, report_progress(incomes))
+
+    if kind == 'income':
+        query = db.select(IncomeContract).where(IncomeContract.deleted_at.is_(None))
+        query = apply_contract_filters(query, IncomeContract, IncomeContract.contract_date, filters)
+        return write_table(output, EXPORT_TITLES[kind], income_columns(),
+                           iter_export_rows(query.order_by(IncomeContract.id)), report_progress(query))
+
+    if kind == 'planning':
+        query = planning_contracts_query(months)
+        columns = planning_columns(months)
+    elif kind == 'actual':
+        query = actual_contracts_query()
+        columns = actual_columns()
+    else:
+        raise ValueError(f'Неизвестный вид выгрузки: {kind}')
+
+    query = apply_contract_filters(query, ExpenseContract, ExpenseContract.start_date, filters)
+    return write_table(output, EXPORT_TITLES[kind], columns,
+                       iter_export_rows(query.order_by(ExpenseContract.id)), report_progress(query))
+
+
+def export_download_name(kind):
+    return f"{EXPORT_FILENAMES[kind]}_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
@@ -0,0 +1,89 @@
+"""Настройки gunicorn, читаются автоматически при запуске из корня проекта: gunicorn wsgi:app
+
+Плавный перезапуск: kill -HUP <мастер> запускает новые рабочие процессы и дает
+старым завершить текущие запросы за graceful_timeout. При preload_app код
+приложения загружается один раз в мастере, поэтому для обновления кода нужен
+kill -USR2 (новый мастер) или полный перезапуск.
+
+Фоновые задачи (jobs.py) выполняются потоками того рабочего процесса, который их
+принял. Перезапуск по max_requests откладывается, пока у процесса есть задачи,
+а завершающийся процесс ждет их до JOBS_WAIT_TIMEOUT секунд, продолжая сообщать
+мастеру, что жив. При HUP и остановке мастер ждет только graceful_timeout:
+прерванные задачи отмечаются как завершенные с ошибкой.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from config import Config, env_bool, env_int
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5002')
+
+# Процессы используют все ядра, потоки внутри процесса закрывают ожидание БД и сети.
+# Кэш ответов корректен при любом числе процессов: поколение данных хранится в БД
+workers = env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+threads = env_int('GUNICORN_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Приложение создается в мастере до fork: быстрее старт рабочих процессов и общая память.
+# Соединения с БД, открытые мастером, рабочие процессы сбрасывают сразу после fork (create_app)
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Рабочий процесс перезапускается после max_requests запросов (с разбросом,
+# чтобы процессы не перезапускались одновременно) - защита от утечек памяти.
+# Пока процесс выполняет фоновые задачи, перезапуск откладывается (pre_request)
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Сколько завершающийся рабочий процесс ждет своих фоновых задач (worker_exit)
+JOBS_WAIT_TIMEOUT = env_int('GUNICORN_JOBS_WAIT_TIMEOUT', 600)
+
+timeout = env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+
+
+def on_starting(server):
+    """Схема создается один раз до запуска рабочих процессов, а не параллельно в каждом.
+
+    Команда выполняется отдельным процессом, чтобы мастер не импортировал код
+    приложения без preload_app и HUP подхватывал новый код.
+    """
+    if Config.AUTO_CREATE_SCHEMA:
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], check=True)
+
+
+def post_worker_init(worker):
+    # worker.tmp (файл, по которому мастер видит, что процесс жив) закрывается
+    # до вызова worker_exit, поэтому для ожидания задач нужен свой дескриптор
+    worker.heartbeat_fd = os.dup(worker.tmp.fileno())
+
+
+def pre_request(worker, req):
+    """Не дает процессу перезапуститься по max_requests, пока у него есть фоновые задачи"""
+    from jobs import jobs
+    worker.log.debug('%s %s', req.method, req.path)
+    if worker.nr + 1 >= worker.max_requests and jobs.active_count():
+        worker.max_requests = worker.nr + 2
+
+
+def worker_exit(server, worker):
+    """Завершающийся процесс ждет своих фоновых задач (задачу, принятую последним
+    запросом перед перезапуском, pre_request не видит). Без отметок о том, что
+    процесс жив, мастер убил бы его через timeout секунд вместе с задачами.
+    """
+    # Мастер тоже вызывает worker_exit для уже завершившихся процессов
+    if os.getpid() != worker.pid or not hasattr(worker, 'heartbeat_fd'):
+        return
+    from jobs import jobs
+    deadline = time.monotonic() + JOBS_WAIT_TIMEOUT
+    while jobs.active_count() and time.monotonic() < deadline:
+        # Как WorkerTmp.notify: мастер сравнивает время изменения файла с time.monotonic()
+        now = time.monotonic()
+        os.utime(worker.heartbeat_fd, (now, now))
+        time.sleep(1)
@@ -0,0 +1,220 @@
+import inspect
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Job
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Прогресс пишется в БД не чаще раза в PROGRESS_INTERVAL секунд
+PROGRESS_INTERVAL = 1.0
+
+
+def current_worker():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def is_worker_alive(worker):
+    """Жив ли процесс, взявший задачу. Процессы других хостов считаются живыми"""
+    host, _, pid = (worker or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def update_job(job_id, **values):
+    # Состояние задачи пишется отдельным соединением: оно не смешивается с транзакцией
+    # самой задачи и не сбрасывает кэш ответов, как изменения данных
+    with db.engine.begin() as connection:
+        connection.execute(db.update(Job).where(Job.id == job_id).values(**values))
+
+
+class JobContext:
+    """Передается задаче: id задачи, путь для файла результата и отчет о ходе выполнения"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.reported_at = 0
+
+    def result_path(self, extension):
+        return os.path.join(self.queue.results_folder, f'{self.job_id}.{extension}')
+
+    def progress(self, done, total=None, message=None):
+        now = time.monotonic()
+        if now - self.reported_at < PROGRESS_INTERVAL:
+            return
+        self.reported_at = now
+        values = {'message': message} if message else {}
+        if total:
+            # 100% ставится только при успешном завершении
+            values['progress'] = min(99, int(done * 100 / total))
+        if values:
+            update_job(self.job_id, **values)
+
+
+class JobQueue:
+    """Очередь фоновых задач в пуле потоков процесса, состояние задач хранится в таблице jobs.
+
+    Внешний брокер не нужен: задача выполняется в том процессе, который ее принял,
+    а статус и результат доступны любому процессу через БД.
+    """
+
+    def __init__(self, app=None):
+        self.tasks = {}
+        self.executor = None
+        self.lock = threading.Lock()
+        self.active = 0
+        self.workers = 2
+        self.retention = 24 * 3600
+        self.results_folder = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOB_RETENTION_SECONDS', 24 * 3600)
+        app.config.setdefault('JOB_RESULTS_FOLDER', os.path.join(app.instance_path, 'jobs'))
+
+        self.workers = app.config['JOB_WORKERS']
+        self.retention = app.config['JOB_RETENTION_SECONDS']
+        self.results_folder = app.config['JOB_RESULTS_FOLDER']
+        app.extensions['jobs'] = self
+
+    def after_fork(self):
+        # Потоки пула не переживают fork: дочерний процесс создаст свой пул
+        self.executor = None
+        self.lock = threading.Lock()
+        self.active = 0
+
+    def task(self, kind, public=True):
+        """Регистрирует функцию задачи: task(context, **params) -> результат (JSON).
+
+        public - задачу можно поставить через POST /api/jobs, иначе только из кода
+        (например, импорт, которому нужен загруженный файл).
+        """
+        def decorator(function):
+            self.tasks[kind] = (function, public)
+            return function
+        return decorator
+
+    def is_public(self, kind):
+        return kind in self.tasks and self.tasks[kind][1]
+
+    def get_executor(self):
+        # Пул создается при первой задаче, то есть уже в рабочем процессе, а не до fork
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            return self.executor
+
+    def active_count(self):
+        """Задачи, принятые этим процессом и еще не завершенные (gunicorn ждет их перед перезапуском воркера)"""
+        with self.lock:
+            return self.active
+
+    def submit(self, kind, params=None):
+        if kind not in self.tasks:
+            raise ValueError(f'Неизвестный вид задачи: {kind}')
+        params = params or {}
+        self.check_params(kind, params)
+
+        os.makedirs(self.results_folder, exist_ok=True)
+        self.purge()
+        job_id = uuid.uuid4().hex
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(Job).values(
+                id=job_id, kind=kind, status=QUEUED, progress=0,
+                params=params, worker=current_worker(), created_at=datetime.utcnow()
+            ))
+
+        executor = self.get_executor()
+        with self.lock:
+            self.active += 1
+        try:
+            executor.submit(self.run, current_app._get_current_object(), job_id)
+        except BaseException:
+            with self.lock:
+                self.active -= 1
+            raise
+        return self.get(job_id)
+
+    def check_params(self, kind, params):
+        """Параметры должны подходить к сигнатуре функции задачи, иначе задача
+        упала бы уже в пуле с TypeError. Ошибка - ValueError для ответа 400"""
+        if not isinstance(params, dict):
+            raise ValueError('Параметры задачи должны быть объектом')
+        function, _ = self.tasks[kind]
+        try:
+            inspect.signature(function).bind(None, **params)
+        except TypeError as e:
+            raise ValueError(f'Некорректные параметры задачи {kind}: {e}')
+
+    def run(self, app, job_id):
+        try:
+            self.run_job(app, job_id)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def run_job(self, app, job_id):
+        with app.app_context():
+            job = db.session.get(Job, job_id)
+            kind, params = job.kind, dict(job.params or {})
+            function, _ = self.tasks[kind]
+            db.session.rollback()
+
+            update_job(job_id, status=RUNNING, started_at=datetime.utcnow())
+            try:
+                result = function(JobContext(self, job_id), **params)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception('Ошибка фоновой задачи %s (%s)', job_id, kind)
+                update_job(job_id, status=FAILED, error=str(e), finished_at=datetime.utcnow())
+            else:
+                update_job(job_id, status=SUCCEEDED, progress=100, result=result, finished_at=datetime.utcnow())
+
+    def get(self, job_id):
+        job = db.session.get(Job, job_id, populate_existing=True)
+        if job is None:
+            return None
+        if job.status in (QUEUED, RUNNING) and not is_worker_alive(job.worker):
+            update_job(job_id, status=FAILED, error='Задача прервана: процесс, выполнявший ее, завершился',
+                       finished_at=datetime.utcnow())
+            job = db.session.get(Job, job_id, populate_existing=True)
+        return job
+
+    def purge(self):
+        """Удаляет завершенные задачи старше срока хранения вместе с файлами результатов"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        with db.engine.begin() as connection:
+            expired = connection.execute(
+                db.select(Job.id).where(Job.status.in_([SUCCEEDED, FAILED]), Job.finished_at < cutoff)
+            ).scalars().all()
+            if not expired:
+                return
+            connection.execute(db.delete(Job).where(Job.id.in_(expired)))
+
+        expired = set(expired)
+        for filename in os.listdir(self.results_folder):
+            if filename.split('.', 1)[0] in expired:
+                os.remove(os.path.join(self.results_folder, filename))
+
+
+jobs = JobQueue()
@@ -0,0 +1,207 @@
+import threading
+import time
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Счетчики текущего запроса хранятся в environ: он общий для обработчика
+# и для потокового ответа, который выполняется после after_request
+ENVIRON_KEY = 'finmes.metrics'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные счетчики по границам, сумма и количество"""
+
+    def __init__(self, name, description, buckets, labels):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+
+    def observe(self, label_values, value):
+        counts, total = self.series.get(label_values, (None, None))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+            total = [0, 0]
+            self.series[label_values] = (counts, total)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        total[0] += value
+        total[1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total) in sorted(self.series.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {round(total[0], 6)}')
+            lines.append(f'{self.name}_count{{{labels}}} {total[1]}')
+        return lines
+
+
+def format_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.size = 0
+
+
+class Metrics:
+    """Метрики запросов: время ответа, число SQL-запросов и время в БД, размер ответа.
+
+    Значения копятся в памяти процесса и отдаются эндпоинтом /api/metrics в текстовом
+    формате Prometheus. У каждого ответа есть заголовок Server-Timing с временем
+    обработки и временем SQL. Для потоковых ответов заголовок отражает только время
+    до начала передачи, а метрики записываются после отправки последнего блока.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.server_timing = True
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        labels = ('method', 'endpoint')
+        self.requests = {}
+        self.latency = Histogram(
+            'finmes_http_request_duration_seconds', 'Время обработки запроса', LATENCY_BUCKETS, labels)
+        self.queries = Histogram(
+            'finmes_db_queries_per_request', 'Число SQL-запросов на один HTTP-запрос', QUERY_COUNT_BUCKETS, labels)
+        self.db_time = Histogram(
+            'finmes_db_duration_seconds', 'Время выполнения SQL за один HTTP-запрос', DB_TIME_BUCKETS, labels)
+        self.size = Histogram(
+            'finmes_http_response_size_bytes', 'Размер тела ответа', SIZE_BUCKETS, labels)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_SERVER_TIMING', True)
+
+        self.enabled = app.config['METRICS_ENABLED']
+        self.server_timing = app.config['METRICS_SERVER_TIMING']
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        # Замер начинается раньше остальных обработчиков before_request
+        app.before_request_funcs.setdefault(None, []).insert(0, self.start_request)
+        app.after_request(self.finish_request)
+
+    def start_request(self):
+        request.environ[ENVIRON_KEY] = RequestStats()
+
+    def finish_request(self, response):
+        stats = request.environ.get(ENVIRON_KEY)
+        if stats is None:
+            return response
+
+        if self.server_timing:
+            elapsed = (time.perf_counter() - stats.started) * 1000
+            response.headers.add(
+                'Server-Timing', f'db;dur={stats.db_time * 1000:.1f};desc="SQL x{stats.queries}"')
+            response.headers.add('Server-Timing', f'app;dur={elapsed:.1f}')
+
+        rule = request.url_rule
+        labels = (request.method, rule.rule if rule is not None else 'unmatched')
+        status = response.status_code
+
+        if response.content_length is not None:
+            stats.size = response.content_length
+        elif response.is_streamed:
+            # Тело еще не сформировано: считаем его размер по ходу передачи
+            response.response = self.count_bytes(response.response, stats)
+        else:
+            stats.size = response.calculate_content_length() or 0
+        response.call_on_close(lambda: self.record(labels, status, stats))
+        return response
+
+    @staticmethod
+    def count_bytes(chunks, stats):
+        for chunk in chunks:
+            stats.size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+
+    def record(self, labels, status, stats):
+        elapsed = time.perf_counter() - stats.started
+        with self.lock:
+            key = labels + (str(status),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, elapsed)
+            self.queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.db_time)
+            self.size.observe(labels, stats.size)
+
+    def render(self):
+        """Все метрики процесса в текстовом формате Prometheus"""
+        lines = [
+            '# HELP finmes_process_start_time_seconds Время запуска процесса',
+            '# TYPE finmes_process_start_time_seconds gauge',
+            f'finmes_process_start_time_seconds {self.started_at:.3f}',
+            '# HELP finmes_http_requests_total Число обработанных запросов',
+            '# TYPE finmes_http_requests_total counter'
+        ]
+        with self.lock:
+            for label_values, count in sorted(self.requests.items()):
+                labels = format_labels(('method', 'endpoint', 'status'), label_values)
+                lines.append(f'finmes_http_requests_total{{{labels}}} {count}')
+            for histogram in (self.latency, self.queries, self.db_time, self.size):
+                lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+# Число и время SQL-запросов считаются для всех движков, но только внутри HTTP-запроса
+
+def current_stats():
+    if not has_request_context():
+        return None
+    return request.environ.get(ENVIRON_KEY)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def drop_query_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_query_started'):
+        connection.info['metrics_query_started'].pop()
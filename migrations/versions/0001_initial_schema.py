@@ -0,0 +1,147 @@
+"""Исходная схема БД
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 18:55:55.601341
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('income_contracts',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('contract_number', sa.String(length=50), nullable=False),
+    sa.Column('contract_date', sa.DateTime(), nullable=False),
+    sa.Column('client', sa.String(length=200), nullable=False),
+    sa.Column('contract_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('paid_amount', sa.Numeric(precision=15, scale=2), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('contract_number')
+    )
+    with op.batch_alter_table('income_contracts', schema=None) as batch_op:
+        batch_op.create_index('ix_income_contracts_live', ['id'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+        batch_op.create_index('ix_income_contracts_live_status', ['status'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('expense_contracts',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('contract_number', sa.String(length=50), nullable=False),
+    sa.Column('type_contract', sa.String(length=100), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('name', sa.String(length=300), nullable=False),
+    sa.Column('client', sa.String(length=200), nullable=False),
+    sa.Column('contract_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('advance_percentage', sa.Numeric(precision=5, scale=2), nullable=True),
+    sa.Column('payment_loesk', sa.Numeric(precision=15, scale=2), nullable=True),
+    sa.Column('income_contract_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('is_mes', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['income_contract_id'], ['income_contracts.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('contract_number')
+    )
+    with op.batch_alter_table('expense_contracts', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_contracts_live_income', ['income_contract_id'], unique=False, sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+
+    op.create_table('cal_plan',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('iddog', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('plopl', sa.Numeric(precision=15, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['iddog'], ['expense_contracts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cal_plan', schema=None) as batch_op:
+        batch_op.create_index('ix_cal_plan_iddog_date', ['iddog', 'date'], unique=False)
+
+    op.create_table('closed_works',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contract_id', sa.Integer(), nullable=False),
+    sa.Column('act_number', sa.String(length=100), nullable=False),
+    sa.Column('act_date', sa.DateTime(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contract_id'], ['expense_contracts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('closed_works', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_closed_works_contract_id'), ['contract_id'], unique=False)
+
+    op.create_table('contract_summary',
+    sa.Column('contract_id', sa.Integer(), nullable=False),
+    sa.Column('cost_items_total', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('closed_works_total', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('remaining_funding', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contract_id'], ['expense_contracts.id'], ),
+    sa.PrimaryKeyConstraint('contract_id')
+    )
+    op.create_table('cost_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contract_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('kontragent', sa.String(length=200), nullable=False),
+    sa.Column('category', sa.String(length=200), nullable=False),
+    sa.Column('purpose', sa.String(length=200), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['contract_id'], ['expense_contracts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cost_items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cost_items_contract_id'), ['contract_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cost_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cost_items_contract_id'))
+
+    op.drop_table('cost_items')
+    op.drop_table('contract_summary')
+    with op.batch_alter_table('closed_works', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_closed_works_contract_id'))
+
+    op.drop_table('closed_works')
+    with op.batch_alter_table('cal_plan', schema=None) as batch_op:
+        batch_op.drop_index('ix_cal_plan_iddog_date')
+
+    op.drop_table('cal_plan')
+    with op.batch_alter_table('expense_contracts', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_contracts_live_income', sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+
+    op.drop_table('expense_contracts')
+    op.drop_table('users')
+    with op.batch_alter_table('income_contracts', schema=None) as batch_op:
+        batch_op.drop_index('ix_income_contracts_live_status', sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+        batch_op.drop_index('ix_income_contracts_live', sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL'))
+
+    op.drop_table('income_contracts')
@@ -0,0 +1,30 @@
+"""Хранилище файлов актов по содержимому
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 19:07:20.806291
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('file_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+
+
+def downgrade():
+    op.drop_table('file_blobs')
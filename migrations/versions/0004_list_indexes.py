@@ -0,0 +1,33 @@
+"""Индексы списков договоров
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+LIVE_ROWS = sa.text('deleted_at IS NULL')
+
+
+def upgrade():
+    op.create_index('ix_income_contracts_live_contract_date', 'income_contracts', ['contract_date', 'id'],
+                    unique=False, sqlite_where=LIVE_ROWS, postgresql_where=LIVE_ROWS)
+    op.create_index('ix_expense_contracts_live', 'expense_contracts', ['id'],
+                    unique=False, sqlite_where=LIVE_ROWS, postgresql_where=LIVE_ROWS)
+    op.create_index('ix_expense_contracts_live_start_date', 'expense_contracts', ['start_date', 'id'],
+                    unique=False, sqlite_where=LIVE_ROWS, postgresql_where=LIVE_ROWS)
+
+
+def downgrade():
+    op.drop_index('ix_expense_contracts_live_start_date', table_name='expense_contracts')
+    op.drop_index('ix_expense_contracts_live', table_name='expense_contracts')
+    op.drop_index('ix_income_contracts_live_contract_date', table_name='income_contracts')
@@ -0,0 +1,23 @@
+"""Индекс cal_plan по дате для окна планирования
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_cal_plan_date_iddog_plopl', 'cal_plan', ['date', 'iddog', 'plopl'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_cal_plan_date_iddog_plopl', table_name='cal_plan')
@@ -1,26 +1,76 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 from decimal import Decimal
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import passwords
 
 db = SQLAlchemy()
 
 
+def ensure_indexes():
+    """Создает объявленные в моделях индексы, которых еще нет в БД.
+
+    db.create_all() не добавляет индексы к уже существующим таблицам,
+    поэтому для старых файлов finance.db индексы создаются здесь.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def configure_sqlite(engine, pragmas):
+    """Выполняет PRAGMA на каждом новом соединении пула, если БД - SQLite"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value not in (None, ''):
+                cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def upsert(connection, model, rows, key_columns, set_=None):
+    """INSERT ... ON CONFLICT по ключевым столбцам (PostgreSQL и SQLite 3.24+).
+
+    По умолчанию конфликтующая строка обновляется вставляемыми значениями,
+    set_ задает свои выражения обновления, пустой set_ - DO NOTHING.
+    """
+    dialect_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(connection.dialect.name)
+    if dialect_insert is None:
+        raise RuntimeError(f'UPSERT не поддерживается для СУБД {connection.dialect.name}')
+
+    statement = dialect_insert(model)
+    if set_ is None:
+        set_ = {
+            column.name: statement.excluded[column.name]
+            for column in model.__table__.columns if column.name not in key_columns
+        }
+    if set_:
+        statement = statement.on_conflict_do_update(index_elements=key_columns, set_=set_)
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=key_columns)
+    connection.execute(statement, rows)
+
+
 class User(db.Model):
     __tablename__ = 'users'
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify(self.password_hash, password)
 
     def to_dict(self):
         return {
@@ -50,6 +100,19 @@ class IncomeContract(db.Model):
     # Связь с расходными договорами
     expense_contracts = db.relationship('ExpenseContract', backref='income_contract', lazy=True)
 
+    # Частичные индексы только по неудаленным договорам
+    __table_args__ = (
+        db.Index('ix_income_contracts_live', 'id',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_income_contracts_live_contract_date', 'contract_date', 'id',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_income_contracts_live_status', 'status',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+    )
+
     def __repr__(self):
         return f'<IncomeContract {self.contract_number}>'
 
@@ -80,10 +143,38 @@ class ExpenseContract(db.Model):
     cost_items = db.relationship('CostItem', backref='expense_contract', lazy=True)
     closed_works = db.relationship('ClosedWork', backref='expense_contract', lazy=True)
 
+    # Частичные индексы только по неудаленным договорам
+    __table_args__ = (
+        db.Index('ix_expense_contracts_live', 'id',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_expense_contracts_live_start_date', 'start_date', 'id',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_expense_contracts_live_income', 'income_contract_id',
+                 sqlite_where=db.text('deleted_at IS NULL'),
+                 postgresql_where=db.text('deleted_at IS NULL')),
+    )
+
     def __repr__(self):
         return f'<ExpenseContract {self.contract_number}>'
 
 
+class ContractSummary(db.Model):
+    """Итоги по расходному договору, поддерживаются при изменении затрат и актов КС"""
+    __tablename__ = 'contract_summary'
+
+    contract_id = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), primary_key=True)
+    cost_items_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    closed_works_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    balance = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    remaining_funding = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ContractSummary {self.contract_id}>'
+
+
 class CalPlan(db.Model):
     """Календарный план для планирования по месяцам"""
     __tablename__ = 'cal_plan'
@@ -91,7 +182,20 @@ class CalPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     iddog = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), nullable=False)
     date = db.Column(db.DateTime, nullable=False)
-    plopl = db.Column(db.Numeric(10, 2), default=0)
+    plopl = db.Column(db.Numeric(15, 2), default=0)
+
+    __table_args__ = (
+        db.Index('ix_cal_plan_iddog_date', 'iddog', 'date'),
+        # Окно планирования: поиск по диапазону дат, суммы берутся из самого индекса
+        db.Index('ix_cal_plan_date_iddog_plopl', 'date', 'iddog', 'plopl'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date': self.date.strftime('%Y-%m-%d'),
+            'plopl': str(self.plopl)
+        }
 
     def __repr__(self):
         return f'<CalPlan {self.id}>'
@@ -102,12 +206,22 @@ class CostItem(db.Model):
     __tablename__ = 'cost_items'
 
     id = db.Column(db.Integer, primary_key=True)
-    contract_id = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), nullable=False)
+    contract_id = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), nullable=False, index=True)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     kontragent = db.Column(db.String(200), nullable=False)
     category = db.Column(db.String(200), nullable=False)
     purpose = db.Column(db.String(200), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(db.Numeric(15, 2), nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date': self.date.strftime('%Y-%m-%d'),
+            'kontragent': self.kontragent,
+            'category': self.category,
+            'purpose': self.purpose,
+            'amount': str(self.amount)
+        }
 
     def __repr__(self):
         return f'<CostItem {self.id}>'
@@ -118,12 +232,12 @@ class ClosedWork(db.Model):
     __tablename__ = 'closed_works'
 
     id = db.Column(db.Integer, primary_key=True)
-    contract_id = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), nullable=False)
+    contract_id = db.Column(db.Integer, db.ForeignKey('expense_contracts.id'), nullable=False, index=True)
     act_number = db.Column(db.String(100), nullable=False)
     act_date = db.Column(db.DateTime, nullable=False)
     amount = db.Column(db.Numeric(15, 2), nullable=False)
     file_name = db.Column(db.String(255))  # Новое поле: имя файла
-    file_path = db.Column(db.String(500))  # Новое поле: путь к файлу
+    file_path = db.Column(db.String(500))  # Ключ sha256:<хэш> в хранилище или путь к файлу (старые акты)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -137,4 +251,70 @@ class ClosedWork(db.Model):
             'file_url': f'/api/closed-works/{self.id}/file' if self.file_path else None,
             'file_name': self.file_name,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+
+class FileBlob(db.Model):
+    """Файл в хранилище по содержимому: одна копия на диске для всех актов с одинаковым файлом"""
+    __tablename__ = 'file_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FileBlob {self.sha256}>'
+
+
+class Job(db.Model):
+    """Фоновая задача: выгрузка, импорт, пересчет итогов и т.п."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(500))
+    params = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(100))  # Хост и pid процесса, выполняющего задачу
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id}>'
+
+
+class CacheGeneration(db.Model):
+    """Поколение данных для кэша ответов, одна строка на БД.
+
+    Увеличивается в той же транзакции, что и изменения данных, поэтому новое
+    поколение сразу видят все процессы: воркеры gunicorn и команды flask import-data,
+    rebuild-summary. epoch задается при создании строки и отличает пересозданную БД,
+    в которой поколения начались заново.
+    """
+    __tablename__ = 'cache_generation'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    epoch = db.Column(db.String(32), nullable=False)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheGeneration {self.epoch}.{self.generation}>'
@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordCheckBusy(RuntimeError):
+    """Очередь проверок паролей заполнена: вход нужно повторить позже"""
+
+
+def normalize_method(method):
+    """Метод хэширования со всеми параметрами, как его записывает werkzeug в начало хэша.
+
+    scrypt -> scrypt:32768:8:1, pbkdf2 -> pbkdf2:sha256:<итерации по умолчанию>.
+    По нему определяется, что хэш создан с другими параметрами и его пора пересчитать.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ':'.join([name, *args, *defaults[len(args):]])
+
+
+class PasswordHasher:
+    """Хэширование и проверка паролей по настройкам приложения.
+
+    Проверка выполняется в ограниченном пуле потоков: scrypt и pbkdf2 отпускают GIL,
+    поэтому одновременные входы не останавливают остальные потоки воркера, а
+    число одновременных вычислений не превышает PASSWORD_VERIFY_WORKERS.
+    Проверки сверх PASSWORD_VERIFY_WORKERS + PASSWORD_VERIFY_QUEUE сразу отклоняются
+    исключением PasswordCheckBusy, а не копятся в очереди.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.salt_length = 16
+        self.workers = 2
+        self.queue = 16
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_VERIFY_WORKERS', 2)
+        app.config.setdefault('PASSWORD_VERIFY_QUEUE', 16)
+
+        self.method = normalize_method(app.config['PASSWORD_HASH_METHOD'])
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_VERIFY_WORKERS']
+        self.queue = app.config['PASSWORD_VERIFY_QUEUE']
+
+        # Пул с прежним числом потоков закрывается, начатые в нем проверки доработают
+        with self.lock:
+            executor, self.executor = self.executor, None
+            self.slots = threading.BoundedSemaphore(self.workers + self.queue)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        app.extensions['passwords'] = self
+
+    def after_fork(self):
+        # Проверки, шедшие в родителе в момент fork, в дочернем процессе не завершатся и не
+        # вернут свои места в семафоре, а замок мог остаться захваченным. Пул родителя
+        # не закрывается: его потоков здесь нет, а его внутренний замок тоже мог быть захвачен
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue)
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+            return self.executor
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method, self.salt_length)
+
+    def needs_rehash(self, password_hash):
+        """Хэш создан другим методом, с другими параметрами или длиной соли"""
+        method, _, rest = password_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self.method or len(salt) != self.salt_length
+
+    def verify(self, password_hash, password):
+        """Проверяет пароль в пуле проверок и ждет результата"""
+        slots = self.slots
+        if not slots.acquire(blocking=False):
+            raise PasswordCheckBusy('Слишком много одновременных входов, повторите попытку позже')
+        try:
+            future = self.get_executor().submit(check_password_hash, password_hash, password)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+
+passwords = PasswordHasher()
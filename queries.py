@@ -0,0 +1,284 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import func, case, or_, and_
+from models import db, IncomeContract, ExpenseContract, ContractSummary, CalPlan, CostItem, ClosedWork
+
+
+def cost_items_totals_subquery(contract_ids=None):
+    """Сумма затрат подрядчика по каждому расходному договору"""
+    query = (
+        db.select(
+            CostItem.contract_id.label('contract_id'),
+            func.sum(CostItem.amount).label('total')
+        )
+        .group_by(CostItem.contract_id)
+    )
+    if contract_ids is not None:
+        query = query.where(CostItem.contract_id.in_(contract_ids))
+    return query.subquery()
+
+
+def closed_works_totals_subquery(contract_ids=None):
+    """Сумма закрытых работ (актов КС) по каждому расходному договору"""
+    query = (
+        db.select(
+            ClosedWork.contract_id.label('contract_id'),
+            func.sum(ClosedWork.amount).label('total')
+        )
+        .group_by(ClosedWork.contract_id)
+    )
+    if contract_ids is not None:
+        query = query.where(ClosedWork.contract_id.in_(contract_ids))
+    return query.subquery()
+
+
+def computed_summaries_query(contract_ids=None):
+    """Итоги по расходным договорам, посчитанные заново по затратам и актам КС.
+
+    Используется для заполнения и сверки таблицы contract_summary.
+    """
+    cost_totals = cost_items_totals_subquery(contract_ids)
+    closed_totals = closed_works_totals_subquery(contract_ids)
+    contractor_costs = func.coalesce(cost_totals.c.total, 0)
+    payment_loesk = func.coalesce(ExpenseContract.payment_loesk, 0)
+
+    query = (
+        db.select(
+            ExpenseContract.id.label('contract_id'),
+            contractor_costs.label('cost_items_total'),
+            func.coalesce(closed_totals.c.total, 0).label('closed_works_total'),
+            (payment_loesk - contractor_costs).label('balance'),
+            (func.coalesce(ExpenseContract.contract_amount, 0) - payment_loesk).label('remaining_funding')
+        )
+        .outerjoin(cost_totals, cost_totals.c.contract_id == ExpenseContract.id)
+        .outerjoin(closed_totals, closed_totals.c.contract_id == ExpenseContract.id)
+    )
+    if contract_ids is not None:
+        query = query.where(ExpenseContract.id.in_(contract_ids))
+    return query
+
+
+def income_contracts_query():
+    """Неудаленные доходные договоры для списка /api/income"""
+    return db.select(IncomeContract).where(IncomeContract.deleted_at.is_(None))
+
+
+def income_options_query():
+    """Активные неудаленные доходные договоры для выбора источника финансирования"""
+    return db.select(IncomeContract).where(
+        IncomeContract.status == 'active',
+        IncomeContract.deleted_at.is_(None)
+    )
+
+
+def actual_contracts_query():
+    """Расходные договоры вместе с готовыми итогами из contract_summary"""
+    return (
+        db.select(
+            ExpenseContract,
+            ContractSummary.cost_items_total,
+            ContractSummary.closed_works_total,
+            ContractSummary.balance,
+            ContractSummary.remaining_funding
+        )
+        .outerjoin(ContractSummary, ContractSummary.contract_id == ExpenseContract.id)
+        .where(ExpenseContract.deleted_at.is_(None))
+    )
+
+
+def planning_totals_subquery(months):
+    """Плановые суммы по договору за три месяца окна планирования.
+
+    months - начала четырех месяцев подряд: текущий, два следующих и граница окна.
+    Строки cal_plan вне окна отсекаются условием по дате, поэтому объем работы
+    не зависит от глубины истории планов.
+    """
+    def month_sum(start, end):
+        return func.coalesce(func.sum(case(
+            ((CalPlan.date >= start) & (CalPlan.date < end), CalPlan.plopl),
+            else_=0
+        )), 0)
+
+    return (
+        db.select(
+            CalPlan.iddog.label('contract_id'),
+            month_sum(months[0], months[1]).label('current_month'),
+            month_sum(months[1], months[2]).label('next_month_1'),
+            month_sum(months[2], months[3]).label('next_month_2')
+        )
+        .where(CalPlan.date >= months[0], CalPlan.date < months[3])
+        .group_by(CalPlan.iddog)
+        .subquery()
+    )
+
+
+def planning_contracts_query(months):
+    """Расходные договоры вместе с плановыми суммами по месяцам за один запрос"""
+    plan_totals = planning_totals_subquery(months)
+
+    return (
+        db.select(
+            ExpenseContract,
+            func.coalesce(plan_totals.c.current_month, 0).label('current_month'),
+            func.coalesce(plan_totals.c.next_month_1, 0).label('next_month_1'),
+            func.coalesce(plan_totals.c.next_month_2, 0).label('next_month_2')
+        )
+        .outerjoin(plan_totals, plan_totals.c.contract_id == ExpenseContract.id)
+        .where(ExpenseContract.deleted_at.is_(None))
+    )
+
+
+# Дочерние коллекции расходного договора: модель и столбец ссылки на договор
+CHILD_COLLECTIONS = {
+    'cost_items': (CostItem, CostItem.contract_id),
+    'closed_works': (ClosedWork, ClosedWork.contract_id),
+    'cal_plan': (CalPlan, CalPlan.iddog)
+}
+
+
+def child_records_query(name, contract_ids):
+    """Записи дочерней коллекции name для списка договоров, по договору и id"""
+    model, key_column = CHILD_COLLECTIONS[name]
+    return (
+        db.select(model)
+        .where(key_column.in_(contract_ids))
+        .order_by(key_column, model.id)
+    )
+
+
+def load_child_collections(contract_ids, collections):
+    """Дочерние записи сразу для многих договоров: один запрос IN (...) на коллекцию.
+
+    Возвращает {id договора: {коллекция: [записи]}}, договоры без записей
+    получают пустые списки.
+    """
+    result = {contract_id: {name: [] for name in collections} for contract_id in contract_ids}
+    for name in collections:
+        key_column = CHILD_COLLECTIONS[name][1]
+        records = db.session.execute(child_records_query(name, contract_ids)).scalars()
+        for record in records:
+            result[getattr(record, key_column.key)][name].append(record)
+    return result
+
+
+def escape_like(value):
+    """Экранирует служебные символы LIKE, чтобы значение искалось как обычная подстрока"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def apply_contract_filters(query, model, date_column, filters):
+    """Фильтры списка договоров: контрагент, тип договора, период дат и признак МЭС"""
+    if filters.get('client'):
+        query = query.where(model.client.ilike(f"%{escape_like(filters['client'])}%", escape='\\'))
+    if filters.get('type_contract') and hasattr(model, 'type_contract'):
+        query = query.where(model.type_contract == filters['type_contract'])
+    if filters.get('is_mes') is not None and hasattr(model, 'is_mes'):
+        query = query.where(model.is_mes.is_(filters['is_mes']))
+    if filters.get('date_from'):
+        query = query.where(date_column >= filters['date_from'])
+    if filters.get('date_to'):
+        query = query.where(date_column < filters['date_to'])
+    return query
+
+
+def count_query(query):
+    """Общее количество строк, подходящих под запрос (без учета страницы)"""
+    return db.select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor, is_date):
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if is_date:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор пагинации')
+
+
+def paginate_keyset(query, model, sort_field, limit, cursor=None, descending=False):
+    """Страница по ключу (sort_field, id) без OFFSET, стоимость не растет с номером страницы.
+
+    Первым элементом каждой строки query должен быть объект model.
+    Возвращает строки страницы и курсор следующей страницы (None, если она последняя).
+    """
+    id_column = model.id
+    sort_column = getattr(model, sort_field)
+    is_date = sort_field != 'id'
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, is_date)
+        if descending:
+            condition = id_column < row_id
+            if is_date:
+                condition = or_(sort_column < sort_value, and_(sort_column == sort_value, condition))
+        else:
+            condition = id_column > row_id
+            if is_date:
+                condition = or_(sort_column > sort_value, and_(sort_column == sort_value, condition))
+        query = query.where(condition)
+
+    order = [sort_column, id_column] if is_date else [id_column]
+    if descending:
+        order = [column.desc() for column in order]
+
+    rows = db.session.execute(query.order_by(*order).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(getattr(last, sort_field), last.id)
+    return rows, next_cursor
+
+
+def iter_balance_groups(batch_size):
+    """Доходные договоры вместе со связанными расходными договорами.
+
+    Оба списка читаются курсором в порядке id доходного договора и сливаются
+    за один проход, так что в памяти одновременно находится только одна группа.
+    """
+    incomes = db.session.execute(
+        db.select(
+            IncomeContract.id,
+            IncomeContract.contract_number,
+            IncomeContract.client,
+            IncomeContract.contract_amount,
+            IncomeContract.paid_amount
+        )
+        .where(IncomeContract.deleted_at.is_(None))
+        .order_by(IncomeContract.id)
+        .execution_options(yield_per=batch_size)
+    )
+    expenses = iter(db.session.execute(
+        db.select(
+            ExpenseContract.id,
+            ExpenseContract.contract_number,
+            ExpenseContract.contract_amount,
+            ExpenseContract.payment_loesk,
+            ExpenseContract.income_contract_id
+        )
+        .where(ExpenseContract.deleted_at.is_(None))
+        .order_by(ExpenseContract.income_contract_id, ExpenseContract.id)
+        .execution_options(yield_per=batch_size)
+    ))
+
+    pending = next(expenses, None)
+    for income in incomes:
+        # Пропускаем расходные договоры, привязанные к удаленным доходным
+        while pending is not None and pending.income_contract_id < income.id:
+            pending = next(expenses, None)
+
+        related_expenses = []
+        while pending is not None and pending.income_contract_id == income.id:
+            related_expenses.append(pending)
+            pending = next(expenses, None)
+
+        yield income, related_expenses
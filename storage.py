@@ -0,0 +1,260 @@
+import hashlib
+import os
+import tempfile
+import time
+from urllib.parse import quote
+from flask import Response, current_app, send_file
+from sqlalchemy import event, func, inspect
+from models import db, upsert, FileBlob, ClosedWork
+
+# Файл копируется на диск блоками, поэтому память не зависит от его размера
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Файлы актов хранятся по хэшу содержимого: ClosedWork.file_path = 'sha256:<хэш>',
+# файл лежит в <папка загрузок>/blobs/ab/cd/<хэш>
+BLOB_PREFIX = 'sha256:'
+BLOBS_DIR = 'blobs'
+
+# Файлы моложе этого возраста сборщик мусора не трогает: их может сохранять текущая загрузка
+GC_GRACE_SECONDS = 3600
+
+
+class FileTooLarge(ValueError):
+    pass
+
+
+def is_blob_key(file_path):
+    return bool(file_path) and file_path.startswith(BLOB_PREFIX)
+
+
+def blob_path(upload_folder, digest):
+    """Путь к файлу хранилища: два уровня папок по 256 вариантов, чтобы папки не разрастались"""
+    return os.path.join(upload_folder, BLOBS_DIR, digest[:2], digest[2:4], digest)
+
+
+def resolve_path(file_path, upload_folder):
+    """Путь на диске для значения ClosedWork.file_path - ключа хранилища или пути старого акта"""
+    if is_blob_key(file_path):
+        return blob_path(upload_folder, file_path[len(BLOB_PREFIX):])
+    return file_path
+
+
+def store_stream(stream, upload_folder, max_size=None):
+    """Сохраняет поток в хранилище по содержимому и возвращает ключ файла.
+
+    Поток копируется блоками во временный файл, хэш и размер считаются по ходу
+    записи. При превышении max_size временный файл удаляется и выбрасывается
+    FileTooLarge. Если файл с таким хэшем уже есть, новая копия не сохраняется,
+    иначе временный файл атомарно переименовывается на место. Запись FileBlob
+    создается в текущей транзакции, счетчик ссылок ведут события ClosedWork.
+    """
+    blobs_folder = os.path.join(upload_folder, BLOBS_DIR)
+    os.makedirs(blobs_folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=blobs_folder, prefix='.upload-', suffix='.part')
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as output:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLarge(f'Файл слишком большой. Максимальный размер: {max_size // (1024 * 1024)}MB')
+                digest.update(chunk)
+                output.write(chunk)
+            output.flush()
+            os.fsync(output.fileno())
+
+        digest = digest.hexdigest()
+        path = blob_path(upload_folder, digest)
+        if os.path.exists(path):
+            # Обновляем время изменения, чтобы сборщик мусора не удалил файл до фиксации транзакции
+            os.remove(temp_path)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    upsert(db.session.connection(), FileBlob, [{'sha256': digest, 'size': size, 'ref_count': 0}], ['sha256'], set_={})
+    return BLOB_PREFIX + digest
+
+
+def store_upload(file, upload_folder, max_size):
+    return store_stream(file.stream, upload_folder, max_size)
+
+
+def discard_file(file_path, upload_folder):
+    """Удаляет файл старого акта, ошибка удаления только пишется в лог.
+
+    Файлы хранилища удаляются сборщиком мусора, когда на них не остается ссылок.
+    """
+    if not file_path or is_blob_key(file_path) or not os.path.exists(file_path):
+        return
+    try:
+        os.remove(file_path)
+    except OSError:
+        current_app.logger.warning('Не удалось удалить файл %s', file_path, exc_info=True)
+
+
+def send_upload(file_path, upload_folder, mimetype=None, as_attachment=False, download_name=None):
+    """Отдает загруженный файл.
+
+    Если задан X_ACCEL_REDIRECT_PREFIX, файл отдает nginx по внутреннему адресу
+    prefix + путь внутри папки загрузок. При USE_X_SENDFILE send_file ставит
+    заголовок X-Sendfile для Apache/lighttpd. Иначе файл отдается приложением
+    с поддержкой Range, If-None-Match и If-Modified-Since.
+    """
+    prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    if prefix:
+        relative_path = os.path.relpath(file_path, upload_folder).replace(os.sep, '/')
+        response = Response(mimetype=mimetype or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(relative_path)}"
+        if as_attachment or download_name:
+            disposition = 'attachment' if as_attachment else 'inline'
+            response.headers['Content-Disposition'] = (
+                f"{disposition}; filename*=UTF-8''{quote(download_name or os.path.basename(file_path))}"
+            )
+        return response
+
+    return send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
+
+
+# Счетчик ссылок на файлы хранилища меняется вместе с актами в той же транзакции
+
+def change_ref_count(connection, file_path, delta):
+    if is_blob_key(file_path):
+        connection.execute(
+            db.update(FileBlob)
+            .where(FileBlob.sha256 == file_path[len(BLOB_PREFIX):])
+            .values(ref_count=FileBlob.ref_count + delta)
+        )
+
+
+def on_closed_work_inserted(mapper, connection, target):
+    change_ref_count(connection, target.file_path, 1)
+
+
+def on_closed_work_updated(mapper, connection, target):
+    history = inspect(target).attrs.file_path.history
+    for file_path in history.deleted:
+        change_ref_count(connection, file_path, -1)
+    for file_path in history.added:
+        change_ref_count(connection, file_path, 1)
+
+
+def on_closed_work_deleted(mapper, connection, target):
+    change_ref_count(connection, target.file_path, -1)
+
+
+event.listen(ClosedWork, 'after_insert', on_closed_work_inserted)
+event.listen(ClosedWork, 'after_update', on_closed_work_updated)
+event.listen(ClosedWork, 'after_delete', on_closed_work_deleted)
+
+
+def migrate_legacy_files(upload_folder):
+    """Переносит файлы старых актов в хранилище по содержимому.
+
+    Одинаковые файлы сводятся к одной копии, старые файлы удаляются, когда
+    на них больше не ссылается ни один акт. Возвращает число перенесенных актов.
+    """
+    works = db.session.execute(
+        db.select(ClosedWork)
+        .where(ClosedWork.file_path.is_not(None), ClosedWork.file_path.not_like(BLOB_PREFIX + '%'))
+        .order_by(ClosedWork.id)
+    ).scalars().all()
+
+    moved = 0
+    legacy_paths = set()
+    for work in works:
+        if not os.path.exists(work.file_path):
+            continue
+        with open(work.file_path, 'rb') as stream:
+            key = store_stream(stream, upload_folder)
+        legacy_paths.add(work.file_path)
+        work.file_path = key
+        moved += 1
+    db.session.commit()
+
+    for file_path in legacy_paths:
+        discard_file(file_path, upload_folder)
+    return moved
+
+
+def collect_garbage(upload_folder, grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """Сверяет счетчики ссылок с актами и удаляет неиспользуемые файлы хранилища.
+
+    Удаляются файлы без ссылок, файлы без записи FileBlob и брошенные временные
+    файлы загрузок старше grace_seconds. Возвращает отчет о сделанном.
+    """
+    report = {'recounted': 0, 'removed_blobs': 0, 'removed_orphans': 0,
+              'removed_temp': 0, 'freed_bytes': 0, 'missing': []}
+    cutoff = time.time() - grace_seconds
+
+    references = {
+        file_path[len(BLOB_PREFIX):]: count
+        for file_path, count in db.session.execute(
+            db.select(ClosedWork.file_path, func.count())
+            .where(ClosedWork.file_path.like(BLOB_PREFIX + '%'))
+            .group_by(ClosedWork.file_path)
+        )
+    }
+    blobs = {blob.sha256: blob for blob in db.session.execute(db.select(FileBlob)).scalars()}
+
+    # Счетчики могут разойтись после массового удаления актов в обход ORM
+    for digest, blob in blobs.items():
+        count = references.get(digest, 0)
+        if blob.ref_count != count:
+            report['recounted'] += 1
+            blob.ref_count = count
+    report['missing'] = sorted(
+        digest for digest in references
+        if digest not in blobs or not os.path.exists(blob_path(upload_folder, digest))
+    )
+
+    removed_paths = []
+    for digest, blob in blobs.items():
+        if blob.ref_count > 0:
+            continue
+        path = blob_path(upload_folder, digest)
+        if os.path.exists(path) and os.path.getmtime(path) > cutoff:
+            continue
+        report['removed_blobs'] += 1
+        report['freed_bytes'] += blob.size
+        removed_paths.append(path)
+        db.session.delete(blob)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        for path in removed_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Файлы удаленных выше записей уже посчитаны (а без dry_run и удалены)
+    known = set(blobs)
+    for root, _, filenames in os.walk(os.path.join(upload_folder, BLOBS_DIR)):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if filename in known or os.path.getmtime(path) > cutoff:
+                continue
+            key = 'removed_temp' if filename.startswith('.upload-') else 'removed_orphans'
+            report[key] += 1
+            report['freed_bytes'] += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+
+    return report
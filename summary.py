@@ -0,0 +1,125 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, func
+from sqlalchemy.orm import Session, object_session
+from models import db, upsert, ExpenseContract, ContractSummary, CostItem, ClosedWork
+from queries import computed_summaries_query
+
+# Договоры, итоги которых нужно пересчитать после текущего flush
+SUMMARY_DIRTY_KEY = 'summary_dirty_contract_ids'
+SUMMARY_BATCH_SIZE = 500
+
+SUMMARY_COLUMNS = ['contract_id', 'cost_items_total', 'closed_works_total', 'balance', 'remaining_funding']
+
+
+def mark_contracts_dirty(target, contract_ids):
+    session = object_session(target)
+    if session is None:
+        return
+    dirty = session.info.setdefault(SUMMARY_DIRTY_KEY, set())
+    dirty.update(contract_id for contract_id in contract_ids if contract_id is not None)
+
+
+def on_child_changed(mapper, connection, target):
+    # При переносе записи на другой договор пересчитываются оба договора
+    history = inspect(target).attrs.contract_id.history
+    mark_contracts_dirty(target, [target.contract_id, *history.deleted])
+
+
+def on_expense_contract_changed(mapper, connection, target):
+    mark_contracts_dirty(target, [target.id])
+
+
+for model in (CostItem, ClosedWork):
+    event.listen(model, 'after_insert', on_child_changed)
+    event.listen(model, 'after_update', on_child_changed)
+    event.listen(model, 'after_delete', on_child_changed)
+
+event.listen(ExpenseContract, 'after_insert', on_expense_contract_changed)
+event.listen(ExpenseContract, 'after_update', on_expense_contract_changed)
+event.listen(ExpenseContract, 'after_delete', on_expense_contract_changed)
+
+
+@event.listens_for(Session, 'after_flush')
+def refresh_dirty_summaries(session, flush_context):
+    contract_ids = session.info.pop(SUMMARY_DIRTY_KEY, None)
+    if contract_ids:
+        refresh_summaries(session.connection(), contract_ids)
+
+
+def refresh_summaries(connection, contract_ids):
+    """Пересчитывает итоги только для указанных договоров в текущей транзакции.
+
+    Строки договоров блокируются до пересчета (в PostgreSQL - FOR NO KEY UPDATE,
+    который не конфликтует с проверкой внешних ключей дочерних записей; SQLite
+    и так выполняет записи по одной), поэтому параллельные транзакции по одному
+    договору пересчитывают итоги по очереди и видят изменения друг друга.
+    """
+    contract_ids = sorted(contract_ids)
+    for start in range(0, len(contract_ids), SUMMARY_BATCH_SIZE):
+        batch = contract_ids[start:start + SUMMARY_BATCH_SIZE]
+        connection.execute(
+            db.select(ExpenseContract.id)
+            .where(ExpenseContract.id.in_(batch))
+            .order_by(ExpenseContract.id)
+            .with_for_update(key_share=True)
+        ).all()
+        rows = [
+            {**row, 'updated_at': datetime.utcnow()}
+            for row in connection.execute(computed_summaries_query(batch)).mappings()
+        ]
+
+        if rows:
+            upsert(connection, ContractSummary, rows, ['contract_id'])
+        # Итоги удаленных договоров
+        removed = set(batch) - {row['contract_id'] for row in rows}
+        if removed:
+            connection.execute(db.delete(ContractSummary).where(ContractSummary.contract_id.in_(removed)))
+
+
+def rebuild_summaries():
+    """Заполняет contract_summary с нуля одним INSERT ... SELECT"""
+    db.session.execute(db.delete(ContractSummary))
+    db.session.execute(
+        db.insert(ContractSummary).from_select(SUMMARY_COLUMNS, computed_summaries_query())
+    )
+    db.session.commit()
+    return db.session.execute(db.select(func.count()).select_from(ContractSummary)).scalar_one()
+
+
+def check_summaries():
+    """Сверяет contract_summary с итогами, посчитанными заново.
+
+    Возвращает список расхождений: id договора, сохраненные и ожидаемые значения.
+    """
+    expected = {
+        row.contract_id: tuple(row[1:])
+        for row in db.session.execute(computed_summaries_query())
+    }
+    stored = {
+        row.contract_id: tuple(row[1:])
+        for row in db.session.execute(db.select(
+            ContractSummary.contract_id,
+            ContractSummary.cost_items_total,
+            ContractSummary.closed_works_total,
+            ContractSummary.balance,
+            ContractSummary.remaining_funding
+        ))
+    }
+
+    mismatches = []
+    for contract_id in sorted(expected.keys() | stored.keys()):
+        if expected.get(contract_id) != stored.get(contract_id):
+            mismatches.append({
+                'contract_id': contract_id,
+                'stored': stored.get(contract_id),
+                'expected': expected.get(contract_id)
+            })
+    return mismatches
+
+
+def ensure_summaries():
+    """Заполняет contract_summary, если она пуста или не покрывает все договоры (например, после обновления)"""
+    summary_count = db.session.execute(db.select(func.count()).select_from(ContractSummary)).scalar_one()
+    contract_count = db.session.execute(db.select(func.count()).select_from(ExpenseContract)).scalar_one()
+    if summary_count != contract_count:
+        rebuild_summaries()
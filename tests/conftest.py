@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime
+import pytest
+from app import create_app, setup_schema
+from benchmarks.data import generate
+from benchmarks.runner import QueryCounter
+from config import engine_options
+from models import db, IncomeContract, ExpenseContract
+
+
+@pytest.fixture(scope='session')
+def postgres_server(tmp_path_factory):
+    """Локальный PostgreSQL (pgserver) на время прогона тестов"""
+    pgserver = pytest.importorskip('pgserver')
+    pytest.importorskip('psycopg2')
+    server = pgserver.get_server(tmp_path_factory.mktemp('pgdata'), cleanup_mode='stop')
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def db_url(request, tmp_path):
+    """Адрес пустой БД: файл SQLite или отдельная база на локальном PostgreSQL"""
+    if request.param == 'sqlite':
+        yield 'sqlite:///' + str(tmp_path / 'test.db')
+        return
+
+    server = request.getfixturevalue('postgres_server')
+    name = f'test_{uuid.uuid4().hex[:12]}'
+    server.psql(f'CREATE DATABASE {name};')
+    yield server.get_uri(name)
+    server.psql(f'DROP DATABASE {name} WITH (FORCE);')
+
+
+@pytest.fixture
+def app(db_url, tmp_path):
+    """Приложение на пустой БД со схемой, без кэша ответов"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': db_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(db_url),
+        'AUTO_CREATE_SCHEMA': False,
+        'RESPONSE_CACHE_ENABLED': False,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'JOB_RESULTS_FOLDER': str(tmp_path / 'jobs')
+    })
+    with app.app_context():
+        setup_schema()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def contract_id(app):
+    """id расходного договора, созданного вместе с доходным договором-источником"""
+    with app.app_context():
+        income = IncomeContract(contract_number='Д-1', contract_date=datetime(2024, 1, 1),
+                                client='ООО "Заказчик"', contract_amount=1000000, status='active')
+        db.session.add(income)
+        db.session.flush()
+        contract = ExpenseContract(contract_number='Р-1', type_contract='ремонтная программа',
+                                   start_date=datetime(2024, 1, 1), end_date=datetime(2024, 12, 31),
+                                   name='Работы', client='ООО "Подрядчик"', contract_amount=100000,
+                                   payment_loesk=0, income_contract_id=income.id, status='active')
+        db.session.add(contract)
+        db.session.commit()
+        return contract.id
+
+
+@pytest.fixture
+def populate(app):
+    """populate(size) - синтетические данные примерно из size строк, возвращает число строк по таблицам"""
+    def populate(size, seed=1):
+        with app.app_context():
+            return generate(size, seed)
+    return populate
+
+
+@pytest.fixture
+def count_queries():
+    """Счетчик SQL-запросов по всем движкам: count_queries.count"""
+    counter = QueryCounter()
+    yield counter
+    counter.close()
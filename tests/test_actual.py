@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.mark.parametrize('size', [1000, 5000])
+def test_actual_issues_single_statement(client, populate, count_queries, size):
+    sizes = populate(size)
+
+    count_queries.count = 0
+    response = client.get('/api/actual')
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == sizes['expense_contracts']
+    # Итоги по затратам и актам КС не должны подгружаться по каждому договору
+    assert count_queries.count <= 1
+
+
+def test_actual_page_issues_two_statements(client, populate, count_queries):
+    populate(1000)
+
+    count_queries.count = 0
+    response = client.get('/api/actual?limit=50')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == 50
+    # Страница и общее количество строк
+    assert count_queries.count <= 2
@@ -0,0 +1,51 @@
+import bulk_import
+from bulk_import import import_records
+from models import db, IncomeContract
+
+
+def income(number, client='ООО "Заказчик"'):
+    return {'contract_number': number, 'contract_date': '2024-01-15', 'client': client, 'contract_amount': '1000.00'}
+
+
+def saved_numbers():
+    return sorted(db.session.execute(db.select(IncomeContract.contract_number)).scalars())
+
+
+def test_failed_chunk_keeps_row_errors_and_frees_numbers(app, monkeypatch):
+    insert_chunk = bulk_import.insert_chunk
+    calls = []
+
+    def failing_first_chunk(kind, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError('сбой записи')
+        insert_chunk(kind, rows)
+
+    monkeypatch.setattr(bulk_import, 'insert_chunk', failing_first_chunk)
+    records = [
+        income('A-1'), income('A-2'), income('A-3', client=''),
+        # Номера из несохраненной пачки свободны для следующих пачек
+        income('A-1'), income('A-2'), income('A-1')
+    ]
+
+    with app.app_context():
+        report = import_records('income-contracts', records, chunk_size=3)
+
+        assert report['total'] == 6
+        assert report['inserted'] == 2
+        assert [error['row'] for error in report['errors']] == [1, 3, 6]
+        assert report['errors'][0]['error'].startswith('Пачка строк 1-3 не сохранена')
+        assert report['errors'][1]['error'] == 'Поле client обязательно для заполнения'
+        assert report['errors'][2]['error'] == 'Договор с таким номером уже существует'
+        assert saved_numbers() == ['A-1', 'A-2']
+
+
+def test_duplicates_across_saved_chunks_are_rejected(app):
+    records = [income('B-1'), income('B-2'), income('B-2'), income('B-1'), income('B-3')]
+
+    with app.app_context():
+        report = import_records('income-contracts', records, chunk_size=2)
+
+        assert report['inserted'] == 3
+        assert [error['row'] for error in report['errors']] == [3, 4]
+        assert saved_numbers() == ['B-1', 'B-2', 'B-3']
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+from cache import cache
+
+
+def test_cache_key_escapes_query_values(app):
+    def key(query_string):
+        with app.test_request_context('/api/actual?' + query_string):
+            return cache.make_key('actual')
+
+    assert key('client=X&limit=1') != key('client=X%26limit%3D1')
+    # Порядок параметров на ключ не влияет
+    assert key('limit=1&client=X') == key('client=X&limit=1')
+
+
+def test_writes_from_another_process_invalidate_cache(app, client, populate, db_url, monkeypatch):
+    populate(1000)
+    monkeypatch.setattr(cache, 'enabled', True)
+
+    first = client.get('/api/actual')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert client.get('/api/actual').headers['X-Cache'] == 'HIT'
+    assert client.get('/api/actual', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    # Изменения из другого процесса, как у команды CLI или соседнего воркера
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'rebuild-summary'],
+        env={**os.environ, 'DATABASE_URL': db_url, 'AUTO_CREATE_SCHEMA': '0'},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True
+    )
+
+    response = client.get('/api/actual', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.headers['ETag'] != first.headers['ETag']
@@ -0,0 +1,87 @@
+import pytest
+
+
+def save_plan(client, contract_id, plans):
+    return client.post(f'/api/expense-contracts/{contract_id}/cal-plan', json={'plans': plans})
+
+
+def plan_rows(client, contract_id):
+    """Строки плана: {дата: (id, сумма)}"""
+    rows = client.get(f'/api/expense-contracts/{contract_id}/cal-plan').get_json()
+    return {row['date']: (row['id'], row['plopl']) for row in rows}
+
+
+PLAN = [
+    {'date': '2024-01-01', 'plopl': '1000.00'},
+    {'date': '2024-02-01', 'plopl': '2000.00'},
+    {'date': '2024-03-01', 'plopl': '3000.00'}
+]
+
+
+def test_unchanged_plan_keeps_rows(client, contract_id):
+    save_plan(client, contract_id, PLAN)
+    before = plan_rows(client, contract_id)
+
+    response = save_plan(client, contract_id, PLAN)
+
+    assert response.status_code == 200
+    changes = response.get_json()
+    del changes['message']
+    assert changes == {'saved_plans': 3, 'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3}
+    assert plan_rows(client, contract_id) == before
+
+
+def test_single_month_edit_updates_one_row(client, contract_id):
+    save_plan(client, contract_id, PLAN)
+    before = plan_rows(client, contract_id)
+
+    response = save_plan(client, contract_id, [PLAN[0], {'date': '2024-02-01', 'plopl': '2500.50'}, PLAN[2]])
+
+    assert response.get_json()['updated'] == 1
+    assert response.get_json()['unchanged'] == 2
+    assert plan_rows(client, contract_id) == {**before, '2024-02-01': (before['2024-02-01'][0], '2500.50')}
+
+
+def test_removed_months_are_deleted(client, contract_id):
+    save_plan(client, contract_id, PLAN)
+    before = plan_rows(client, contract_id)
+
+    response = save_plan(client, contract_id, [PLAN[1], {'date': '2024-04-01', 'plopl': '4000.00'}])
+
+    assert response.get_json()['deleted'] == 2
+    assert response.get_json()['inserted'] == 1
+    after = plan_rows(client, contract_id)
+    assert sorted(after) == ['2024-02-01', '2024-04-01']
+    assert after['2024-02-01'] == before['2024-02-01']
+
+
+def test_duplicate_months_keep_last_row(client, contract_id):
+    response = save_plan(client, contract_id, [
+        {'date': '2024-05-01', 'plopl': '100'},
+        {'date': '2024-05-15', 'plopl': '200'},
+        {'date': '2024-06-01', 'plopl': '300'}
+    ])
+
+    assert response.get_json()['saved_plans'] == 2
+    after = plan_rows(client, contract_id)
+    assert {date: plopl for date, (_, plopl) in after.items()} == {'2024-05-15': '200.00', '2024-06-01': '300.00'}
+
+
+@pytest.mark.parametrize('plans', [
+    [{'date': '2024-01-01'}],
+    [{'plopl': '100'}],
+    [{'date': '01.01.2024', 'plopl': '100'}],
+    [{'date': '2024-01-01', 'plopl': 'сто'}],
+    [{'date': None, 'plopl': '100'}],
+    ['2024-01-01'],
+    {'date': '2024-01-01', 'plopl': '100'}
+])
+def test_malformed_rows_are_rejected(client, contract_id, plans):
+    save_plan(client, contract_id, PLAN)
+    before = plan_rows(client, contract_id)
+
+    response = save_plan(client, contract_id, [*PLAN, *plans] if isinstance(plans, list) else plans)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert plan_rows(client, contract_id) == before
@@ -0,0 +1,62 @@
+import pytest
+from models import db, ExpenseContract, CostItem, ClosedWork, CalPlan
+from views.common import MAX_PAGE_SIZE
+
+
+def expected_children(app, contract_ids):
+    """Дочерние записи договоров, прочитанные по одному договору, как это делал фронтенд"""
+    with app.app_context():
+        return {
+            str(contract_id): {
+                name: [record.to_dict() for record in db.session.execute(
+                    db.select(model).where(column == contract_id).order_by(model.id)).scalars()]
+                for name, model, column in (
+                    ('cost_items', CostItem, CostItem.contract_id),
+                    ('closed_works', ClosedWork, ClosedWork.contract_id),
+                    ('cal_plan', CalPlan, CalPlan.iddog)
+                )
+            }
+            for contract_id in contract_ids
+        }
+
+
+def test_children_match_per_contract_lists(app, client, populate, count_queries):
+    populate(1000)
+    with app.app_context():
+        contract_ids = db.session.execute(
+            db.select(ExpenseContract.id).order_by(ExpenseContract.id).limit(40)).scalars().all()
+    # Договор без записей получает пустые списки
+    contract_ids.append(10 ** 6)
+
+    count_queries.count = 0
+    response = client.get('/api/expense-contracts/children?ids=' + ','.join(map(str, contract_ids)))
+
+    assert response.status_code == 200
+    # Один запрос на коллекцию, а не на договор
+    assert count_queries.count == 3
+    assert response.get_json() == expected_children(app, contract_ids)
+
+
+def test_children_of_selected_collections(client, populate):
+    populate(1000)
+
+    response = client.get('/api/expense-contracts/children?ids=1,2,1&collections=cal_plan&collections=cost_items')
+
+    assert response.status_code == 200
+    children = response.get_json()
+    assert sorted(children) == ['1', '2']
+    assert all(sorted(collections) == ['cal_plan', 'cost_items'] for collections in children.values())
+
+
+@pytest.mark.parametrize('query', [
+    '',
+    'ids=',
+    'ids=1,x',
+    'ids=1&collections=payments',
+    'ids=' + ','.join(str(number) for number in range(MAX_PAGE_SIZE + 1))
+])
+def test_children_rejects_invalid_params(client, query):
+    response = client.get('/api/expense-contracts/children?' + query)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,36 @@
+import gc
+import os
+import weakref
+import pytest
+from app import create_app
+from models import db
+
+
+def make_app(tmp_path):
+    uri = 'sqlite:///' + str(tmp_path / 'fork.db')
+    return create_app({'SQLALCHEMY_DATABASE_URI': uri, 'AUTO_CREATE_SCHEMA': False})
+
+
+def test_created_app_is_not_kept_alive_by_fork_hooks(tmp_path):
+    app = make_app(tmp_path)
+    reference = weakref.ref(app)
+    del app
+    gc.collect()
+    assert reference() is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='нужен os.fork')
+def test_child_process_gets_fresh_connection_pool(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.session.execute(db.text('SELECT 1'))
+        db.session.remove()
+        assert db.engine.pool.checkedin() == 1
+
+        pid = os.fork()
+        if pid == 0:
+            # Соединение родителя не должно достаться дочернему процессу
+            os._exit(0 if db.engine.pool.checkedin() == 0 else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert db.engine.pool.checkedin() == 1
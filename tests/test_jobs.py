@@ -0,0 +1,25 @@
+import pytest
+from models import db, Job
+
+
+@pytest.mark.parametrize('body', [
+    {'kind': 'rebuild-summary', 'params': {'unexpected': 1}},
+    {'kind': 'export', 'params': {}},
+    {'kind': 'export', 'params': ['actual']},
+    {'kind': 'import', 'params': {'kind': 'income', 'path': '/etc/passwd', 'file_format': 'csv'}}
+])
+def test_submit_rejects_invalid_params(app, client, body):
+    response = client.post('/api/jobs', json=body)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    # Задача с неподходящими параметрами не должна попасть в очередь
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(Job)).scalar_one() == 0
+
+
+@pytest.mark.parametrize('data', ['not json', '["export"]'])
+def test_submit_rejects_non_object_body(client, data):
+    response = client.post('/api/jobs', data=data, content_type='application/json')
+
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+import re
+import pytest
+from metrics import metrics
+
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-z_]+)="((?:[^"\\]|\\.)*)"')
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    # Метрики копятся в памяти процесса, а приложения тестов общие для него
+    metrics.reset()
+
+
+def parse_metrics(text):
+    """Отсчеты Prometheus: {(имя, frozenset(метки)): значение}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        samples[(name, frozenset(LABEL.findall(labels or '')))] = float(value)
+    return samples
+
+
+def request(client, path):
+    """Статус ответа. Метрики запроса записываются при закрытии ответа, как после отправки сервером"""
+    response = client.get(path)
+    response.close()
+    return response.status_code
+
+
+def labels(**values):
+    return frozenset(values.items())
+
+
+def test_responses_have_server_timing(client, populate):
+    populate(1000)
+
+    response = client.get('/api/actual?limit=10')
+
+    timings = response.headers.getlist('Server-Timing')
+    assert re.fullmatch(r'db;dur=\d+\.\d;desc="SQL x2"', timings[0])
+    assert re.fullmatch(r'app;dur=\d+\.\d', timings[1])
+
+
+def test_metrics_count_requests(client, populate):
+    populate(1000)
+    for _ in range(3):
+        assert request(client, '/api/actual?limit=10') == 200
+    assert request(client, '/api/actual?limit=0') == 400
+    assert request(client, '/api/no-such-route') == 404
+
+    response = client.get('/api/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = parse_metrics(response.get_data(as_text=True))
+    actual = labels(method='GET', endpoint='/api/actual')
+    assert samples[('finmes_http_requests_total', actual | labels(status='200'))] == 3
+    assert samples[('finmes_http_requests_total', actual | labels(status='400'))] == 1
+    assert samples[('finmes_http_requests_total', labels(method='GET', endpoint='unmatched', status='404'))] == 1
+    assert samples[('finmes_http_request_duration_seconds_count', actual)] == 4
+    assert samples[('finmes_http_request_duration_seconds_bucket', actual | labels(le='+Inf'))] == 4
+    # Страница и общее количество строк на каждый успешный запрос
+    assert samples[('finmes_db_queries_per_request_sum', actual)] == 6
+    assert samples[('finmes_http_response_size_bytes_sum', actual)] > 0
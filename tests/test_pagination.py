@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from models import db, IncomeContract, ExpenseContract
+
+
+def walk_pages(client, query, limit=37):
+    """Все страницы списка по курсору: строки и total первой страницы"""
+    rows, cursor, total = [], None, None
+    while True:
+        path = f'/api/actual?{query}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(path)
+        assert response.status_code == 200
+        page = response.get_json()
+        total = page['total'] if total is None else total
+        assert page['total'] == total
+        assert len(page['items']) <= limit
+        rows += page['items']
+        cursor = page['next_cursor']
+        if not cursor:
+            return rows, total
+
+
+@pytest.mark.parametrize('sort', ['id', 'date'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_cursor_walk_matches_full_list(client, populate, sort, order):
+    sizes = populate(1000)
+    query = f'sort={sort}&order={order}'
+
+    expected = client.get(f'/api/actual?{query}').get_json()
+    rows, total = walk_pages(client, query)
+
+    assert total == len(expected) == sizes['expense_contracts']
+    assert [row['id'] for row in rows] == [row['id'] for row in expected]
+
+
+def test_cursor_walk_with_combined_filters(client, populate):
+    populate(1000)
+    query = ('client=Петров&type_contract=ремонтная программа'
+             '&date_from=2024-03-01&date_to=2024-09-30&sort=date&order=desc')
+
+    everything = client.get('/api/actual').get_json()
+    expected = sorted(
+        (row for row in everything
+         if 'Петров' in row['client'] and row['type_contract'] == 'ремонтная программа'
+         and '2024-03-01' <= row['start_date'] <= '2024-09-30'),
+        key=lambda row: (row['start_date'], row['id']),
+        reverse=True
+    )
+    rows, total = walk_pages(client, query, limit=10)
+
+    assert expected
+    assert total == len(expected)
+    assert [row['id'] for row in rows] == [row['id'] for row in expected]
+
+
+def encoded(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize('sort, cursor', [
+    ('id', 'not-a-cursor'),
+    ('id', encoded({'id': 5})),
+    ('id', encoded([1, 'x'])),
+    ('id', encoded(42)),
+    ('date', encoded([12345, 1])),
+    ('date', encoded(['не дата', 1])),
+    ('date', encoded(['2024-01-01T00:00:00', 1])[:-6])
+])
+def test_malformed_cursor_is_rejected(client, populate, sort, cursor):
+    populate(1000)
+
+    response = client.get(f'/api/actual?limit=10&sort={sort}&cursor={cursor}')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Некорректный курсор пагинации'
+
+
+def test_client_filter_matches_like_wildcards_literally(app, client):
+    clients = ['ООО "100% Ремонт"', 'ООО "100 Ремонт"', 'ИП Иванов_А', 'ИП ИвановБА',
+               'ООО Путь\\Север', 'ООО ПутьСевер']
+    with app.app_context():
+        income = IncomeContract(contract_number='Д-1', contract_date=datetime(2024, 1, 1),
+                                client='ООО "Заказчик"', contract_amount=1000000, status='active')
+        db.session.add(income)
+        db.session.flush()
+        db.session.add_all(
+            ExpenseContract(contract_number=f'Р-{number}', type_contract='ремонтная программа',
+                            start_date=datetime(2024, 2, 1), end_date=datetime(2024, 12, 31),
+                            name='Работы', client=name, contract_amount=1000, payment_loesk=0,
+                            income_contract_id=income.id, status='active')
+            for number, name in enumerate(clients)
+        )
+        db.session.commit()
+
+    for value, expected in [('0%', ['ООО "100% Ремонт"']), ('в_', ['ИП Иванов_А']),
+                            ('ь\\С', ['ООО Путь\\Север'])]:
+        response = client.get('/api/actual', query_string={'client': value})
+        assert response.status_code == 200
+        assert [row['client'] for row in response.get_json()] == expected
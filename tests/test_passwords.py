@@ -0,0 +1,64 @@
+import threading
+from werkzeug.security import generate_password_hash
+from models import db, User
+from passwords import passwords
+
+
+def create_user(app, password_hash):
+    with app.app_context():
+        user = User(username='worker', role='ПТС', password_hash=password_hash)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).password_hash
+
+
+def login(client, password='secret'):
+    return client.post('/api/auth/login', json={'username': 'worker', 'password': password})
+
+
+def test_login_rehashes_outdated_hash(app, client):
+    user_id = create_user(app, generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+
+    assert login(client).status_code == 200
+
+    rehashed = stored_hash(app, user_id)
+    assert rehashed.startswith(passwords.method + '$')
+    assert not passwords.needs_rehash(rehashed)
+    # Актуальный хэш при следующем входе не пересчитывается
+    assert login(client).status_code == 200
+    assert stored_hash(app, user_id) == rehashed
+
+
+def test_failed_login_keeps_outdated_hash(app, client):
+    outdated = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+    user_id = create_user(app, outdated)
+
+    assert login(client, 'wrong').status_code == 401
+    assert stored_hash(app, user_id) == outdated
+
+
+def test_login_is_rejected_when_checks_are_busy(app, client, monkeypatch):
+    create_user(app, passwords.hash('secret'))
+    # Все места в очереди проверок заняты
+    monkeypatch.setattr(passwords, 'slots', threading.BoundedSemaphore(1))
+    passwords.slots.acquire()
+
+    response = login(client)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['success'] is False
+
+
+def test_init_app_shuts_down_previous_pool(app):
+    executor = passwords.get_executor()
+
+    passwords.init_app(app)
+
+    assert executor._shutdown
+    assert passwords.get_executor() is not executor
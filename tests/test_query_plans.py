@@ -0,0 +1,142 @@
+import re
+import pytest
+from collections import namedtuple
+from datetime import datetime
+from models import db, IncomeContract, ExpenseContract
+from queries import (
+    actual_contracts_query, planning_contracts_query, income_contracts_query, income_options_query,
+    child_records_query, CHILD_COLLECTIONS
+)
+from views.common import get_planning_months
+
+# Списки договоров сортируются по id или по дате и id, как в fetch_list_page
+LIST_ORDERS = {
+    'id': lambda model, date_column: [model.id],
+    'date': lambda model, date_column: [date_column, model.id]
+}
+
+# Шаг плана: обращение к таблице (index=None - полный просмотр, пустое условие -
+# просмотр всего индекса) или сортировка (kind='sort')
+Step = namedtuple('Step', 'kind table index condition')
+
+SQLITE_STEP = re.compile(
+    r'^(?:SCAN|SEARCH) (?P<table>\S+)'
+    r'(?: USING (?:(?:AUTOMATIC )?(?:COVERING )?INDEX (?P<index>\S+)|(?P<pk>INTEGER PRIMARY KEY)))?'
+    r'(?: \((?P<condition>.*)\))?'
+)
+
+
+def sqlite_step(detail):
+    if detail.startswith('USE TEMP B-TREE'):
+        return Step('sort', None, None, '')
+    match = SQLITE_STEP.match(detail)
+    if match is None:
+        return Step('other', None, None, detail)
+    index = 'PRIMARY KEY' if match['pk'] else match['index']
+    return Step('access', match['table'], index, match['condition'] or '')
+
+
+def postgres_steps(node):
+    kind = node['Node Type']
+    if kind == 'Sort':
+        yield Step('sort', None, None, '')
+    elif kind == 'Seq Scan':
+        yield Step('access', node['Relation Name'], None, '')
+    elif kind in ('Index Scan', 'Index Only Scan'):
+        yield Step('access', node['Relation Name'], node['Index Name'], node.get('Index Cond', ''))
+    elif kind == 'Bitmap Heap Scan':
+        index_scan = node['Plans'][0]
+        yield Step('access', node['Relation Name'], index_scan.get('Index Name'), index_scan.get('Index Cond', ''))
+        return
+    for child in node.get('Plans', []):
+        yield from postgres_steps(child)
+
+
+def explain(query):
+    """Шаги плана запроса с подставленными параметрами: EXPLAIN QUERY PLAN в SQLite, EXPLAIN в PostgreSQL"""
+    sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'postgresql':
+        # На маленьких тестовых таблицах Seq Scan всегда дешевле, поэтому он запрещается:
+        # если подходящего индекса нет, PostgreSQL все равно выберет полный просмотр
+        db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+        plan = db.session.execute(db.text('EXPLAIN (FORMAT JSON) ' + sql)).scalar_one()
+        return list(postgres_steps(plan[0]['Plan']))
+    return [sqlite_step(row[-1]) for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def table_steps(plan, table):
+    return [step for step in plan if step.kind == 'access' and step.table == table]
+
+
+def assert_indexed(plan, table):
+    """Каждое обращение к таблице идет по индексу, а не полным просмотром"""
+    steps = table_steps(plan, table)
+    assert steps, f'{table} нет в плане: {plan}'
+    for step in steps:
+        assert step.index, f'полный просмотр {table}: {plan}'
+
+
+def assert_searched_by(plan, table, column, index=None):
+    """Таблица читается поиском по индексу с условием на column"""
+    steps = table_steps(plan, table)
+    assert steps, f'{table} нет в плане: {plan}'
+    for step in steps:
+        assert step.index and column in step.condition, plan
+        assert index is None or step.index == index, plan
+
+
+def assert_sorted_by_index(plan):
+    """Порядок строк дает индекс, без сортировки всего результата"""
+    assert not any(step.kind == 'sort' for step in plan), plan
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.mark.usefixtures('app_context')
+@pytest.mark.parametrize('order', LIST_ORDERS)
+def test_actual_list_uses_indexes(order):
+    plan = explain(actual_contracts_query().order_by(*LIST_ORDERS[order](ExpenseContract, ExpenseContract.start_date)))
+    assert_indexed(plan, 'expense_contracts')
+    assert_indexed(plan, 'contract_summary')
+    assert_sorted_by_index(plan)
+
+
+@pytest.mark.usefixtures('app_context')
+@pytest.mark.parametrize('order', LIST_ORDERS)
+def test_planning_list_uses_indexes(order):
+    query = planning_contracts_query(get_planning_months(datetime(2025, 6, 15)))
+    plan = explain(query.order_by(*LIST_ORDERS[order](ExpenseContract, ExpenseContract.start_date)))
+    assert_indexed(plan, 'expense_contracts')
+    # Строки cal_plan ищутся по диапазону дат окна, а не просматриваются за всю историю
+    assert_searched_by(plan, 'cal_plan', 'date', index='ix_cal_plan_date_iddog_plopl')
+
+
+@pytest.mark.usefixtures('app_context')
+@pytest.mark.parametrize('order', LIST_ORDERS)
+def test_income_list_uses_indexes(order):
+    plan = explain(income_contracts_query().order_by(*LIST_ORDERS[order](IncomeContract, IncomeContract.contract_date)))
+    assert_indexed(plan, 'income_contracts')
+    assert_sorted_by_index(plan)
+
+
+@pytest.mark.usefixtures('app_context')
+def test_income_options_use_live_rows_index():
+    plan = explain(income_options_query())
+    assert_indexed(plan, 'income_contracts')
+    # Частичный индекс сам отсекает удаленные договоры
+    assert all(step.index.startswith('ix_income_contracts_live') for step in table_steps(plan, 'income_contracts'))
+    if db.engine.dialect.name == 'sqlite':
+        assert_searched_by(plan, 'income_contracts', 'status', index='ix_income_contracts_live_status')
+
+
+@pytest.mark.usefixtures('app_context')
+@pytest.mark.parametrize('name', CHILD_COLLECTIONS)
+def test_child_lookups_search_by_contract(name):
+    model, key_column = CHILD_COLLECTIONS[name]
+    # Пакетная выдача /api/expense-contracts/children и дочерние списки одного договора
+    for query in (child_records_query(name, [1, 2, 3]), db.select(model).where(key_column == 1)):
+        assert_searched_by(explain(query), model.__table__.name, key_column.key)
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+# Выполняется в новом процессе: в процессе тестов модули уже импортированы
+PROBE = '''
+import json, sys
+loaded = lambda prefix: sorted(name for name in sys.modules if name == prefix or name.startswith(prefix + '.'))
+report = {}
+
+import app
+report['import app'] = loaded('views') + loaded('openpyxl')
+
+application = app.create_app({
+    'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'SQLALCHEMY_ENGINE_OPTIONS': {}, 'AUTO_CREATE_SCHEMA': False,
+    'RESPONSE_CACHE_ENABLED': False, 'UPLOAD_FOLDER': sys.argv[2], 'JOB_RESULTS_FOLDER': sys.argv[2]
+})
+with application.app_context():
+    app.setup_schema()
+report['create_app'] = loaded('openpyxl')
+
+client = application.test_client()
+report['health'] = [client.get('/api/health').status_code, *loaded('openpyxl')]
+report['export'] = [client.get('/api/export/actual.xlsx').status_code, 'openpyxl' in sys.modules]
+print(json.dumps(report))
+'''
+
+
+def test_openpyxl_is_imported_on_first_export(tmp_path):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, 'sqlite:///' + str(tmp_path / 'startup.db'), str(tmp_path)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True, text=True
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+
+    # Маршруты подключаются в create_app, а не при import app
+    assert report['import app'] == []
+    assert report['create_app'] == []
+    assert report['health'] == [200]
+    assert report['export'] == [200, True]
@@ -0,0 +1,138 @@
+import io
+import os
+import pytest
+import views.closed_works
+from models import db, FileBlob, ClosedWork
+from storage import BLOB_PREFIX, BLOBS_DIR
+
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 8 + b'\n%%EOF\n'
+OTHER_PDF = b'%PDF-1.4\n' + b'another act\n' * 100 + b'%%EOF\n'
+
+
+def add_work(client, contract_id, content=PDF, filename='act.pdf', act_number='КС-1'):
+    data = {'act_number': act_number, 'act_date': '2024-03-31', 'amount': '1000'}
+    if content is not None:
+        data['file'] = (io.BytesIO(content), filename)
+    return client.post(f'/api/expense-contracts/{contract_id}/closed-works', data=data,
+                       content_type='multipart/form-data')
+
+
+def replace_file(client, work_id, content, filename='new.pdf'):
+    return client.post(f'/api/closed-works/{work_id}/file', data={'file': (io.BytesIO(content), filename)},
+                       content_type='multipart/form-data')
+
+
+def blobs(app):
+    """{sha256: ref_count} и файлы в хранилище на диске"""
+    with app.app_context():
+        counts = dict(db.session.execute(db.select(FileBlob.sha256, FileBlob.ref_count)).all())
+    files = [
+        filename
+        for _, _, filenames in os.walk(os.path.join(app.config['UPLOAD_FOLDER'], BLOBS_DIR))
+        for filename in filenames
+    ]
+    return counts, sorted(files)
+
+
+def work_digest(app, work_id):
+    with app.app_context():
+        return db.session.get(ClosedWork, work_id).file_path[len(BLOB_PREFIX):]
+
+
+def test_identical_uploads_share_one_blob(app, client, contract_id):
+    first = add_work(client, contract_id).get_json()['work']['id']
+    second = add_work(client, contract_id, act_number='КС-2').get_json()['work']['id']
+
+    digest = work_digest(app, first)
+    assert work_digest(app, second) == digest
+    assert blobs(app) == ({digest: 2}, [digest])
+    assert client.get(f'/api/closed-works/{second}/file').data == PDF
+
+
+def test_ref_count_follows_replace_and_delete(app, client, contract_id):
+    first = add_work(client, contract_id).get_json()['work']['id']
+    second = add_work(client, contract_id, act_number='КС-2').get_json()['work']['id']
+    digest = work_digest(app, first)
+
+    assert replace_file(client, second, OTHER_PDF).status_code == 200
+    other = work_digest(app, second)
+    assert blobs(app)[0] == {digest: 1, other: 1}
+
+    assert client.delete(f'/api/expense-contracts/{contract_id}/closed-works/{first}').status_code == 200
+    assert blobs(app)[0] == {digest: 0, other: 1}
+    # Файл без ссылок остается на диске до сборки мусора
+    assert blobs(app)[1] == sorted([digest, other])
+
+
+def test_gc_files_removes_only_unreferenced_blobs(app, client, contract_id):
+    kept = add_work(client, contract_id).get_json()['work']['id']
+    removed = add_work(client, contract_id, OTHER_PDF, act_number='КС-2').get_json()['work']['id']
+    kept_digest, removed_digest = work_digest(app, kept), work_digest(app, removed)
+    client.delete(f'/api/expense-contracts/{contract_id}/closed-works/{removed}')
+
+    runner = app.test_cli_runner()
+    # Свежие файлы защищены сроком --grace
+    assert 'файлов без ссылок 0' in runner.invoke(args=['gc-files']).output
+    assert blobs(app) == ({kept_digest: 1, removed_digest: 0}, sorted([kept_digest, removed_digest]))
+
+    result = runner.invoke(args=['gc-files', '--grace', '0', '--dry-run'])
+    assert 'Будет удалено: файлов без ссылок 1' in result.output
+    assert len(blobs(app)[1]) == 2
+
+    result = runner.invoke(args=['gc-files', '--grace', '0'])
+    assert result.exit_code == 0
+    assert 'Удалено: файлов без ссылок 1' in result.output
+    assert blobs(app) == ({kept_digest: 1}, [kept_digest])
+    assert client.get(f'/api/closed-works/{kept}/file').data == PDF
+
+
+def test_upload_over_limit_is_rejected(app, client, contract_id, monkeypatch):
+    monkeypatch.setattr(views.closed_works, 'MAX_FILE_SIZE', 1024)
+
+    # Тело запроса больше лимита отклоняется до разбора формы
+    response = add_work(client, contract_id, b'%PDF-1.4\n' + b'0' * (128 * 1024))
+    assert response.status_code == 413
+    # Файл больше лимита, но тело укладывается в запас на поля формы
+    response = add_work(client, contract_id, b'%PDF-1.4\n' + b'0' * 2048)
+    assert response.status_code == 400
+
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(ClosedWork)).scalar_one() == 0
+    # Временные файлы прерванных загрузок удалены
+    assert blobs(app) == ({}, [])
+
+
+@pytest.mark.parametrize('content, filename, error', [
+    (b'', '', 'Файл не предоставлен'),
+    (PDF, 'act.exe', 'Разрешены только PDF файлы'),
+    (PDF, 'act', 'Разрешены только PDF файлы')
+])
+def test_invalid_file_is_rejected(app, client, contract_id, content, filename, error):
+    work_id = add_work(client, contract_id, content=None).get_json()['work']['id']
+
+    response = replace_file(client, work_id, content, filename)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert blobs(app) == ({}, [])
+
+
+def test_invalid_new_work_file_is_rejected(app, client, contract_id):
+    response = add_work(client, contract_id, filename='act.docx')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Разрешены только PDF файлы'
+
+
+def test_download_supports_range(client, contract_id):
+    work_id = add_work(client, contract_id).get_json()['work']['id']
+
+    response = client.get(f'/api/closed-works/{work_id}/file', headers={'Range': 'bytes=100-199'})
+
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(PDF)}'
+    assert response.data == PDF[100:200]
+
+    response = client.get(f'/api/closed-works/{work_id}/file?download=1', headers={'Range': f'bytes={len(PDF)}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(PDF)}'
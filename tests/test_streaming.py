@@ -0,0 +1,46 @@
+import tracemalloc
+import pytest
+from models import db, ExpenseContract, IncomeContract
+
+STREAMED_LISTS = ['/api/actual?stream=1', '/api/planning?stream=1', '/api/balance?stream=1']
+
+
+def streamed_peak(client, path):
+    """Пиковая память (tracemalloc) и размер тела потокового ответа"""
+    tracemalloc.start()
+    try:
+        response = client.get(path, buffered=False)
+        assert response.status_code == 200
+        size = sum(len(chunk) for chunk in response.iter_encoded())
+        response.close()
+        return tracemalloc.get_traced_memory()[1], size
+    finally:
+        tracemalloc.stop()
+
+
+def set_live_share(app, share):
+    """Оставляет неудаленной долю share доходных и расходных договоров (первые по id)"""
+    with app.app_context():
+        for model in (IncomeContract, ExpenseContract):
+            count = db.session.execute(db.select(db.func.count()).select_from(model)).scalar_one()
+            db.session.execute(db.update(model).values(deleted_at=None))
+            db.session.execute(
+                db.update(model).where(model.id > int(count * share)).values(deleted_at=db.func.current_timestamp()))
+        db.session.commit()
+
+
+@pytest.mark.parametrize('path', STREAMED_LISTS)
+def test_streamed_peak_memory_does_not_grow_with_rows(app, client, populate, path):
+    # Даже в меньшем ответе несколько пачек по STREAM_BATCH_SIZE строк
+    populate(40000)
+    client.get(path).close()
+
+    set_live_share(app, 0.25)
+    small_peak, small_size = streamed_peak(client, path)
+
+    set_live_share(app, 1)
+    large_peak, large_size = streamed_peak(client, path)
+
+    # В ответе в четыре раза больше строк, а пиковая память та же
+    assert large_size > small_size * 3
+    assert large_peak < small_peak * 1.25 + 256 * 1024, (small_peak, large_peak)
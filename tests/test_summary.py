@@ -0,0 +1,116 @@
+from decimal import Decimal
+import pytest
+from models import db, CostItem, ClosedWork
+from summary import check_summaries
+
+
+@pytest.fixture
+def contracts(client):
+    """Доходный договор и два расходных по нему: id расходных"""
+    response = client.post('/api/income-contracts', json={
+        'contract_number': 'Д-1', 'contract_date': '2024-01-10', 'client': 'ООО "Заказчик"',
+        'contract_amount': '1000000'
+    })
+    income_id = response.get_json()['contract']['id']
+
+    ids = []
+    for number in ('Р-1', 'Р-2'):
+        response = client.post('/api/expense-contracts', json={
+            'contract_number': number, 'start_date': '2024-02-01', 'end_date': '2024-12-31',
+            'name': f'Работы по договору {number}', 'contract_amount': '50000', 'type_contract': 'СМР',
+            'funding_source': income_id, 'client': 'ООО "Подрядчик"'
+        })
+        assert response.status_code == 201
+        ids.append(response.get_json()['contract']['id'])
+    return ids
+
+
+def add_cost_item(client, contract_id, amount):
+    response = client.post(f'/api/expense-contracts/{contract_id}/cost-items', json={
+        'date': '2024-03-01', 'kontragent': 'ООО "Поставщик"', 'category': 'Материалы',
+        'purpose': 'Оплата по счету', 'amount': amount
+    })
+    assert response.status_code == 200
+    return response.get_json()['cost_item']['id']
+
+
+def add_closed_work(client, contract_id, amount):
+    response = client.post(f'/api/expense-contracts/{contract_id}/closed-works', data={
+        'act_number': 'КС-1', 'act_date': '2024-03-31', 'amount': amount
+    })
+    assert response.status_code == 200
+    return response.get_json()['work']['id']
+
+
+def update_child(app, model, child_id, **values):
+    """Правка и перенос затрат и актов: отдельных маршрутов для них нет, изменения идут через сессию"""
+    with app.app_context():
+        child = db.session.get(model, child_id)
+        for name, value in values.items():
+            setattr(child, name, value)
+        db.session.commit()
+
+
+def actual_totals(client):
+    response = client.get('/api/actual?format=raw')
+    assert response.status_code == 200
+    return {
+        row['id']: (row['contractor_costs'], row['closed_works'], row['balance'], row['remaining_funding'])
+        for row in response.get_json()
+    }
+
+
+def assert_consistent(app):
+    with app.app_context():
+        assert check_summaries() == []
+
+
+def test_summaries_follow_child_changes(app, client, contracts):
+    first, second = contracts
+
+    item = add_cost_item(client, first, '100.50')
+    moved_item = add_cost_item(client, first, '200')
+    work = add_closed_work(client, first, '300')
+    assert_consistent(app)
+    assert actual_totals(client) == {
+        first: (300.5, 300.0, -300.5, 50000.0),
+        second: (0.0, 0.0, 0.0, 50000.0)
+    }
+
+    update_child(app, CostItem, item, amount=Decimal('50'))
+    update_child(app, ClosedWork, work, amount=Decimal('125.25'))
+    assert_consistent(app)
+    assert actual_totals(client)[first] == (250.0, 125.25, -250.0, 50000.0)
+
+    # Перенос на другой договор пересчитывает итоги обоих
+    update_child(app, CostItem, moved_item, contract_id=second)
+    update_child(app, ClosedWork, work, contract_id=second)
+    assert_consistent(app)
+    assert actual_totals(client) == {
+        first: (50.0, 0.0, -50.0, 50000.0),
+        second: (200.0, 125.25, -200.0, 50000.0)
+    }
+
+    assert client.delete(f'/api/expense-contracts/{first}/cost-items/{item}').status_code == 200
+    assert client.delete(f'/api/expense-contracts/{second}/closed-works/{work}').status_code == 200
+    assert_consistent(app)
+    assert actual_totals(client) == {
+        first: (0.0, 0.0, 0.0, 50000.0),
+        second: (200.0, 0.0, -200.0, 50000.0)
+    }
+
+
+def test_summaries_follow_contract_changes(app, client, contracts):
+    first, second = contracts
+    add_cost_item(client, first, '700')
+
+    response = client.put(f'/api/expense-contracts/{first}', json={'payment_loesk': '1000'})
+    assert response.status_code == 200
+    assert_consistent(app)
+    assert actual_totals(client)[first] == (700.0, 0.0, 300.0, 49000.0)
+
+    # Мягко удаленный договор пропадает из списка, его итоги остаются согласованными
+    assert client.delete(f'/api/expense-contracts/{second}').status_code == 200
+    add_cost_item(client, second, '10')
+    assert_consistent(app)
+    assert actual_totals(client) == {first: (700.0, 0.0, 300.0, 49000.0)}
@@ -0,0 +1,89 @@
+import pytest
+from models import db, User
+from passwords import passwords
+from users import ADMIN_ROLE, user_cache
+
+
+@pytest.fixture
+def users(app):
+    """Администратор и обычный пользователь: id по логину"""
+    # Кэш общий для процесса, а id пользователей в базах разных тестов совпадают
+    user_cache.invalidate()
+    with app.app_context():
+        created = [
+            User(username='boss', role=ADMIN_ROLE, password_hash=passwords.hash('boss-password')),
+            User(username='worker', role='ПТС', password_hash=passwords.hash('worker-password'))
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+        return {user.username: user.id for user in created}
+
+
+def logged_in(app, username):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': username, 'password': f'{username}-password'})
+    assert response.status_code == 200
+    return client
+
+
+def test_user_management_requires_admin(app, client, users):
+    worker = logged_in(app, 'worker')
+    boss = logged_in(app, 'boss')
+    requests = [
+        ('GET', '/api/auth/users', None),
+        ('PUT', f"/api/auth/users/{users['worker']}", {'role': 'МЭС'}),
+        ('DELETE', f"/api/auth/users/{users['worker']}", None)
+    ]
+
+    for method, path, body in requests:
+        assert client.open(path, method=method, json=body).status_code == 401
+        assert worker.open(path, method=method, json=body).status_code == 403
+    for method, path, body in requests:
+        assert boss.open(path, method=method, json=body).status_code == 200
+
+
+def test_current_user_hit_runs_no_queries(app, users, count_queries):
+    worker = logged_in(app, 'worker')
+
+    count_queries.count = 0
+    response = worker.get('/api/auth/current')
+
+    assert response.get_json()['username'] == 'worker'
+    assert count_queries.count == 0
+
+
+def test_update_user_invalidates_cache(app, users, count_queries):
+    worker = logged_in(app, 'worker')
+    boss = logged_in(app, 'boss')
+    assert worker.get('/api/auth/current').get_json()['role'] == 'ПТС'
+
+    response = boss.put(f"/api/auth/users/{users['worker']}", json={'username': 'foreman', 'role': ADMIN_ROLE})
+    assert response.status_code == 200
+
+    count_queries.count = 0
+    assert worker.get('/api/auth/current').get_json()['username'] == 'foreman'
+    assert worker.get('/api/auth/is-admin').get_json() == {'is_admin': True, 'username': 'foreman'}
+    # Пользователь перечитан из БД один раз и снова закэширован
+    assert count_queries.count == 1
+
+
+def test_delete_user_invalidates_cache(app, users):
+    worker = logged_in(app, 'worker')
+    boss = logged_in(app, 'boss')
+    assert worker.get('/api/auth/current').get_json() is not None
+
+    assert boss.delete(f"/api/auth/users/{users['worker']}").status_code == 200
+
+    assert worker.get('/api/auth/current').get_json() is None
+    assert worker.get('/api/auth/users').status_code == 401
+
+
+def test_deactivation_invalidates_cache(app, users):
+    worker = logged_in(app, 'worker')
+    assert worker.get('/api/auth/current').get_json() is not None
+
+    with app.app_context():
+        db.session.get(User, users['worker']).is_active = False
+        db.session.commit()
+
+    assert worker.get('/api/auth/current').get_json() is None
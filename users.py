@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, jsonify, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, User
+
+ADMIN_ROLE = 'Администратор системы'
+
+# Пользователи, измененные в текущей транзакции сессии. ALL_USERS - массовое
+# изменение (query(User).delete() и т.п.), после которого кэш очищается целиком
+SESSION_USERS_KEY = 'user_cache_changes'
+ALL_USERS = object()
+
+
+class CachedUser:
+    """Снимок пользователя без привязки к сессии: его можно отдавать из кэша в любой поток"""
+
+    __slots__ = ('id', 'username', 'role', 'is_active')
+
+    def __init__(self, id, username, role, is_active):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(user.id, user.username, user.role, bool(user.is_active))
+
+    @property
+    def is_admin(self):
+        # Администратор - пользователь admin или пользователь с ролью администратора
+        return self.username == 'admin' or self.role == ADMIN_ROLE
+
+
+class UserCache:
+    """Кэш пользователей сессий в памяти процесса с TTL.
+
+    Изменения пользователей через ORM сбрасывают записи этого процесса после
+    коммита. Другие воркеры узнают об изменении не позже чем через USER_CACHE_TTL
+    секунд, поэтому TTL - это и наибольшая задержка, с которой там подействует
+    смена роли или деактивация. USER_CACHE_TTL=0 отключает кэш.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 30
+        self.max_entries = 1024
+        self.after_fork()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 30)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 1024)
+
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_entries = app.config['USER_CACHE_MAX_ENTRIES']
+
+        app.extensions['user_cache'] = self
+
+    def after_fork(self):
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        """Пользователь по id: из кэша или одним запросом к БД. None, если не найден"""
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self.entries.move_to_end(user_id)
+                return entry[1]
+            generation = self.generation
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        return self.remember(user, generation)
+
+    def remember(self, user, generation=None):
+        """Кладет пользователя в кэш. generation - поколение на момент чтения из БД:
+        если с тех пор кэш сбрасывался, прочитанные данные могли устареть и не кэшируются"""
+        cached = CachedUser.from_model(user)
+        if self.ttl > 0:
+            with self.lock:
+                if generation is not None and generation != self.generation:
+                    return cached
+                self.entries[cached.id] = (time.monotonic() + self.ttl, cached)
+                self.entries.move_to_end(cached.id)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_ids=ALL_USERS):
+        with self.lock:
+            self.generation += 1
+            if user_ids is ALL_USERS:
+                self.entries.clear()
+                return
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+def resolve_user():
+    """Пользователь текущей сессии, один раз за запрос: g.user и g.role.
+
+    Неактивный, удаленный или отсутствующий в сессии пользователь - None.
+    """
+    if 'user' not in g:
+        user_id = session.get('user_id')
+        user = user_cache.get(user_id) if user_id else None
+        g.user = user if user is not None and user.is_active else None
+        g.role = g.user.role if g.user else None
+    return g.user
+
+
+def with_user(view):
+    """Декоратор маршрута: перед вызовом заполняет g.user и g.role, вход не обязателен"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        resolve_user()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def login_required(*roles):
+    """Декоратор маршрута: 401 без входа, 403 если роль пользователя не из roles.
+
+    Без roles достаточно входа. Администратору доступны все маршруты.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user = resolve_user()
+            if user is None:
+                return jsonify({'error': 'Требуется вход в систему'}), 401
+            if roles and user.role not in roles and not user.is_admin:
+                return jsonify({'error': 'Недостаточно прав'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Записи измененных пользователей сбрасываются после коммита транзакции
+
+def remember_changes(session, user_ids):
+    changes = session.info.get(SESSION_USERS_KEY)
+    if changes is ALL_USERS or user_ids is ALL_USERS:
+        session.info[SESSION_USERS_KEY] = ALL_USERS
+    else:
+        session.info[SESSION_USERS_KEY] = (changes or set()) | set(user_ids)
+
+
+@event.listens_for(Session, 'before_flush')
+def remember_flushed_users(session, flush_context, instances):
+    # У новых пользователей записей в кэше нет: отсутствующие id не кэшируются
+    user_ids = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if user_ids:
+        remember_changes(session, user_ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def remember_bulk_user_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is User:
+            remember_changes(orm_execute_state.session, ALL_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_committed_users(session):
+    changes = session.info.pop(SESSION_USERS_KEY, None)
+    if changes:
+        user_cache.invalidate(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_rolled_back_users(session):
+    session.info.pop(SESSION_USERS_KEY, None)
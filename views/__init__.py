@@ -0,0 +1 @@
+"""Маршруты API по разделам. Регистрируются в create_app, список - app.BLUEPRINTS"""
@@ -0,0 +1,207 @@
+from flask import Blueprint, g, jsonify, request, session
+from models import db, User
+from passwords import passwords, PasswordCheckBusy
+from users import ADMIN_ROLE, user_cache, with_user, login_required
+
+
+bp = Blueprint('auth', __name__)
+
+
+# Аутентификация
+@bp.route('/api/auth/login', methods=['POST'])
+def login():
+    """Эндпоинт для входа пользователя"""
+    try:
+        data = request.get_json()
+        username = data.get('username')
+        password = data.get('password')
+
+        if not username or not password:
+            return jsonify({"success": False, "error": "Логин и пароль обязательны"}), 400
+
+        # Ищем пользователя в базе. Транзакция завершается до проверки пароля,
+        # чтобы соединение не простаивало в пуле, пока считается хэш
+        user = db.session.execute(
+            db.select(User.id, User.username, User.role, User.is_active, User.password_hash)
+            .filter_by(username=username, is_active=True)
+        ).first()
+        db.session.rollback()
+
+        if user and passwords.verify(user.password_hash, password):
+            # Хэш, созданный с прежними настройками, пересчитывается по текущим
+            if passwords.needs_rehash(user.password_hash):
+                db.session.get(User, user.id).set_password(password)
+                db.session.commit()
+
+            # Сохраняем пользователя в сессии
+            session['user_id'] = user.id
+            session['username'] = user.username
+            session['role'] = user.role
+            # Следующие запросы страницы (/api/auth/current) возьмут пользователя из кэша
+            user_cache.remember(user)
+
+            return jsonify({
+                "success": True,
+                "user": {
+                    "id": user.id,
+                    "username": user.username,
+                    "role": user.role,
+                    "name": user.username
+                }
+            })
+
+        return jsonify({"success": False, "error": "Неверные учетные данные"}), 401
+
+    except PasswordCheckBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/auth/logout', methods=['POST'])
+def logout():
+    """Эндпоинт для выхода пользователя"""
+    session.clear()
+    return jsonify({"success": True, "message": "Успешный выход"})
+
+
+@bp.route('/api/auth/current', methods=['GET'])
+@with_user
+def get_current_user():
+    """Получить текущего пользователя"""
+    user = g.user
+    if user:
+        return jsonify({
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+            "name": user.username
+        })
+
+    # Возвращаем null вместо ошибки, если пользователь не авторизован
+    return jsonify(None)
+
+
+@bp.route('/api/auth/register', methods=['POST'])
+def register():
+    """Регистрация нового пользователя (только для определенных ролей)"""
+    try:
+        data = request.get_json()
+        username = data.get('username')
+        password = data.get('password')
+        role = data.get('role', 'Экономика')
+
+        if not username or not password:
+            return jsonify({"success": False, "error": "Логин и пароль обязательны"}), 400
+
+        # Проверяем допустимость роли
+        allowed_roles = ['Экономика', 'ПТС', 'Кап. строй', 'МЭС', 'Администратор системы']
+        if role not in allowed_roles:
+            return jsonify({"success": False, "error": "Недопустимая роль пользователя"}), 400
+
+        # Проверяем, существует ли пользователь
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            return jsonify({"success": False, "error": "Пользователь с таким логином уже существует"}), 400
+
+        # Создаем нового пользователя
+        new_user = User(username=username, role=role)
+        new_user.set_password(password)
+
+        db.session.add(new_user)
+        db.session.commit()
+
+        return jsonify({
+            "success": True,
+            "message": "Пользователь успешно создан",
+            "user": new_user.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/auth/is-admin', methods=['GET'])
+@with_user
+def check_admin():
+    """Проверка, является ли пользователь администратором"""
+    try:
+        user = g.user
+        if user:
+            return jsonify({
+                "is_admin": user.is_admin,
+                "username": user.username
+            })
+
+        # Если не авторизован - не администратор
+        return jsonify({"is_admin": False})
+    except Exception as e:
+        return jsonify({"is_admin": False, "error": str(e)}), 500
+
+
+# Управление пользователями доступно только администраторам
+
+# Получить всех пользователей
+@bp.route('/api/auth/users', methods=['GET'])
+@login_required(ADMIN_ROLE)
+def get_users():
+    try:
+        users = User.query.all()
+        return jsonify([user.to_dict() for user in users])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Изменения пользователей сбрасывают их записи в кэше users.user_cache после коммита
+
+
+# Обновить пользователя
+@bp.route('/api/auth/users/<int:user_id>', methods=['PUT'])
+@login_required(ADMIN_ROLE)
+def update_user(user_id):
+    try:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'error': 'Пользователь не найден'}), 404
+
+        data = request.get_json()
+
+        if 'username' in data:
+            user.username = data['username']
+        if 'role' in data:
+            user.role = data['role']
+        if 'password' in data and data['password']:
+            user.set_password(data['password'])
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Пользователь обновлен',
+            'user': user.to_dict()
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при обновлении пользователя: {str(e)}'}), 500
+
+
+# Удалить пользователя (мягкое удаление)
+@bp.route('/api/auth/users/<int:user_id>', methods=['DELETE'])
+@login_required(ADMIN_ROLE)
+def delete_user(user_id):
+    try:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'error': 'Пользователь не найден'}), 404
+
+        # Мягкое удаление - деактивируем пользователя
+        user.is_active = False
+        db.session.commit()
+
+        return jsonify({'message': 'Пользователь деактивирован'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при удалении пользователя: {str(e)}'}), 500
@@ -0,0 +1,77 @@
+from flask import Blueprint, jsonify, request, current_app
+from cache import cache
+from queries import iter_balance_groups
+from views.common import STREAM_BATCH_SIZE, parse_list_params, stream_response
+from decimal import Decimal
+
+
+bp = Blueprint('balance', __name__)
+
+
+def serialize_balance_group(income, related_expenses):
+    total_income = income.contract_amount
+    total_expense = sum(exp.contract_amount for exp in related_expenses)
+    total_paid = sum(exp.payment_loesk for exp in related_expenses)
+
+    contract_balance = (income.paid_amount or Decimal('0')) - total_paid
+
+    return {
+        'income_contract': {
+            'id': income.id,
+            'number': income.contract_number,
+            'client': income.client,
+            'amount': str(total_income),
+            'paid': str(income.paid_amount or Decimal('0'))
+        },
+        'expense_contracts': [{
+            'id': exp.id,
+            'number': exp.contract_number,
+            'amount': str(exp.contract_amount),
+            'paid': str(exp.payment_loesk or Decimal('0'))
+        } for exp in related_expenses],
+        'total_expense': str(total_expense),
+        'total_paid': str(total_paid),
+        'balance': str(contract_balance)
+    }, contract_balance
+
+
+def stream_balance(groups):
+    """Потоковый ответ баланса: итоговый баланс дописывается после всех договоров"""
+    total_balance = Decimal('0')
+    yield '{"contracts":['
+    for number, (income, related_expenses) in enumerate(groups):
+        item, contract_balance = serialize_balance_group(income, related_expenses)
+        total_balance += contract_balance
+        if number:
+            yield ','
+        yield current_app.json.dumps(item)
+    yield '],"total_balance":' + current_app.json.dumps(str(total_balance)) + '}'
+
+
+@bp.route('/api/balance', methods=['GET'])
+@cache.cached('balance')
+def get_balance_data():
+    try:
+        # Доходные и расходные договоры сливаются за один проход по id доходного договора
+        groups = iter_balance_groups(STREAM_BATCH_SIZE)
+
+        if parse_list_params(request.args)['stream']:
+            return stream_response(stream_balance(groups))
+
+        result = []
+        total_balance = Decimal('0')
+
+        for income, related_expenses in groups:
+            item, contract_balance = serialize_balance_group(income, related_expenses)
+            result.append(item)
+            total_balance += contract_balance
+
+        return jsonify({
+            'contracts': result,
+            'total_balance': str(total_balance)
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,177 @@
+from flask import Blueprint, jsonify, request, current_app
+from models import db, ExpenseContract, ClosedWork
+from storage import FileTooLarge, store_upload, resolve_path, discard_file, send_upload
+from datetime import datetime
+from decimal import Decimal
+import os
+from werkzeug.exceptions import RequestEntityTooLarge, RequestedRangeNotSatisfiable
+from werkzeug.utils import secure_filename
+
+
+bp = Blueprint('closed_works', __name__)
+
+# Загрузка файлов актов
+ALLOWED_EXTENSIONS = {'pdf'}
+MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+# Запас на остальные поля формы сверх размера файла
+MAX_FORM_OVERHEAD = 64 * 1024
+
+
+def allowed_file(filename):
+    if not filename or '.' not in filename:
+        return False
+    return filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+# Получить закрытые работы по договору
+@bp.route('/api/expense-contracts/<int:contract_id>/closed-works', methods=['GET'])
+def get_closed_works(contract_id):
+    try:
+        works = ClosedWork.query.filter_by(contract_id=contract_id).all()
+        return jsonify([work.to_dict() for work in works])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Добавить закрытую работу с файлом
+@bp.route('/api/expense-contracts/<int:contract_id>/closed-works', methods=['POST'])
+def add_closed_work(contract_id):
+    try:
+        # Проверяем существование договора
+        contract = db.session.get(ExpenseContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        # Тело запроса больше лимита отклоняется еще при разборе формы, до записи на диск
+        request.max_content_length = MAX_FILE_SIZE + MAX_FORM_OVERHEAD
+
+        act_number = request.form.get('act_number')
+        act_date = request.form.get('act_date')
+        amount = request.form.get('amount')
+        file = request.files.get('file')
+
+        if not act_number or not act_date or not amount:
+            return jsonify({'error': 'Все обязательные поля должны быть заполнены'}), 400
+
+        new_work = ClosedWork(
+            contract_id=contract_id,
+            act_number=act_number,
+            act_date=datetime.strptime(act_date, '%Y-%m-%d'),
+            amount=Decimal(amount)
+        )
+
+        # Обработка файла
+        if file and file.filename:
+            if not allowed_file(file.filename):
+                return jsonify({'error': 'Разрешены только PDF файлы'}), 400
+
+            # Файл сохраняется по хэшу содержимого, одинаковые файлы хранятся в одной копии
+            new_work.file_name = secure_filename(file.filename)
+            new_work.file_path = store_upload(file, current_app.config['UPLOAD_FOLDER'], MAX_FILE_SIZE)
+
+        db.session.add(new_work)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Акт КС успешно добавлен',
+            'work': new_work.to_dict()
+        })
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Файл слишком большой. Максимальный размер: 16MB'}), 413
+    except FileTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Ошибка при добавлении акта')
+        return jsonify({'error': f'Ошибка при добавлении акта: {str(e)}'}), 500
+
+
+# Эндпоинт для скачивания/просмотра файла
+@bp.route('/api/closed-works/<int:work_id>/file', methods=['GET'])
+def get_closed_work_file(work_id):
+    try:
+        work = db.session.get(ClosedWork, work_id)
+        if not work or not work.file_path:
+            return jsonify({'error': 'Файл не найден'}), 404
+
+        file_path = resolve_path(work.file_path, current_app.config['UPLOAD_FOLDER'])
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'Файл не существует на сервере'}), 404
+
+        # Для скачивания отправляем как attachment, для просмотра - inline
+        if request.args.get('download'):
+            return send_upload(file_path, current_app.config['UPLOAD_FOLDER'],
+                               mimetype='application/pdf', as_attachment=True, download_name=work.file_name)
+        return send_upload(file_path, current_app.config['UPLOAD_FOLDER'], mimetype='application/pdf')
+
+    except RequestedRangeNotSatisfiable:
+        # Ответ 416 с заголовком Content-Range формирует werkzeug
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Ошибка при загрузке файла: {str(e)}'}), 500
+
+
+# Обновляем эндпоинт удаления для удаления файлов
+@bp.route('/api/expense-contracts/<int:contract_id>/closed-works/<int:work_id>', methods=['DELETE'])
+def delete_closed_work(contract_id, work_id):
+    try:
+        work = db.session.get(ClosedWork, work_id)
+        if not work or work.contract_id != contract_id:
+            return jsonify({'error': 'Акт не найден'}), 404
+
+        file_path = work.file_path
+        db.session.delete(work)
+        db.session.commit()
+
+        # Файл удаляется после фиксации транзакции, чтобы при ошибке БД он не потерялся
+        discard_file(file_path, current_app.config['UPLOAD_FOLDER'])
+
+        return jsonify({'message': 'Акт КС успешно удален'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при удалении акта: {str(e)}'}), 500
+
+
+# Эндпоинт для добавления файла к существующему акту
+@bp.route('/api/closed-works/<int:work_id>/file', methods=['POST'])
+def add_file_to_closed_work(work_id):
+    try:
+        work = db.session.get(ClosedWork, work_id)
+        if not work:
+            return jsonify({'error': 'Акт не найден'}), 404
+
+        request.max_content_length = MAX_FILE_SIZE + MAX_FORM_OVERHEAD
+
+        file = request.files.get('file')
+        if not file or not file.filename:
+            return jsonify({'error': 'Файл не предоставлен'}), 400
+
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Разрешены только PDF файлы'}), 400
+
+        # Обновляем запись акта, старый файл удаляется только после сохранения нового
+        old_file_path = work.file_path
+        work.file_name = secure_filename(file.filename)
+        work.file_path = store_upload(file, current_app.config['UPLOAD_FOLDER'], MAX_FILE_SIZE)
+        work.updated_at = datetime.utcnow()
+
+        db.session.commit()
+        if old_file_path != work.file_path:
+            discard_file(old_file_path, current_app.config['UPLOAD_FOLDER'])
+
+        return jsonify({
+            'message': 'Файл успешно добавлен',
+            'file_url': f'/api/closed-works/{work.id}/file',
+            'file_name': work.file_name
+        })
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Файл слишком большой. Максимальный размер: 16MB'}), 413
+    except FileTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Ошибка при добавлении файла')
+        return jsonify({'error': f'Ошибка при добавлении файла: {str(e)}'}), 500
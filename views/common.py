@@ -0,0 +1,185 @@
+from flask import Response, jsonify, request, stream_with_context, current_app
+from models import db
+from queries import apply_contract_filters, count_query, paginate_keyset
+from datetime import datetime, timedelta
+from itertools import islice
+
+# Общие функции разделов API: форматирование сумм, параметры и выдача списков, фоновые задачи
+
+# Постраничная выдача списков договоров
+MAX_PAGE_SIZE = 500
+
+# Потоковая выдача: строки читаются из курсора пачками по STREAM_BATCH_SIZE
+STREAM_BATCH_SIZE = 500
+STREAM = 'stream'
+
+
+def format_currency(value):
+    if value is None:
+        return '0 ₽'
+    return f"{value:,.2f} ₽".replace(',', ' ').replace('.', ',')
+
+
+def format_currency_column(values):
+    """То же, что format_currency, но для целого столбца сумм.
+
+    Числа форматируются в одну строку, и замены разделителей выполняются
+    один раз для всего столбца, а не для каждого значения отдельно.
+    """
+    if not values:
+        return []
+    text = '\n'.join([format(value, ',.2f') if value is not None else '0' for value in values])
+    text = text.replace(',', ' ').replace('.', ',')
+    return (text.replace('\n', ' ₽\n') + ' ₽').split('\n')
+
+
+def get_planning_months(current_date=None):
+    """Начала текущего и двух следующих месяцев, а также граница окна планирования"""
+    current_date = current_date or datetime.now()
+
+    current_month = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month_1 = (current_month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    next_month_2 = (next_month_1.replace(day=28) + timedelta(days=4)).replace(day=1)
+    window_end = (next_month_2.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    return current_month, next_month_1, next_month_2, window_end
+
+
+def parse_list_params(args):
+    """Параметры фильтрации, сортировки и пагинации списков договоров из query string"""
+    params = {
+        'client': args.get('client'),
+        'type_contract': args.get('type_contract'),
+        'is_mes': None,
+        'date_from': None,
+        'date_to': None,
+        'sort': args.get('sort', 'id'),
+        'descending': args.get('order', 'asc') == 'desc',
+        'cursor': args.get('cursor'),
+        'limit': None,
+        'stream': args.get('stream', '').lower() in ('1', 'true', 'yes')
+    }
+
+    if args.get('is_mes') is not None:
+        params['is_mes'] = args.get('is_mes').lower() in ('1', 'true', 'yes')
+
+    try:
+        if args.get('date_from'):
+            params['date_from'] = datetime.strptime(args['date_from'], '%Y-%m-%d')
+        if args.get('date_to'):
+            # Дата окончания периода включительно
+            params['date_to'] = datetime.strptime(args['date_to'], '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        raise ValueError('Даты периода должны быть в формате ГГГГ-ММ-ДД')
+
+    if params['sort'] not in ('id', 'date'):
+        raise ValueError('Сортировка возможна только по полям id и date')
+
+    if args.get('limit') is not None:
+        try:
+            params['limit'] = int(args['limit'])
+        except ValueError:
+            raise ValueError('Параметр limit должен быть числом')
+        if not 1 <= params['limit'] <= MAX_PAGE_SIZE:
+            raise ValueError(f'Параметр limit должен быть от 1 до {MAX_PAGE_SIZE}')
+
+    return params
+
+
+def iter_stream_rows(query):
+    """Строки запроса пачками из курсора БД.
+
+    Запрос выполняется при первой итерации, то есть уже внутри потокового ответа,
+    где сессия привязана к контексту stream_with_context.
+    """
+    yield from db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+
+def fetch_list_page(query, model, date_field):
+    """Выполняет запрос списка с фильтрами из запроса.
+
+    Без параметра limit возвращает все строки, как раньше. С limit - одну страницу
+    по курсору и сведения о странице (общее количество и курсор следующей страницы).
+    С stream=1 возвращает ленивый итератор строк и признак STREAM.
+    """
+    params = parse_list_params(request.args)
+    query = apply_contract_filters(query, model, getattr(model, date_field), params)
+    sort_field = date_field if params['sort'] == 'date' else 'id'
+
+    if params['limit'] is None:
+        order = [getattr(model, sort_field), model.id] if sort_field != 'id' else [model.id]
+        query = query.order_by(*[column.desc() if params['descending'] else column for column in order])
+        if params['stream']:
+            return iter_stream_rows(query), STREAM
+        return db.session.execute(query).all(), None
+
+    total = db.session.execute(count_query(query)).scalar_one()
+    rows, next_cursor = paginate_keyset(
+        query, model, sort_field, params['limit'], params['cursor'], params['descending'])
+
+    return rows, {'total': total, 'limit': params['limit'], 'next_cursor': next_cursor}
+
+
+def stream_json_array(items):
+    """Кодирует элементы в JSON-массив по одному, не собирая весь ответ в памяти"""
+    yield '['
+    for number, item in enumerate(items):
+        if number:
+            yield ','
+        yield current_app.json.dumps(item)
+    yield ']'
+
+
+def stream_response(chunks):
+    return Response(stream_with_context(chunks), mimetype='application/json')
+
+
+def present_currency(rows, fields, raw=False):
+    """Подставляет в строки ответа отформатированные суммы, а при format=raw - числа"""
+    for field in fields:
+        if raw:
+            for row in rows:
+                row[field] = float(row[field] or 0)
+        else:
+            formatted = format_currency_column([row[field] for row in rows])
+            for row, value in zip(rows, formatted):
+                row[field] = value
+    return rows
+
+
+def iter_batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def list_response(items, page, currency_fields=()):
+    raw = request.args.get('format') == 'raw'
+
+    if page == STREAM:
+        # Суммы форматируются пачками, чтобы не держать весь ответ в памяти
+        return stream_response(stream_json_array(
+            row
+            for batch in iter_batches(items, STREAM_BATCH_SIZE)
+            for row in present_currency(batch, currency_fields, raw)
+        ))
+
+    items = present_currency(list(items), currency_fields, raw)
+    if page is None:
+        return jsonify(items)
+    return jsonify({'items': items, **page})
+
+
+def wants_async():
+    """?async=1 - выполнить операцию фоновой задачей и сразу вернуть 202"""
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def job_accepted(job):
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
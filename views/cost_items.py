@@ -0,0 +1,81 @@
+from flask import Blueprint, jsonify, request
+from models import db, ExpenseContract, CostItem
+from datetime import datetime
+from decimal import Decimal
+
+
+bp = Blueprint('cost_items', __name__)
+
+
+# Получить затраты подрядчика
+@bp.route('/api/expense-contracts/<int:contract_id>/cost-items', methods=['GET'])
+def get_cost_items(contract_id):
+    try:
+        cost_items = CostItem.query.filter_by(contract_id=contract_id).all()
+        return jsonify([item.to_dict() for item in cost_items])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Добавить затрату подрядчика
+@bp.route('/api/expense-contracts/<int:contract_id>/cost-items', methods=['POST'])
+def add_cost_item(contract_id):
+    try:
+        # Проверяем существование договора
+        contract = db.session.get(ExpenseContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        data = request.get_json()
+
+        # Валидация обязательных полей
+        required_fields = ['date', 'kontragent', 'category', 'purpose', 'amount']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({'error': f'Поле {field} обязательно для заполнения'}), 400
+
+        new_cost_item = CostItem(
+            contract_id=contract_id,
+            date=datetime.strptime(data['date'], '%Y-%m-%d'),
+            kontragent=data['kontragent'],
+            category=data['category'],
+            purpose=data['purpose'],
+            amount=Decimal(data['amount'])
+        )
+
+        db.session.add(new_cost_item)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Платеж успешно добавлен',
+            'cost_item': {
+                'id': new_cost_item.id,
+                'date': new_cost_item.date.strftime('%Y-%m-%d'),
+                'kontragent': new_cost_item.kontragent,
+                'category': new_cost_item.category,
+                'purpose': new_cost_item.purpose,
+                'amount': str(new_cost_item.amount)
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при добавлении платежа: {str(e)}'}), 500
+
+
+# Удалить затрату подрядчика
+@bp.route('/api/expense-contracts/<int:contract_id>/cost-items/<int:item_id>', methods=['DELETE'])
+def delete_cost_item(contract_id, item_id):
+    try:
+        cost_item = db.session.get(CostItem, item_id)
+        if not cost_item or cost_item.contract_id != contract_id:
+            return jsonify({'error': 'Платеж не найден'}), 404
+
+        db.session.delete(cost_item)
+        db.session.commit()
+
+        return jsonify({'message': 'Платеж успешно удален'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при удалении платежа: {str(e)}'}), 500
@@ -0,0 +1,106 @@
+from flask import Blueprint, jsonify, request, send_file, current_app
+from models import db
+from jobs import jobs
+from bulk_import import IMPORT_KINDS, read_records, import_records
+from excel_export import EXPORT_TITLES, write_export, export_download_name
+from views.common import get_planning_months, parse_list_params, wants_async, job_accepted
+import os
+import shutil
+import tempfile
+
+
+bp = Blueprint('exchange', __name__)
+
+
+# Массовый импорт договоров, затрат и актов КС из CSV или JSONL
+@bp.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    try:
+        if kind not in IMPORT_KINDS:
+            return jsonify({'error': 'Неизвестный вид импорта'}), 404
+
+        file = request.files.get('file')
+        if not file or not file.filename:
+            return jsonify({'error': 'Файл не предоставлен'}), 400
+
+        file_format = request.form.get('format') or (
+            'jsonl' if file.filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        if wants_async():
+            # Файл сохраняется рядом с результатами задач и удаляется после импорта
+            os.makedirs(current_app.config['JOB_RESULTS_FOLDER'], exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=current_app.config['JOB_RESULTS_FOLDER'], prefix='import-', suffix='.upload')
+            with os.fdopen(fd, 'wb') as output:
+                shutil.copyfileobj(file.stream, output)
+            return job_accepted(jobs.submit('import', {'kind': kind, 'path': path, 'file_format': file_format}))
+
+        report = import_records(kind, read_records(file.stream, file_format))
+        return jsonify(report), 200 if not report['errors'] else 207
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при импорте: {str(e)}'}), 500
+
+
+# Выгрузка реестров в Excel на стороне сервера
+@bp.route('/api/export/<kind>.xlsx', methods=['GET'])
+def export_excel(kind):
+    try:
+        if kind not in EXPORT_TITLES:
+            return jsonify({'error': 'Неизвестный вид выгрузки'}), 404
+
+        filters = parse_list_params(request.args)
+
+        if wants_async():
+            args = {key: value for key, value in request.args.items() if key != 'async'}
+            return job_accepted(jobs.submit('export', {'kind': kind, 'args': args}))
+
+        # Временный файл без имени удаляется сам после отправки ответа
+        output = tempfile.TemporaryFile()
+        try:
+            write_export(kind, output, filters, get_planning_months())
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+
+        return send_file(
+            output,
+            as_attachment=True,
+            download_name=export_download_name(kind),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Ошибка при выгрузке в Excel: {str(e)}'}), 500
+
+
+@jobs.task('export')
+def export_job(context, kind, args=None):
+    if kind not in EXPORT_TITLES:
+        raise ValueError('Неизвестный вид выгрузки')
+    path = context.result_path('xlsx')
+    count = write_export(kind, path, parse_list_params(args or {}), get_planning_months(), context.progress)
+    return {
+        'count': count,
+        'file': os.path.basename(path),
+        'download_name': export_download_name(kind),
+        'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+
+
+@jobs.task('import', public=False)
+def import_job(context, kind, path, file_format):
+    try:
+        # Число строк файла нужно только для процента выполнения
+        with open(path, 'rb') as stream:
+            total = sum(chunk.count(b'\n') for chunk in iter(lambda: stream.read(1024 * 1024), b''))
+        with open(path, 'rb') as stream:
+            return import_records(kind, read_records(stream, file_format),
+                                  progress=lambda done: context.progress(done, total))
+    finally:
+        os.remove(path)
@@ -0,0 +1,268 @@
+from flask import Blueprint, jsonify, request
+from models import db, IncomeContract, ExpenseContract
+from cache import cache
+from queries import actual_contracts_query, CHILD_COLLECTIONS, load_child_collections
+from views.common import MAX_PAGE_SIZE, format_currency, fetch_list_page, list_response
+from datetime import datetime
+from decimal import Decimal
+
+
+bp = Blueprint('expense', __name__)
+
+
+ACTUAL_CURRENCY_FIELDS = (
+    'contract_amount', 'payment_loesk', 'contractor_costs', 'closed_works', 'balance', 'remaining_funding'
+)
+
+
+def serialize_actual_row(contract, contractor_costs, closed_works_total, balance, remaining_funding):
+    return {
+        'id': contract.id,
+        'type_contract': contract.type_contract,
+        'contract': contract.contract_number,
+        'client': contract.client,
+        'start_date': contract.start_date.strftime('%Y-%m-%d'),
+        'end_date': contract.end_date.strftime('%Y-%m-%d'),
+        'name': contract.name,
+        'contract_amount': contract.contract_amount,
+        'advance': f"{contract.advance_percentage}%" if contract.advance_percentage else '',
+        'payment_loesk': contract.payment_loesk,
+        'contractor_costs': contractor_costs,
+        'closed_works': closed_works_total,  # Теперь это сумма всех актов КС
+        'balance': balance,
+        'remaining_funding': remaining_funding
+    }
+
+
+@bp.route('/api/actual', methods=['GET'])
+@cache.cached('actual')
+def get_actual_contracts():
+    try:
+        # Суммы затрат, актов КС и сальдо читаются из contract_summary одним запросом
+        rows, page = fetch_list_page(actual_contracts_query(), ExpenseContract, 'start_date')
+        return list_response((serialize_actual_row(*row) for row in rows), page, ACTUAL_CURRENCY_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/expense-contracts', methods=['POST'])
+def create_expense_contract():
+    try:
+        data = request.get_json()
+
+        # Валидация обязательных полей
+        required_fields = [
+            'contract_number', 'start_date', 'end_date',
+            'name', 'contract_amount', 'type_contract', 'funding_source', 'client'
+        ]
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({'error': f'Поле {field} обязательно для заполнения'}), 400
+
+        # Проверка уникальности номера договора
+        existing_contract = db.session.execute(
+            db.select(ExpenseContract).filter_by(contract_number=data['contract_number'])
+        ).scalar_one_or_none()
+
+        if existing_contract:
+            return jsonify({'error': 'Договор с таким номером уже существует'}), 400
+
+        # Проверка существования и активности доходного договора
+        income_contract = IncomeContract.query.filter(
+            IncomeContract.id == data['funding_source'],
+            IncomeContract.status == 'active',
+            IncomeContract.deleted_at.is_(None)
+        ).first()
+
+        if not income_contract:
+            return jsonify({'error': 'Указанный источник финансирования не найден или не активен'}), 400
+
+        # Создание нового расходного договора
+        new_contract = ExpenseContract(
+            contract_number=data['contract_number'],
+            type_contract=data['type_contract'],
+            start_date=datetime.strptime(data['start_date'], '%Y-%m-%d'),
+            end_date=datetime.strptime(data['end_date'], '%Y-%m-%d'),
+            name=data['name'],
+            client=data['client'],  # Контрагент
+            contract_amount=Decimal(data['contract_amount']),
+            advance_percentage=Decimal(data.get('advance_percentage', 0)),
+            payment_loesk=Decimal(0),
+            income_contract_id=data['funding_source'],
+            is_mes=data.get('is_mes', False),  # Новое поле
+            status='active'
+        )
+
+        db.session.add(new_contract)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Расходный договор успешно создан',
+            'contract': {
+                'id': new_contract.id,
+                'contract_number': new_contract.contract_number,
+                'type_contract': new_contract.type_contract,
+                'start_date': new_contract.start_date.strftime('%Y-%m-%d'),
+                'end_date': new_contract.end_date.strftime('%Y-%m-%d'),
+                'name': new_contract.name,
+                'client': new_contract.client,
+                'is_mes': new_contract.is_mes,  # Добавляем в ответ
+                'contract_amount': format_currency(new_contract.contract_amount),
+                'advance_percentage': str(new_contract.advance_percentage),
+                'income_contract_id': new_contract.income_contract_id
+            }
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при создании договора: {str(e)}'}), 500
+
+
+@bp.route('/api/expense-contracts/<int:contract_id>', methods=['GET'])
+def get_expense_contract(contract_id):
+    try:
+        contract = ExpenseContract.query.get_or_404(contract_id)
+        return jsonify({
+            'id': contract.id,
+            'contract_number': contract.contract_number,
+            'start_date': contract.start_date.strftime('%Y-%m-%d'),
+            'end_date': contract.end_date.strftime('%Y-%m-%d'),
+            'name': contract.name,
+            'client': contract.client,
+            'contract_amount': str(contract.contract_amount),
+            'advance_percentage': str(contract.advance_percentage),
+            'payment_loesk': str(contract.payment_loesk),
+            'type_contract': contract.type_contract,
+            'income_contract_id': contract.income_contract_id,
+            'status': contract.status
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+
+
+@bp.route('/api/expense-contracts/<int:contract_id>', methods=['PUT'])
+def update_expense_contract(contract_id):
+    try:
+        contract = db.session.get(ExpenseContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        data = request.get_json()
+
+        # Если обновляется источник финансирования, проверяем его активность
+        if 'income_contract_id' in data:
+            income_contract = IncomeContract.query.filter(
+                IncomeContract.id == data['income_contract_id'],
+                IncomeContract.status == 'active',
+                IncomeContract.deleted_at.is_(None)
+            ).first()
+            if not income_contract:
+                return jsonify({'error': 'Указанный источник финансирования не найден или не активен'}), 400
+
+        # Обновляем все поля
+        if 'contract_number' in data:
+            contract.contract_number = data['contract_number']
+        if 'start_date' in data:
+            contract.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d')
+        if 'end_date' in data:
+            contract.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d')
+        if 'name' in data:
+            contract.name = data['name']
+        if 'client' in data:
+            contract.client = data['client']
+        if 'contract_amount' in data:
+            contract.contract_amount = Decimal(data['contract_amount'])
+        if 'advance_percentage' in data:
+            contract.advance_percentage = Decimal(data['advance_percentage'])
+        if 'type_contract' in data:
+            contract.type_contract = data['type_contract']
+        if 'income_contract_id' in data:
+            contract.income_contract_id = data['income_contract_id']
+        if 'payment_loesk' in data:
+            contract.payment_loesk = Decimal(data['payment_loesk'])
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Данные договора обновлены',
+            'contract': {
+                'id': contract.id,
+                'contract_number': contract.contract_number,
+                'start_date': contract.start_date.strftime('%Y-%m-%d'),
+                'end_date': contract.end_date.strftime('%Y-%m-%d'),
+                'name': contract.name,
+                'client': contract.client,
+                'contract_amount': str(contract.contract_amount),
+                'advance_percentage': str(contract.advance_percentage),
+                'type_contract': contract.type_contract,
+                'income_contract_id': contract.income_contract_id,
+                'payment_loesk': str(contract.payment_loesk)
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при обновлении договора: {str(e)}'}), 500
+
+
+@bp.route('/api/expense-contracts/<int:contract_id>', methods=['DELETE'])
+def delete_expense_contract(contract_id):
+    try:
+        contract = db.session.get(ExpenseContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        # Мягкое удаление - устанавливаем время удаления
+        contract.deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        return jsonify({'message': 'Договор успешно удален'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при удалении договора: {str(e)}'}), 500
+
+
+def parse_children_params(args):
+    """Список id договоров и коллекций: ?ids=1,2,3&collections=cost_items,cal_plan"""
+    def split_values(name):
+        return [value for raw in args.getlist(name) for value in raw.split(',') if value.strip()]
+
+    try:
+        contract_ids = list(dict.fromkeys(int(value) for value in split_values('ids')))
+    except ValueError:
+        raise ValueError('Параметр ids должен содержать целые числа через запятую')
+    if not contract_ids:
+        raise ValueError('Не указаны id договоров')
+    if len(contract_ids) > MAX_PAGE_SIZE:
+        raise ValueError(f'За один запрос можно получить не более {MAX_PAGE_SIZE} договоров')
+
+    collections = list(dict.fromkeys(value.strip() for value in split_values('collections')))
+    collections = collections or list(CHILD_COLLECTIONS)
+    unknown = [name for name in collections if name not in CHILD_COLLECTIONS]
+    if unknown:
+        raise ValueError(f"Неизвестные коллекции: {', '.join(unknown)}")
+
+    return contract_ids, collections
+
+
+# Получить затраты, акты КС и календарные планы сразу для нескольких договоров
+@bp.route('/api/expense-contracts/children', methods=['GET'])
+@cache.cached('children')
+def get_contracts_children():
+    try:
+        contract_ids, collections = parse_children_params(request.args)
+        children = load_child_collections(contract_ids, collections)
+        return jsonify({
+            str(contract_id): {
+                name: [record.to_dict() for record in records]
+                for name, records in contract_children.items()
+            }
+            for contract_id, contract_children in children.items()
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,176 @@
+from flask import Blueprint, jsonify, request
+from models import db, IncomeContract
+from cache import cache
+from queries import income_contracts_query, income_options_query
+from views.common import format_currency, fetch_list_page, list_response
+from datetime import datetime
+from decimal import Decimal
+
+
+bp = Blueprint('income', __name__)
+
+
+INCOME_CURRENCY_FIELDS = ('amount', 'paid')
+
+
+def serialize_income_row(contract):
+    return {
+        'id': contract.id,
+        'contract': contract.contract_number,
+        'date': contract.contract_date.strftime('%Y-%m-%d'),
+        'client': contract.client,
+        'amount': contract.contract_amount,
+        'paid': contract.paid_amount
+    }
+
+
+@bp.route('/api/income', methods=['GET'])
+@cache.cached('income')
+def get_income_contracts():
+    try:
+        rows, page = fetch_list_page(income_contracts_query(), IncomeContract, 'contract_date')
+        return list_response((serialize_income_row(contract) for contract, in rows), page, INCOME_CURRENCY_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/income-contracts', methods=['POST'])
+def create_income_contract():
+    try:
+        data = request.get_json()
+
+        # Валидация обязательных полей
+        required_fields = ['contract_number', 'contract_date', 'client', 'contract_amount']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({'error': f'Поле {field} обязательно для заполнения'}), 400
+
+        # Проверка уникальности номера договора
+        existing_contract = IncomeContract.query.filter_by(contract_number=data['contract_number']).first()
+        if existing_contract:
+            return jsonify({'error': 'Договор с таким номером уже существует'}), 400
+
+        # Создание нового доходного договора
+        new_contract = IncomeContract(
+            contract_number=data['contract_number'],
+            contract_date=datetime.strptime(data['contract_date'], '%Y-%m-%d'),
+            client=data['client'],
+            contract_amount=Decimal(data['contract_amount']),
+            paid_amount=Decimal(data.get('paid_amount', 0)),
+            status='active'
+        )
+
+        db.session.add(new_contract)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Доходный договор успешно создан',
+            'contract': {
+                'id': new_contract.id,
+                'contract_number': new_contract.contract_number,
+                'contract_date': new_contract.contract_date.strftime('%Y-%m-%d'),
+                'client': new_contract.client,
+                'contract_amount': format_currency(new_contract.contract_amount),
+                'paid_amount': format_currency(new_contract.paid_amount)
+            }
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при создании договора: {str(e)}'}), 500
+
+
+# Роут для получения списка доходных договоров (для выпадающего списка)
+@bp.route('/api/income-contracts/options', methods=['GET'])
+@cache.cached('income-options')
+def get_income_contracts_options():
+    try:
+        # Фильтруем только активные договоры (не удаленные)
+        contracts = db.session.execute(income_options_query()).scalars()
+        options = [{
+            'value': contract.id,
+            'label': f'{contract.contract_number} - {contract.client}'
+        } for contract in contracts]
+
+        return jsonify(options)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Роут для получения деталей договора
+@bp.route('/api/income-contracts/<int:contract_id>', methods=['GET'])
+def get_income_contract(contract_id):
+    try:
+        contract = IncomeContract.query.get_or_404(contract_id)
+        return jsonify({
+            'id': contract.id,
+            'contract_number': contract.contract_number,
+            'contract_date': contract.contract_date.strftime('%Y-%m-%d'),
+            'client': contract.client,
+            'contract_amount': str(contract.contract_amount),
+            'paid_amount': str(contract.paid_amount),
+            'status': contract.status
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+
+
+# Роут для обновления оплат
+@bp.route('/api/income-contracts/<int:contract_id>', methods=['PUT'])
+def update_income_contract(contract_id):
+    try:
+        contract = db.session.get(IncomeContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        data = request.get_json()
+
+        # Обновляем все поля
+        if 'contract_number' in data:
+            contract.contract_number = data['contract_number']
+        if 'contract_date' in data:
+            contract.contract_date = datetime.strptime(data['contract_date'], '%Y-%m-%d')
+        if 'client' in data:
+            contract.client = data['client']
+        if 'contract_amount' in data:
+            contract.contract_amount = Decimal(data['contract_amount'])
+        if 'paid_amount' in data:
+            contract.paid_amount = Decimal(data['paid_amount'])
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Данные договора обновлены',
+            'contract': {
+                'id': contract.id,
+                'contract_number': contract.contract_number,
+                'contract_date': contract.contract_date.strftime('%Y-%m-%d'),
+                'client': contract.client,
+                'contract_amount': str(contract.contract_amount),
+                'paid_amount': str(contract.paid_amount)
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при обновлении договора: {str(e)}'}), 500
+
+
+@bp.route('/api/income-contracts/<int:contract_id>', methods=['DELETE'])
+def delete_income_contract(contract_id):
+    try:
+        contract = db.session.get(IncomeContract, contract_id)
+        if not contract:
+            return jsonify({'error': 'Договор не найден'}), 404
+
+        # Мягкое удаление - устанавливаем время удаления
+        contract.deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        return jsonify({'message': 'Договор успешно удален'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при удалении договора: {str(e)}'}), 500
@@ -0,0 +1,334 @@
+from flask import Blueprint, Response, render_template, jsonify, request, send_file, current_app
+from models import db, User, IncomeContract, ExpenseContract, ContractSummary, CalPlan, CostItem, ClosedWork
+from summary import rebuild_summaries
+from cache import cache
+from jobs import jobs, SUCCEEDED
+from metrics import metrics
+from views.common import wants_async, job_accepted
+from datetime import datetime
+from decimal import Decimal
+import os
+
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+def index():
+    """Главная страница - отдаем React приложение"""
+    return render_template('index.html')
+
+
+@bp.route('/api/health', methods=['GET'])
+def health_check():
+    """Проверка здоровья API"""
+    return jsonify({
+        "status": "healthy",
+        "message": "Flask + React app is running!",
+        "environment": "production" if not current_app.debug else "development"
+    })
+
+
+@bp.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Статистика кэша ответов: попадания, промахи, поколение данных"""
+    return jsonify(cache.stats())
+
+
+@bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+INIT_DATA_STEPS = 6
+
+
+def create_test_data(progress=None):
+    """Заменяет все данные тестовым набором и возвращает количество созданных записей.
+
+    progress(шаг, всего шагов, сообщение) вызывается в начале каждого шага, если передан.
+    """
+    def report_step(step, message):
+        current_app.logger.info(message)
+        if progress:
+            progress(step - 1, INIT_DATA_STEPS, message)
+
+    # Очистка существующих данных в правильном порядке
+    report_step(1, 'Очистка старых данных')
+    db.session.query(CostItem).delete()
+    db.session.query(ClosedWork).delete()
+    db.session.query(CalPlan).delete()
+    db.session.query(ContractSummary).delete()
+    db.session.query(ExpenseContract).delete()
+    db.session.query(IncomeContract).delete()
+    db.session.query(User).delete()
+
+    db.session.commit()
+
+    # Создание тестовых пользователей
+    report_step(2, 'Создание пользователей')
+    users = [
+        User(username='economist', role='Экономика'),
+        User(username='pts', role='ПТС'),
+        User(username='kapstroy', role='Кап. строй'),
+        User(username='mes', role='МЭС'),
+        User(username='admin', role='Администратор системы')
+    ]
+
+    for user in users:
+        user.set_password('123')
+        db.session.add(user)
+
+    db.session.commit()
+
+    # Создание доходных договоров
+    report_step(3, 'Создание доходных договоров')
+    income_contracts = [
+        IncomeContract(
+            contract_number='ДГ-001-24',
+            contract_date=datetime(2024, 1, 15),
+            client='ООО "Ромашка"',
+            contract_amount=Decimal('5000000.00'),
+            paid_amount=Decimal('5000000.00')
+        ),
+        IncomeContract(
+            contract_number='ДГ-002-24',
+            contract_date=datetime(2024, 1, 20),
+            client='ИП Сидоров',
+            contract_amount=Decimal('3000000.00'),
+            paid_amount=Decimal('3000000.00')
+        ),
+        IncomeContract(
+            contract_number='ДГ-003-24',
+            contract_date=datetime(2024, 1, 25),
+            client='ОАО "Вектор"',
+            contract_amount=Decimal('7500000.00'),
+            paid_amount=Decimal('3000000.00')
+        )
+    ]
+
+    for contract in income_contracts:
+        db.session.add(contract)
+
+    db.session.commit()
+
+    # Создание расходных договоров
+    report_step(4, 'Создание расходных договоров')
+    expense_contracts = []
+
+    contract_data = [
+        {
+            'number': 'РД-001-24',
+            'type_contract': 'ремонтная программа',
+            'start_date': datetime(2024, 1, 10),
+            'end_date': datetime(2024, 6, 10),
+            'name': 'Строительство офисного здания',
+            'client': 'ООО "СтройМонтаж"',
+            'amount': Decimal('2500000.00'),
+            'advance': Decimal('50.00'),
+            'payment': Decimal('1800000.00'),
+            'income_id': income_contracts[0].id,
+            'is_mes': False
+        },
+        {
+            'number': 'РД-002-24',
+            'type_contract': 'инвестиционная программа',
+            'start_date': datetime(2024, 2, 1),
+            'end_date': datetime(2024, 8, 1),
+            'name': 'Реконструкция складского помещения',
+            'client': 'ООО "РемонтСервис"',
+            'amount': Decimal('1800000.00'),
+            'advance': Decimal('0.00'),
+            'payment': Decimal('1200000.00'),
+            'income_id': income_contracts[0].id,
+            'is_mes': False
+        },
+        {
+            'number': 'РД-003-24',
+            'type_contract': 'ремонтная программа',
+            'start_date': datetime(2024, 1, 15),
+            'end_date': datetime(2024, 7, 15),
+            'name': 'Монтаж инженерных систем',
+            'client': 'ООО "ИнжСистемы"',
+            'amount': Decimal('3200000.00'),
+            'advance': Decimal('10.00'),
+            'payment': Decimal('2000000.00'),
+            'income_id': income_contracts[1].id,
+            'is_mes': False
+        }
+    ]
+
+    for data in contract_data:
+        try:
+            contract = ExpenseContract(
+                contract_number=data['number'],
+                type_contract=data['type_contract'],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                name=data['name'],
+                client=data['client'],
+                contract_amount=data['amount'],
+                advance_percentage=data['advance'],
+                payment_loesk=data['payment'],
+                income_contract_id=data['income_id']
+            )
+            db.session.add(contract)
+            expense_contracts.append(contract)
+        except Exception as e:
+            current_app.logger.error("Ошибка при создании договора %s: %s", data['number'], e)
+            raise
+
+    db.session.commit()
+
+    # Создание данных для CalPlan
+    report_step(5, 'Создание планов')
+    cal_plans = []
+    plan_data = [
+        # Для РД-001-24
+        (0, datetime(2024, 3, 1), Decimal('300000.00')),
+        (0, datetime(2024, 4, 1), Decimal('400000.00')),
+        (0, datetime(2024, 5, 1), Decimal('350000.00')),
+        # Для РД-002-24
+        (1, datetime(2024, 3, 1), Decimal('200000.00')),
+        (1, datetime(2024, 4, 1), Decimal('250000.00')),
+        (1, datetime(2024, 5, 1), Decimal('180000.00')),
+        # Для РД-003-24
+        (2, datetime(2024, 3, 1), Decimal('450000.00')),
+        (2, datetime(2024, 4, 1), Decimal('500000.00')),
+        (2, datetime(2024, 5, 1), Decimal('480000.00')),
+    ]
+
+    for contract_idx, date, amount in plan_data:
+        plan = CalPlan(
+            iddog=expense_contracts[contract_idx].id,
+            date=date,
+            plopl=amount
+        )
+        db.session.add(plan)
+        cal_plans.append(plan)
+
+    db.session.commit()
+
+    # Создание данных для CostItem
+    report_step(6, 'Создание затрат')
+    cost_items = []
+    cost_data = [
+        # Для РД-001-24
+        (0, datetime(2024, 1, 20), 'ООО "СтройМонтаж"', 'Материалы', 'Закупка строительных материалов',
+         Decimal('800000.00')),
+        (0, datetime(2024, 2, 15), 'ИП Петров', 'Работы', 'Монтажные работы', Decimal('400000.00')),
+        # Для РД-002-24
+        (1, datetime(2024, 2, 10), 'ООО "РемонтСервис"', 'Материалы', 'Закупка отделочных материалов',
+         Decimal('500000.00')),
+        (1, datetime(2024, 3, 5), 'ИП Сидоров', 'Работы', 'Отделочные работы', Decimal('400000.00')),
+        # Для РД-003-24
+        (2, datetime(2024, 1, 25), 'ООО "ИнжСистемы"', 'Оборудование', 'Закупка инженерного оборудования',
+         Decimal('1000000.00')),
+        (2, datetime(2024, 2, 20), 'ИП Козлов', 'Работы', 'Монтаж систем', Decimal('500000.00')),
+    ]
+
+    for contract_idx, date, kontragent, category, purpose, amount in cost_data:
+        cost_item = CostItem(
+            contract_id=expense_contracts[contract_idx].id,
+            date=date,
+            kontragent=kontragent,
+            category=category,
+            purpose=purpose,
+            amount=amount
+        )
+        db.session.add(cost_item)
+        cost_items.append(cost_item)
+
+    db.session.commit()
+
+    return {
+        'users': len(users),
+        'income_contracts': len(income_contracts),
+        'expense_contracts': len(expense_contracts),
+        'cal_plans': len(cal_plans),
+        'cost_items': len(cost_items)
+    }
+
+
+@jobs.task('init-data')
+def init_data_job(context):
+    return create_test_data(context.progress)
+
+
+@bp.route('/api/init-data', methods=['POST'])
+def init_test_data():
+    try:
+        if wants_async():
+            return job_accepted(jobs.submit('init-data'))
+
+        return jsonify({
+            'message': 'Тестовые данные успешно созданы',
+            'count': create_test_data()
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Ошибка при создании тестовых данных')
+        return jsonify({'error': f'Ошибка при создании тестовых данных: {str(e)}'}), 500
+
+
+@jobs.task('rebuild-summary')
+def rebuild_summary_job(context):
+    return {'count': rebuild_summaries()}
+
+
+# Поставить фоновую задачу: {"kind": "export", "params": {"kind": "actual", "args": {...}}}
+@bp.route('/api/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Ожидается JSON объект с полями kind и params'}), 400
+        kind = data.get('kind')
+        if not jobs.is_public(kind):
+            return jsonify({'error': f'Неизвестный вид задачи: {kind}'}), 400
+        return job_accepted(jobs.submit(kind, data.get('params') or {}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Ошибка при постановке задачи: {str(e)}'}), 500
+
+
+# Статус и прогресс фоновой задачи
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Задача не найдена'}), 404
+
+        result = job.to_dict()
+        if job.status == SUCCEEDED:
+            result['result_url'] = f'/api/jobs/{job.id}/result'
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Результат фоновой задачи: файл (для выгрузок) или JSON
+@bp.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    try:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Задача не найдена'}), 404
+        if job.status != SUCCEEDED:
+            return jsonify({'error': 'Задача еще не завершена или завершилась с ошибкой',
+                            'status': job.status}), 409
+
+        result = job.result or {}
+        if result.get('file'):
+            path = os.path.join(current_app.config['JOB_RESULTS_FOLDER'], result['file'])
+            if not os.path.exists(path):
+                return jsonify({'error': 'Файл результата уже удален'}), 410
+            return send_file(path, as_attachment=True, download_name=result.get('download_name'),
+                             mimetype=result.get('mimetype'))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
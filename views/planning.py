@@ -0,0 +1,165 @@
+from flask import Blueprint, jsonify, request
+from models import db, ExpenseContract, CalPlan
+from cache import cache
+from queries import planning_contracts_query
+from views.common import get_planning_months, fetch_list_page, list_response
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+
+bp = Blueprint('planning', __name__)
+
+
+# Вспомогательные функции для расчетов
+def calculate_advance_amount(contract_amount, advance_percentage):
+    if advance_percentage:
+        return (contract_amount * advance_percentage) / 100
+    return Decimal('0')
+
+
+PLANNING_CURRENCY_FIELDS = (
+    'contract_amount', 'advance_amount', 'current_month', 'next_month_1', 'next_month_2', 'three_month_total'
+)
+
+
+def serialize_planning_row(contract, current_month_plan, next_month_1_plan, next_month_2_plan, month_names):
+    three_month_total = current_month_plan + next_month_1_plan + next_month_2_plan
+
+    return {
+        'id': contract.id,
+        'type_contract': contract.type_contract,
+        'contract': contract.contract_number,
+        'client': contract.client,
+        'start_date': contract.start_date.strftime('%Y-%m-%d'),
+        'end_date': contract.end_date.strftime('%Y-%m-%d'),
+        'name': contract.name,
+        'contract_amount': contract.contract_amount,
+        'advance': f"{contract.advance_percentage}%" if contract.advance_percentage else '',
+        'advance_amount': calculate_advance_amount(contract.contract_amount, contract.advance_percentage),
+        'current_month': current_month_plan,
+        'next_month_1': next_month_1_plan,
+        'next_month_2': next_month_2_plan,
+        'three_month_total': three_month_total,
+        'month_names': month_names  # Добавляем названия месяцев
+    }
+
+
+@bp.route('/api/planning', methods=['GET'])
+@cache.cached('planning', vary=lambda: get_planning_months()[0].strftime('%Y-%m'))
+def get_planning_contracts():
+    try:
+        months = get_planning_months()
+        current_month, next_month_1, next_month_2, _ = months
+
+        # Получаем названия месяцев один раз для всех договоров
+        month_names = {
+            'current_month': current_month.strftime('%B %Y'),
+            'next_month_1': next_month_1.strftime('%B %Y'),
+            'next_month_2': next_month_2.strftime('%B %Y')
+        }
+
+        # Плановые суммы по месяцам агрегируются в БД одним запросом
+        rows, page = fetch_list_page(planning_contracts_query(months), ExpenseContract, 'start_date')
+        return list_response(
+            (serialize_planning_row(*row, month_names=month_names) for row in rows), page,
+            PLANNING_CURRENCY_FIELDS
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Получить календарный план
+@bp.route('/api/expense-contracts/<int:contract_id>/cal-plan', methods=['GET'])
+def get_cal_plan(contract_id):
+    try:
+        plans = CalPlan.query.filter_by(iddog=contract_id).all()
+        return jsonify([plan.to_dict() for plan in plans])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def parse_cal_plan(plans):
+    """Строки плана из запроса по месяцам: {(год, месяц): (дата, сумма)}"""
+    if not isinstance(plans, list):
+        raise ValueError('Поле plans должно быть списком строк плана')
+    months = {}
+    for plan_data in plans:
+        try:
+            date = datetime.strptime(plan_data['date'], '%Y-%m-%d')
+            plopl = Decimal(str(plan_data['plopl']))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValueError('Каждая строка плана должна содержать дату (ГГГГ-ММ-ДД) и сумму')
+        # На один месяц приходится одна строка плана, повтор месяца заменяет предыдущий
+        months[(date.year, date.month)] = (date, plopl)
+    return months
+
+
+def diff_cal_plan(contract_id, months):
+    """Приводит план договора к переданному набору месяцев, меняя только отличающиеся строки.
+
+    Строки существующих месяцев обновляются на месте и сохраняют свои id,
+    строки убранных месяцев удаляются, новые месяцы вставляются одним INSERT.
+    """
+    existing = db.session.execute(
+        db.select(CalPlan.id, CalPlan.date, CalPlan.plopl)
+        .where(CalPlan.iddog == contract_id)
+        .order_by(CalPlan.id)
+    ).all()
+
+    kept = set()
+    updates, delete_ids = [], []
+    for plan_id, date, plopl in existing:
+        month = (date.year, date.month)
+        if month not in months or month in kept:
+            # Месяц убран из плана или уже представлен более ранней строкой
+            delete_ids.append(plan_id)
+            continue
+        kept.add(month)
+        new_date, new_plopl = months[month]
+        if date != new_date or plopl != new_plopl:
+            updates.append({'id': plan_id, 'date': new_date, 'plopl': new_plopl})
+
+    inserts = [
+        {'iddog': contract_id, 'date': date, 'plopl': plopl}
+        for month, (date, plopl) in months.items() if month not in kept
+    ]
+
+    if delete_ids:
+        db.session.execute(db.delete(CalPlan).where(CalPlan.id.in_(delete_ids)))
+    if updates:
+        db.session.execute(db.update(CalPlan), updates)
+    if inserts:
+        db.session.execute(db.insert(CalPlan), inserts)
+
+    return {
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deleted': len(delete_ids),
+        'unchanged': len(kept) - len(updates)
+    }
+
+
+# Сохранить календарный план
+@bp.route('/api/expense-contracts/<int:contract_id>/cal-plan', methods=['POST'])
+def save_cal_plan(contract_id):
+    try:
+        data = request.get_json()
+        months = parse_cal_plan(data.get('plans', []))
+
+        changes = diff_cal_plan(contract_id, months)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'План финансирования успешно сохранен',
+            'saved_plans': len(months),
+            **changes
+        })
+
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка при сохранении плана: {str(e)}'}), 500
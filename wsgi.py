@@ -0,0 +1,4 @@
+"""Точка входа WSGI: gunicorn wsgi:app (настройки в gunicorn.conf.py)"""
+from app import create_app
+
+app = create_app()